@@ -1,23 +1,73 @@
 import streamlit as st
+import perf
+
+perf.start_clock()  # czas reruna i do pierwszego renderu liczony od początku skryptu (z importami)
+
 import pandas as pd
+import numpy as np
 import io
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-
-# ==========================================
-# 0. AUTOMATYCZNE CZYSZCZENIE PLIKÓW CSV
-# ==========================================
-try:
-    import clean_csv
-    clean_csv.clean_all()
-except ImportError:
-    print("Brak pliku clean_csv.py — pomijam automatyczne czyszczenie.")
+import functools
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import (
+    OrderBook,
+    InvalidOrderBook,
+    calculate_fill_rate_per_line,
+    parse_bucket_ends,
+    bucket_spreads,
+    distribution_fingerprint,
+    score_order_book,
+    compare_scenarios,
+    ScenarioComparison,
+    RevenueAttribution,
+    solve_spread_scaling,
+    target_revenue_for_rpm,
+    prepare_distribution,
+    Distribution,
+    ElasticityModel,
+    elasticity_model,
+    score_elastic,
+    bootstrap_tasks,
+    PanelDistribution,
+    panel_from_long,
+    score_panel,
+    score_batch_reduced,
+    DEFAULT_MEMORY_BUDGET_MB,
+    hour_window_index,
+    group_panel,
+    SegmentScore,
+    score_segments,
+    CumulativeDistribution,
+    cumulative_distribution,
+    resolution_edges,
+    rebin_distribution,
+    rebin_panel,
+)
+from live import FillTail, LiveDistribution
+from registry import Instrument, Market, load_registry
+from result_cache import ResultCache
+from frontier import DEFAULT_CANDIDATES, Frontier, base_frontier, frontier_spec, frontier_tasks, merge_frontiers
+from jobs import CANCELLED, DONE, FAILED, Job, JobRunner, JobSubscription
+from compute_pool import ComputePool, PoolBusy, create_worker_pool
+from scenario_store import DEFAULT_STORE_PATH, SORT_COLUMNS, ScenarioStore, totals_basis
+import clean_csv
+from warmup import WARMUP_THREAD, WarmUp
+from file_watch import WATCH_THREAD, FileFingerprints, FileWatcher
 
 # ==========================================
 # 1. KONFIGURACJA STRONY
 # ==========================================
 st.set_page_config(page_title="A/B Spread Revenue Calculator", layout="wide")
 
+# Profil reruna: panel debug dla `?debug=1`, same logi dla wszystkich sesji przy zmiennej SPREAD_CALC_PROFILE
+DEBUG = st.query_params.get("debug") == "1"
+perf.begin(st.session_state.setdefault("perf_session", uuid.uuid4().hex[:8]),
+           active=DEBUG or perf.profile_all_sessions())
+
 # ==========================================
 # UKRYCIE ELEMENTOW STREAMLIT COMMUNITY CLOUD
 # ==========================================
@@ -35,284 +85,382 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ==========================================
-# STAŁE — WARTOŚĆ 1 LOTA
+# STAŁE
 # ==========================================
-LOT_PRICE_XAUUSD = 500_000.0   # 1 Lot XAUUSD = 500 000 USD
-LOT_PRICE_XAGUSD = 400_000.0   # 1 Lot XAGUSD = 400 000 USD
+# Wartość 1 lota, mnożniki spreadu, pliki i domyślne Order Booki — w instruments.toml (registry.py)
+
+# Sesje handlowe (godziny UTC, [od, do)) — okna harmonogramu Order Booków
+SESSION_WINDOWS = [
+    ("Azja",      22, 7),
+    ("Londyn",     7, 13),
+    ("Nowy Jork", 13, 22),
+]
+
+# Budżet pamięci jednej paczki ocen wsadowych (harmonogram, front Pareto) — np. 64 MB na maszynach z 8 GB RAM
+MEMORY_BUDGET_MB = float(os.environ.get("SPREAD_CALC_MEMORY_MB", DEFAULT_MEMORY_BUDGET_MB))
+
+# Grubsze rozdzielczości bucketów w selektorze zakładki (szerokość bucketu w lotach)
+RESOLUTION_STEPS = {"0.5 lota": 0.5, "1 lot": 1.0}
+CUSTOM_RESOLUTION = "Własne granice"
 
 # ==========================================
 # 2. ŁADOWANIE CZYSTYCH DANYCH (CSV)
 # ==========================================
-@st.cache_data
-def load_clean_csv(path: str) -> pd.DataFrame:
-    """Ładuje wstępnie wyczyszczone pliki CSV z poprawnym formatem np. 0.0 - 0.1"""
+# Loadery są kluczowane tożsamością pliku (rozmiar + skrót treści), a nie samą ścieżką — nowy plik
+# na serwerze to nowy klucz. Limit wpisów usuwa wersje zastąpione nowszymi plikami.
+DISTRIBUTION_CACHE_ENTRIES = 32
+
+
+@st.cache_resource
+def get_file_fingerprints() -> FileFingerprints:
+    return FileFingerprints()
+
+
+@st.cache_resource
+def get_cleaned_identities() -> dict[str, str | None]:
+    """Tożsamość surowego pliku, z której powstał aktualny plik `_clean` (per proces)."""
+    return {}
+
+
+@perf.counted_cache("load_clean_csv", st.cache_data(max_entries=DISTRIBUTION_CACHE_ENTRIES))
+def load_clean_csv(path: str, identity: str | None) -> pd.DataFrame:
+    """Ładuje wstępnie wyczyszczone pliki CSV z poprawnym formatem np. 0.0 - 0.1 (`identity` — tylko klucz cache)"""
     try:
-        with open(path, 'r', encoding='utf-8-sig') as f:
-            lines = [line.strip() for line in f if line.strip()]
-            
-        if not lines:
-            return pd.DataFrame(columns=["volume_range", "filled_volume"])
-            
-        sep = ";" if ";" in lines[0] else ","
-        
-        data = []
-        for line in lines[1:]:
-            last_sep_idx = line.rfind(sep)
-            if last_sep_idx != -1:
-                vol_range = line[:last_sep_idx].strip()
-                filled_vol = line[last_sep_idx+1:].strip()
-                data.append({
-                    "volume_range": vol_range,
-                    "filled_volume": filled_vol
-                })
-                
-        df = pd.DataFrame(data)
-        if not df.empty:
-            df["filled_volume"] = pd.to_numeric(df["filled_volume"], errors="coerce")
-            
-        return df
+        return clean_csv.read_clean_csv(path)
     except Exception as e:
         return pd.DataFrame(columns=["volume_range", "filled_volume"])
 
 
-@st.cache_data
-def load_distributions_xauusd() -> tuple[pd.DataFrame, pd.DataFrame]:
+@st.cache_resource
+def get_registry() -> dict[str, Instrument]:
+    """Rejestr instrumentów — parsowana tylko konfiguracja, bez ładowania danych."""
+    return load_registry()
+
+
+@perf.timed("load")
+@perf.counted_cache("load_market_distribution", st.cache_data(max_entries=DISTRIBUTION_CACHE_ENTRIES))
+def load_market_distribution(raw_path: str, identity: str | None) -> pd.DataFrame:
+    """
+    Ładuje rozkład jednego rynku przy pierwszym otwarciu instrumentu (i po każdej zmianie pliku —
+    `identity` surowego pliku jest częścią klucza): czyści surowy plik, jeśli wersja `_clean`
+    jest nieaktualna, i wczytuje wynik.
+    """
     try:
-        df_futures = load_clean_csv("futures_distribution_clean.csv")
-        df_spot    = load_clean_csv("spot_distribution_clean.csv")
-        for name, df in [("futures_distribution_clean.csv", df_futures), ("spot_distribution_clean.csv", df_spot)]:
-            if not df.empty and ("volume_range" not in df.columns or "filled_volume" not in df.columns):
-                st.error(f"Wygenerowany plik {name} nie zawiera wymaganych kolumn.")
-                return pd.DataFrame(), pd.DataFrame()
-        return df_futures, df_spot
+        # Inna treść niż przy poprzednim czyszczeniu w tym procesie — czyścimy niezależnie od dat plików
+        cleaned = get_cleaned_identities()
+        with perf.stage("clean"):
+            clean_path = clean_csv.clean_file(raw_path, force=cleaned.get(raw_path, identity) != identity)
+        cleaned[raw_path] = identity
+        df = load_clean_csv(clean_path, get_file_fingerprints().identity(clean_path))
+        if not df.empty and ("volume_range" not in df.columns or "filled_volume" not in df.columns):
+            st.error(f"Wygenerowany plik {clean_path} nie zawiera wymaganych kolumn.")
+            return pd.DataFrame()
+        return df
     except Exception as e:
-        return pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame()
 
 
-@st.cache_data
-def load_distributions_xagusd() -> tuple[pd.DataFrame, pd.DataFrame]:
+@perf.timed("load")
+@perf.counted_cache("load_panel_distribution", st.cache_data(max_entries=DISTRIBUTION_CACHE_ENTRIES))
+def load_panel_distribution(path: str, key_column: str, identity: str | None) -> PanelDistribution | None:
+    """
+    Ładuje rozkład indeksowany kluczem (`<key_column>, volume_range, filled_volume`) jako jedną
+    macierz klucze × buckety — np. okresy z `clean_csv.py ingest --period day` albo segmenty klientów.
+    Zwraca None, jeśli plik nie istnieje. `identity` — tylko klucz cache.
+    """
+    if not os.path.exists(path):
+        return None
     try:
-        df_futures = load_clean_csv("futures_distribution_XAGUSD_clean.csv")
-        df_spot    = load_clean_csv("spot_distribution_XAGUSD_clean.csv")
-        for name, df in [("futures_distribution_XAGUSD_clean.csv", df_futures), ("spot_distribution_XAGUSD_clean.csv", df_spot)]:
-            if not df.empty and ("volume_range" not in df.columns or "filled_volume" not in df.columns):
-                st.error(f"Wygenerowany plik {name} nie zawiera wymaganych kolumn.")
-                return pd.DataFrame(), pd.DataFrame()
-        return df_futures, df_spot
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            sep = ";" if ";" in f.readline() else ","
+        df = pd.read_csv(path, sep=sep, encoding="utf-8-sig", dtype={key_column: str})
+        if not {key_column, "volume_range", "filled_volume"}.issubset(df.columns):
+            st.error(f"Plik {path} nie zawiera wymaganych kolumn: '{key_column}', 'volume_range', 'filled_volume'.")
+            return None
+        panel = panel_from_long(df, key_column)
+        return None if panel.empty else panel
     except Exception as e:
-        return pd.DataFrame(), pd.DataFrame()
+        st.error(f"Nie udało się wczytać rozkładu {path}: {e}")
+        return None
 
 
-# ==========================================
-# DOMYŚLNE ORDER BOOKI — XAUUSD
-# ==========================================
-@st.cache_data
-def load_default_ob_xauusd_futures() -> pd.DataFrame:
-    return pd.DataFrame({
-        "OB Line": [1, 2, 3, 4, 5, 6, 7],
-        "Bid Size": [1.0,  6.0, 10.0, 11.0, 15.0, 19.0, 23.0],
-        "Ask Size": [1.0,  6.0, 11.0, 15.0, 18.0, 19.0, 20.0],
-        "Spread":   [31.0, 42.0, 57.0, 84.0, 115.0, 164.0, 247.0],
-    })
+@perf.counted_cache("load_default_ob", st.cache_data)
+def load_default_ob(raw_path: str, side: str) -> pd.DataFrame:
+    """Domyślny Order Book A / B rynku z rejestru (wskazanego przez plik rozkładu)."""
+    market = next(m for inst in get_registry().values() for m in inst.markets if m.distribution == raw_path)
+    return market.default_order_book(side)
 
-@st.cache_data
-def load_default_ob_xauusd_spot_a() -> pd.DataFrame:
-    return pd.DataFrame({
-        "OB Line": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
-        "Bid Size": [1.0, 3.5, 4.5, 6.5, 9.5, 14.0, 16.5, 23.5, 35.0, 44.0],
-        "Ask Size": [1.0, 3.5, 4.5, 6.5, 9.5, 14.0, 16.5, 23.5, 35.0, 44.0],
-        "Spread":   [20.0, 44.0, 65.0, 82.0, 112.0, 145.0, 180.0, 211.0, 241.0, 270.0],
-    })
 
-@st.cache_data
-def load_default_ob_xauusd_spot_b() -> pd.DataFrame:
-    return pd.DataFrame({
-        "OB Line": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
-        "Bid Size": [1.0, 3.5, 4.5, 6.5, 9.5, 14.0, 16.5, 23.5, 35.0, 44.0],
-        "Ask Size": [1.0, 3.5, 4.5, 6.5, 9.5, 14.0, 16.5, 23.5, 35.0, 44.0],
-        "Spread":   [20.0, 44.0, 65.0, 82.0, 112.0, 145.0, 180.0, 211.0, 241.0, 270.0],
-    })
+def default_order_books(market: Market) -> tuple[OrderBook, OrderBook]:
+    """Domyślne Order Booki A i B rynku jako `OrderBook` (np. portfolio dla nieotwartych zakładek)."""
+    return (OrderBook.from_frame(load_default_ob(market.distribution, "a")),
+            OrderBook.from_frame(load_default_ob(market.distribution, "b")))
+
+
+def market_distribution(market: Market) -> pd.DataFrame:
+    return load_market_distribution(market.distribution, get_file_fingerprints().identity(market.distribution))
+
+
+def market_panel(path: str, key_column: str, edges: tuple[float, ...] | None = None) -> PanelDistribution | None:
+    identity = get_file_fingerprints().identity(path)
+    if edges is not None:
+        return rebinned_panel(path, key_column, identity, edges)
+    return load_panel_distribution(path, key_column, identity)
 
 
 # ==========================================
-# DOMYŚLNE ORDER BOOKI — XAGUSD
+# 2a. ROZDZIELCZOŚĆ BUCKETÓW (REBINNING)
 # ==========================================
-@st.cache_data
-def load_default_ob_xagusd_futures() -> pd.DataFrame:
-    return pd.DataFrame({
-        "OB Line": [1, 2, 3, 4, 5, 6, 7],
-        "Bid Size": [2.0, 3.0, 4.0, 6.0, 7.0, 9.0, 11.0],
-        "Ask Size": [2.0, 3.0, 4.0, 6.0, 7.0, 9.0, 11.0],
-        "Spread":   [46.0, 52.0, 66.0, 80.0, 96.0, 110.0, 132.0],
-    })
-
-@st.cache_data
-def load_default_ob_xagusd_spot_a() -> pd.DataFrame:
-    return pd.DataFrame({
-        "OB Line": [1, 2, 3, 4, 5],
-        "Bid Size": [1.0, 2.0, 5.0, 10.0, 20.0],
-        "Ask Size": [1.0, 2.0, 5.0, 10.0, 20.0],
-        "Spread":   [22.0, 40.0, 60.0, 82.0, 112.0],
-    })
+# Grubsze buckety liczone z sum skumulowanych wczytanego rozkładu — zmiana rozdzielczości nie czyta plików,
+# a każda rozdzielczość jest w cache per rynek i tożsamość pliku.
+@perf.counted_cache("cumulative_distribution", st.cache_data(max_entries=DISTRIBUTION_CACHE_ENTRIES))
+def market_cumulative(market_key: str, identity: str | None, _vol_dist_df: pd.DataFrame) -> CumulativeDistribution:
+    dist = prepare_distribution(_vol_dist_df)
+    return cumulative_distribution(dist.bucket_ends, dist.volumes)
+
+
+@perf.timed("rebin")
+@perf.counted_cache("rebinned_distribution", st.cache_data(max_entries=DISTRIBUTION_CACHE_ENTRIES))
+def rebinned_distribution(market_key: str, identity: str | None, edges: tuple[float, ...],
+                          _vol_dist_df: pd.DataFrame) -> pd.DataFrame:
+    return rebin_distribution(market_cumulative(market_key, identity, _vol_dist_df), edges)
+
+
+@perf.timed("rebin")
+@perf.counted_cache("rebinned_panel", st.cache_data(max_entries=DISTRIBUTION_CACHE_ENTRIES))
+def rebinned_panel(path: str, key_column: str, identity: str | None,
+                   edges: tuple[float, ...]) -> PanelDistribution | None:
+    panel = load_panel_distribution(path, key_column, identity)
+    return None if panel is None else rebin_panel(panel, edges)
+
+
+def parse_edges(text: str) -> tuple[float, ...]:
+    """Górne granice bucketów wpisane po przecinku lub spacji, np. '1, 2, 5, 10' — rosnące i dodatnie."""
+    edges = [float(x) for x in text.replace(";", " ").replace(",", " ").split()]
+    if not edges:
+        raise ValueError("podaj co najmniej jedną granicę")
+    if any(e <= 0 for e in edges) or any(b <= a for a, b in zip(edges, edges[1:])):
+        raise ValueError("granice muszą być dodatnie i rosnące")
+    return tuple(edges)
+
+
+def select_resolution(market_key: str, cumulative: CumulativeDistribution) -> tuple[float, ...] | None:
+    """Selektor rozdzielczości zakładki — zwraca nowe górne granice bucketów albo None (buckety z pliku)."""
+    ends = cumulative.bucket_ends
+    width = float(np.round(np.median(np.diff(ends)), 6)) if len(ends) > 1 else 0.0
+    steps = {label: step for label, step in RESOLUTION_STEPS.items() if step > width}
+    original = f"Oryginalna ({width:g} lota)" if width else "Oryginalna"
+
+    col_res, col_edges = st.columns([1, 2], vertical_alignment="bottom")
+    choice = col_res.selectbox("Rozdzielczość bucketów", [original, *steps, CUSTOM_RESOLUTION],
+                               key=f"resolution_{market_key}")
+    if choice in steps:
+        return tuple(resolution_edges(cumulative.max_end, steps[choice]).tolist())
+    if choice != CUSTOM_RESOLUTION:
+        return None
 
-@st.cache_data
-def load_default_ob_xagusd_spot_b() -> pd.DataFrame:
-    return pd.DataFrame({
-        "OB Line": [1, 2, 3, 4, 5],
-        "Bid Size": [1.0, 2.0, 5.0, 10.0, 20.0],
-        "Ask Size": [1.0, 2.0, 5.0, 10.0, 20.0],
-        "Spread":   [22.0, 40.0, 60.0, 82.0, 112.0],
-    })
+    text = col_edges.text_input("Górne granice bucketów (loty)", key=f"resolution_edges_{market_key}",
+                                placeholder="np. 1, 2, 5, 10, 25, 50, 100")
+    if not text.strip():
+        return None
+    try:
+        return parse_edges(text)
+    except ValueError as e:
+        col_edges.error(f"Niepoprawne granice: {e}. Używam bucketów z pliku.")
+        return None
 
 
 # ==========================================
-# 3. WALIDACJA ORDER BOOK
+# 3-4. WALIDACJA I SILNIK KALKULACJI (engine.py)
 # ==========================================
-def validate_order_book(ob: pd.DataFrame) -> list[str]:
-    errors = []
-    for col in ["Ask Size", "Spread"]:
-        if col not in ob.columns:
-            errors.append(f"Brak kolumny: {col}")
-            return errors
+def warn_unparsed_bucket(vol_range: str) -> None:
+    st.warning(f"Nie można sparsować przedziału: '{vol_range}' — pominięto.")
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Cache wyników wspólny dla wszystkich sesji i zakładek (w tym widoku portfolio)."""
+    return ResultCache()
+
+
+@st.cache_resource
+def get_worker_pool() -> ProcessPoolExecutor:
+    """Pula procesów do liczenia wielu scenariuszy równolegle (np. portfolio)."""
+    return create_worker_pool()
+
+
+def scenario_key(market_key: str, vol_dist_df: pd.DataFrame, order_book: OrderBook,
+                 lot_price: float, spread_multiplier: float) -> tuple:
+    return (market_key, distribution_fingerprint(vol_dist_df), order_book.fingerprint, lot_price, spread_multiplier)
 
-    if ob["Ask Size"].isnull().any():
-        errors.append("Kolumna 'Ask Size' zawiera puste wartości.")
-    elif (ob["Ask Size"] <= 0).any():
-        errors.append("Wartości 'Ask Size' muszą być większe od zera.")
 
-    if ob["Spread"].isnull().any():
-        errors.append("Kolumna 'Spread' zawiera puste wartości.")
-    elif (ob["Spread"] <= 0).any():
-        errors.append("Wartości 'Spread' muszą być większe od zera.")
+@st.cache_resource
+def get_compute_pool() -> ComputePool:
+    """Wspólna pula obliczeń: rozkłady w pamięci współdzielonej, łączenie identycznych zleceń."""
+    return ComputePool(get_worker_pool())
+
+
+@perf.counted_cache("prepared_distribution", st.cache_data(max_entries=DISTRIBUTION_CACHE_ENTRIES))
+def prepared_distribution(fingerprint: str, _vol_dist_df: pd.DataFrame) -> Distribution:
+    return prepare_distribution(_vol_dist_df)
+
+
+@perf.timed("score")
+def compare_scenarios_cached(market_key: str, order_books: list[OrderBook], vol_dist_df: pd.DataFrame,
+                             base_idx: int, lot_price: float, spread_multiplier: float) -> ScenarioComparison:
+    """
+    Wyniki wszystkich scenariuszy i atrybucja względem bazowego z jednego wsadowego wywołania silnika,
+    liczone we wspólnej puli procesów. Wyniki pojedynczych scenariuszy trafiają też do cache per scenariusz.
+    """
+    cache = get_result_cache()
+    fingerprint = distribution_fingerprint(vol_dist_df)
+    keys = [(market_key, fingerprint, ob.fingerprint, lot_price, spread_multiplier) for ob in order_books]
+    comparison_key = (market_key, "comparison", tuple(keys), base_idx)
+
+    def compute() -> tuple[ScenarioComparison, list[str]]:
+        dist = prepared_distribution(fingerprint, vol_dist_df)
+        pool = get_compute_pool()
+        descriptor = pool.publish(market_key, fingerprint, dist)
+        comparison = pool.submit(comparison_key, descriptor, order_books, base_idx, lot_price,
+                                 spread_multiplier).result()
+        unparsed = list(dist.unparsed)
+        for key, results in zip(keys, comparison.results):
+            cache.put(key, (results, unparsed))
+        return comparison, unparsed
+
+    try:
+        comparison, unparsed = cache.get_or_compute(comparison_key, compute)
+    except PoolBusy as e:
+        st.error(f"{e} Spróbuj ponownie za chwilę.")
+        st.stop()
+    for vol_range in unparsed:
+        warn_unparsed_bucket(vol_range)
+    return comparison
 
-    return errors
 
 # ==========================================
-# 4. SILNIK KALKULACJI
+# 4a. ROZGRZEWANIE CACHE PO STARCIE
 # ==========================================
-def parse_bucket_end(vol_range_str: str) -> float | None:
+def warm_market(instrument: Instrument, market: Market) -> None:
+    """Wczytuje rozkłady rynku i liczy domyślne Order Booki A/B — te same klucze cache co pierwszy rerun zakładki."""
+    vol_dist_df = market_distribution(market)
+    market_panel(market.periods_path, "period")
+    market_panel(market.segments_path, "segment")
+    if vol_dist_df.empty:
+        return
+    compare_scenarios_cached(market.key, list(default_order_books(market)), vol_dist_df, 0, instrument.lot_price,
+                             instrument.spread_multiplier)
+
+
+@st.cache_resource
+def start_warmup() -> WarmUp:
+    """Jednorazowo na proces serwera: wszystkie rynki z rejestru rozgrzewane w tle."""
+    # Loadery wołane poza wątkiem skryptu ostrzegają o braku ScriptRunContext — dla wątków w tle to oczekiwane
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: record.threadName not in (WARMUP_THREAD, WATCH_THREAD))
+    tasks = [(market.key, functools.partial(warm_market, instrument, market))
+             for instrument in get_registry().values() for market in instrument.markets]
+    return WarmUp(tasks).start()
+
+
+def refresh_market(market_key: str) -> None:
     """
-    Obsługuje wszystkie warianty formatowania przedziałów:
-      - '0.0 - 0.1'      (format po clean_csv)
-      - '(0.0, 0.1]'     (format pandas interval z przecinkiem)
-      - '(0.0 0.1]'      (format pandas interval ze spacją)
-      - '0.0 0.1'        (surowy format ze spacją, bez nawiasów)
+    Plik rynku się zmienił: usuwa jego wpisy z cache wyników (porównania, scenariusze, bootstrap —
+    klucze zaczynają się od klucza rynku) i od razu wczytuje oraz liczy nową wersję. Loadery
+    `st.cache_data` nie wymagają czyszczenia — nowa tożsamość pliku to nowy klucz.
     """
-    try:
-        s = str(vol_range_str).strip()
-        # Usuń nawiasy interwałowe
-        s = s.replace('(', '').replace(')', '').replace('[', '').replace(']', '').strip()
-
-        if ' - ' in s:
-            # Format po clean_csv: "0.0 - 0.1"
-            end_str = s.split(' - ')[1].strip()
-        elif ',' in s:
-            # Format pandas z przecinkiem: "0.0, 0.1"
-            end_str = s.split(',')[1].strip()
-        else:
-            # Format ze spacją: "0.0 0.1"
-            parts = s.split()
-            if len(parts) < 2:
-                return None
-            end_str = parts[-1].strip()
-
-        return float(end_str)
-    except (IndexError, ValueError):
-        return None
+    get_result_cache().invalidate(lambda key: isinstance(key, tuple) and key[:1] == (market_key,))
+    instrument, market = next((inst, m) for inst in get_registry().values() for m in inst.markets
+                              if m.key == market_key)
+    warm_market(instrument, market)
 
 
-def calculate_per_bucket_revenue(order_book: pd.DataFrame, volume_distribution: pd.DataFrame, lot_price: float, spread_multiplier: float = 1.0) -> pd.DataFrame:
-    ob = order_book.copy()
-    ob["Ask Size"] = pd.to_numeric(ob["Ask Size"], errors="coerce")
-    ob["Spread"]   = pd.to_numeric(ob["Spread"],   errors="coerce")
-    ob["Cum_Ask_Size"] = ob["Ask Size"].cumsum()
+@st.cache_resource
+def start_file_watcher() -> FileWatcher:
+    """Jednorazowo na proces serwera: obserwuje rozkład, okresy i segmenty każdego rynku osobno."""
+    groups = {market.key: [market.distribution, market.periods_path, market.segments_path]
+              for instrument in get_registry().values() for market in instrument.markets}
+    return FileWatcher(groups, refresh_market, get_file_fingerprints()).start()
 
-    if "OB Line" not in ob.columns:
-        ob["OB Line"] = range(1, len(ob) + 1)
 
-    results = []
+# ==========================================
+# 5. SILNIK INTERFEJSU
+# ==========================================
+# Kolory kolejnych scenariuszy (poza A i B) na wykresach
+SCENARIO_PALETTE = ["#636EFA", "#AB63FA", "#FFA15A", "#19D3F3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52"]
 
-    for _, row in volume_distribution.iterrows():
-        bucket_end = parse_bucket_end(row["volume_range"])
 
-        if bucket_end is None:
-            st.warning(f"Nie można sparsować przedziału: '{row['volume_range']}' — pominięto.")
-            continue
+def get_scenarios(tab_name: str) -> list[dict]:
+    """Lista scenariuszy zakładki. A (Current) i B (Optimized) są zawsze; kolejne dodaje użytkownik."""
+    return st.session_state.setdefault(f"scenarios_{tab_name}", [
+        {"id": "a", "name": "A", "desc": "Current"},
+        {"id": "b", "name": "B", "desc": "Optimized"},
+    ])
 
-        filled_volume = float(row["filled_volume"])
-        valid_lines   = ob[ob["Cum_Ask_Size"] >= bucket_end]
 
-        if not valid_lines.empty:
-            assigned_spread = float(valid_lines.iloc[0]["Spread"])
-            ob_line_used    = int(valid_lines.iloc[0]["OB Line"])
-        else:
-            assigned_spread = float(ob.iloc[-1]["Spread"])
-            ob_line_used    = int(ob.iloc[-1]["OB Line"])
+def add_scenario(tab_name: str) -> None:
+    scenarios = get_scenarios(tab_name)
+    name = st.session_state.get(f"new_scenario_{tab_name}", "").strip()
+    # Nazwa trafia do nazwy arkusza Excela — bez znaków zabronionych i max 31 znaków z prefiksem
+    name = "".join(c for c in name if c not in "[]:*?/\\")[:18]
+    if not name:
+        name = chr(ord("A") + len(scenarios)) if len(scenarios) < 26 else str(len(scenarios) + 1)
+    if any(s["name"] == name for s in scenarios):
+        st.session_state[f"scenario_msg_{tab_name}"] = f"Scenariusz '{name}' już istnieje."
+        return
+    next_id = max(int(s["id"][1:]) for s in scenarios if s["id"].startswith("s")) + 1 \
+        if any(s["id"].startswith("s") for s in scenarios) else 1
+    scenarios.append({"id": f"s{next_id}", "name": name, "desc": ""})
+    st.session_state[f"new_scenario_{tab_name}"] = ""
 
-        revenue      = round((filled_volume * assigned_spread * spread_multiplier) / 2, 2)
-        turnover_usd = filled_volume * lot_price
-        rpm          = (revenue / turnover_usd * 1_000_000) if turnover_usd > 0 else 0.0
 
-        results.append({
-            "Volume_Bucket":   row["volume_range"],
-            "Filled_Volume":   round(filled_volume, 2),
-            "OB_Line_Used":    ob_line_used,
-            "Assigned_Spread": round(assigned_spread, 2),
-            "Turnover_USD":    round(turnover_usd, 2),
-            "Revenue_USD":     revenue,
-            "RPM":             round(rpm, 2),
-        })
+def remove_scenario(tab_name: str, scenario_id: str) -> None:
+    scenarios = get_scenarios(tab_name)
+    scenarios[:] = [s for s in scenarios if s["id"] != scenario_id]
 
-    return pd.DataFrame(results)
 
+def load_order_book(tab_name: str, scenario_id: str, order_book: pd.DataFrame) -> None:
+    """Podmienia Order Book scenariusza (np. wynik solvera) — edytor startuje od nowych danych."""
+    st.session_state[f"ob_data_{scenario_id}_{tab_name}"] = order_book
+    st.session_state.pop(f"ob_{scenario_id}_{tab_name}", None)
 
-def calculate_fill_rate_per_line(results: pd.DataFrame, order_book: pd.DataFrame, lot_price: float) -> pd.DataFrame:
-    ob = order_book.copy()
-    if "OB Line" not in ob.columns:
-        ob["OB Line"] = range(1, len(ob) + 1)
 
-    lines = ob["OB Line"].tolist()
+def scenario_title(scenario: dict) -> str:
+    return f"{scenario['name']} — {scenario['desc']}" if scenario["desc"] else scenario["name"]
 
-    fill_counts   = {line: 0   for line in lines}
-    fill_volumes  = {line: 0.0 for line in lines}
-    fill_revenues = {line: 0.0 for line in lines}
 
-    for _, row in results.iterrows():
-        line = row["OB_Line_Used"]
-        if line in fill_counts:
-            fill_counts[line]   += 1
-            fill_volumes[line]  += float(row["Filled_Volume"])
-            fill_revenues[line] += float(row["Revenue_USD"])
+def scenario_label(scenario: dict) -> str:
+    return f"{scenario['name']} ({scenario['desc']})" if scenario["desc"] else scenario["name"]
 
-    total_volume = sum(fill_volumes.values())
 
-    rows = []
-    for line in lines:
-        count  = fill_counts[line]
-        volume = fill_volumes[line]
-        rev    = fill_revenues[line]
-        turnover = volume * lot_price
-        rpm      = (rev / turnover * 1_000_000) if turnover > 0 else 0.0
+def scenario_color(idx: int, color_a: str, color_b: str) -> str:
+    if idx == 0:
+        return color_a
+    if idx == 1:
+        return color_b
+    return SCENARIO_PALETTE[(idx - 2) % len(SCENARIO_PALETTE)]
 
-        rows.append({
-            "OB Line":         line,
-            "Fill Count":      count,
-            "Fill Volume":     round(volume, 2),
-            "Fill Volume (%)": round((volume / total_volume * 100), 1) if total_volume > 0 else 0.0,
-            "RPM":             round(rpm, 2),
-        })
 
-    return pd.DataFrame(rows)
+def pct_diff(revenue: pd.Series, baseline: pd.Series) -> np.ndarray:
+    """Zmiana % per bucket względem bazowego scenariusza (100% gdy baza = 0, a scenariusz > 0)."""
+    rev  = revenue.to_numpy(dtype=np.float64)
+    base = baseline.to_numpy(dtype=np.float64)
+    pct = np.divide(rev - base, base, out=np.zeros_like(rev), where=base > 0) * 100
+    return np.where(base > 0, np.round(pct, 2), np.where((base == 0) & (rev > 0), 100.0, 0.0))
 
-# ==========================================
-# 5. SILNIK INTERFEJSU
-# ==========================================
+
+@perf.timed("dashboard")
 def render_dashboard(vol_dist_df: pd.DataFrame, tab_name: str, default_ob_df: pd.DataFrame,
-                     lot_price: float, default_ob_df_b: pd.DataFrame = None, spread_multiplier: float = 1.0) -> None:
+                     lot_price: float, default_ob_df_b: pd.DataFrame = None, spread_multiplier: float = 1.0,
+                     period_panel: PanelDistribution | None = None,
+                     segment_panel: PanelDistribution | None = None) -> None:
+    # Ciężkie moduły (plotly, openpyxl) ładowane dopiero na ścieżce, która ich potrzebuje — nie opóźniają startu
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
     TABLE_HEIGHT = 300
-    col_left, col_right = st.columns(2)
-    
+    default_ob_b = default_ob_df_b if default_ob_df_b is not None else default_ob_df
+
     # Formatowanie kolumn dla głównych tabel (Wyniki A i Wyniki B)
     results_format_dict = {
         "Filled_Volume": "{:,.2f}",      # Separatory tysięcy + 2 miejsca po przecinku
@@ -328,385 +476,1321 @@ def render_dashboard(vol_dist_df: pd.DataFrame, tab_name: str, default_ob_df: pd
         "RPM": "{:,.0f}"                 # Brak miejsc po przecinku
     }
 
-    # --- Scenariusz A (Current) ---
-    with col_left:
-        st.header(f"Scenariusz A — {tab_name} (Current)")
-        st.markdown("**1. Edytuj Order Book A**")
+    # --- Lista scenariuszy ---
+    scenarios = get_scenarios(tab_name)
+    names = [s["name"] for s in scenarios]
+
+    col_add, col_add_btn, col_base = st.columns([2, 1, 2], vertical_alignment="bottom")
+    with col_add:
+        st.text_input("Nazwa nowego scenariusza", key=f"new_scenario_{tab_name}",
+                      placeholder=chr(ord("A") + len(scenarios)) if len(scenarios) < 26 else "")
+    with col_add_btn:
+        st.button("➕ Dodaj scenariusz", key=f"add_scenario_{tab_name}",
+                  on_click=add_scenario, args=(tab_name,), use_container_width=True)
+    with col_base:
+        baseline_name = st.selectbox("Scenariusz bazowy (porównania)", names, key=f"baseline_{tab_name}")
+    msg = st.session_state.pop(f"scenario_msg_{tab_name}", None)
+    if msg:
+        st.warning(msg)
+    base_idx = names.index(baseline_name) if baseline_name in names else 0
+
+    # --- Edytory Order Booków (po dwa w wierszu) ---
+    columns: list = []
+    edited_obs: list[OrderBook] = []
+    has_errors = False
+    for start in range(0, len(scenarios), 2):
+        columns.extend(st.columns(2))
+
+    for idx, scenario in enumerate(scenarios):
+        with columns[idx]:
+            header = f"Scenariusz {scenario['name']} — {tab_name}"
+            st.header(f"{header} ({scenario['desc']})" if scenario["desc"] else header)
+            if scenario["id"] not in ("a", "b"):
+                st.button("Usuń scenariusz", key=f"remove_{scenario['id']}_{tab_name}",
+                          on_click=remove_scenario, args=(tab_name, scenario["id"]))
+            st.markdown(f"**1. Edytuj Order Book {scenario['name']}**")
+
+            base_ob = st.session_state.get(f"ob_data_{scenario['id']}_{tab_name}",
+                                           default_ob_df if scenario["id"] == "a" else default_ob_b)
+            edited_ob = st.data_editor(
+                base_ob.copy(),
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                key=f"ob_{scenario['id']}_{tab_name}",
+                height=TABLE_HEIGHT,
+            )
+
+            # Jeden niezmienny OrderBook na scenariusz — wspólny dla silnika, fill rate, wykresów i cache
+            errors = []
+            with perf.stage("validate"):
+                try:
+                    edited_obs.append(OrderBook.from_frame(edited_ob))
+                except InvalidOrderBook as e:
+                    errors = e.errors
+            for err in errors:
+                st.error(f"Order Book {scenario['name']} — {err}")
+            has_errors = has_errors or bool(errors)
+
+    if has_errors:
+        return
+
+    edited_ob_a, edited_ob_b = edited_obs[0], edited_obs[1]
+    # Ostatnio edytowane Order Booki — widok portfolio liczy na nich (i trafia w ten sam cache)
+    st.session_state.setdefault("current_obs", {})[tab_name] = (edited_ob_a, edited_ob_b)
+
+    # Wszystkie scenariusze (i atrybucja zmian względem bazowego) jednym wsadowym wywołaniem silnika
+    comparison  = compare_scenarios_cached(tab_name, edited_obs, vol_dist_df, base_idx, lot_price, spread_multiplier)
+    all_results = comparison.results
+    attribution = comparison.attribution
+    if all_results[base_idx].empty:
+        st.warning(f"Brak wyników dla Scenariusza {baseline_name}. Sprawdź dane wejściowe.")
+        return
+
+    totals_rev      = [r["Revenue_USD"].sum() if not r.empty else 0.0 for r in all_results]
+    totals_turnover = [r["Turnover_USD"].sum() if not r.empty else 0.0 for r in all_results]
+    rpms = [(rev / turn * 1_000_000) if turn > 0 else 0.0 for rev, turn in zip(totals_rev, totals_turnover)]
+    base_rev, base_rpm = totals_rev[base_idx], rpms[base_idx]
+    attr_spread, attr_reassign = attribution.totals()
+
+    for idx, (scenario, results) in enumerate(zip(scenarios, all_results)):
+        with columns[idx]:
+            if results.empty:
+                st.warning(f"Brak wyników dla Scenariusza {scenario['name']}. Sprawdź dane wejściowe.")
+                continue
+
+            if idx == base_idx:
+                st.markdown(
+                    f"<div style='margin-bottom:0.5rem;'><b>2. Wyniki {scenario['name']}</b> &mdash; "
+                    f"Total Revenue: <span style='color:#EF553B;font-size:1.1em;font-weight:bold;'>"
+                    f"${totals_rev[idx]:,.2f}</span> "
+                    f"<span style='color:#888;font-size:0.9em;margin-left:10px;'>| RPM: <b>${rpms[idx]:,.0f}</b></span></div>",
+                    unsafe_allow_html=True,
+                )
+            else:
+                # Wyliczanie różnicy w dolarach
+                diff_vs_base = totals_rev[idx] - base_rev
+                diff_color   = "#00CC96" if diff_vs_base >= 0 else "#EF553B"
+                diff_sign    = "+" if diff_vs_base >= 0 else ""
+
+                # Wyliczanie różnicy w procentach
+                if base_rev > 0:
+                    pct_diff_vs_base = (diff_vs_base / base_rev) * 100
+                elif base_rev == 0 and totals_rev[idx] > 0:
+                    pct_diff_vs_base = 100.0
+                else:
+                    pct_diff_vs_base = 0.0
+
+                diff_rpm  = rpms[idx] - base_rpm
+                rpm_color = "#00CC96" if diff_rpm >= 0 else "#EF553B"
+                rpm_sign  = "+" if diff_rpm >= 0 else ""
+
+                spread_eff, reassign_eff = attr_spread[idx], attr_reassign[idx]
+
+                st.markdown(
+                    f"<div style='margin-bottom:0.5rem;'><b>2. Wyniki {scenario['name']}</b> &mdash; "
+                    f"Total Revenue: <span style='color:#00CC96;font-size:1.1em;font-weight:bold;'>"
+                    f"${totals_rev[idx]:,.2f}</span> "
+                    f"<span style='color:{diff_color};font-size:0.9em;font-weight:bold;'>"
+                    f"({diff_sign}${diff_vs_base:,.2f} / {diff_sign}{pct_diff_vs_base:,.2f}% vs {baseline_name})</span><br>"
+                    f"<span style='color:#888;font-size:0.9em;'>RPM: <b>${rpms[idx]:,.0f}</b></span> "
+                    f"<span style='color:{rpm_color};font-size:0.8em;font-weight:bold;'>({rpm_sign}${diff_rpm:,.0f})</span><br>"
+                    f"<span style='color:#888;font-size:0.85em;'>Efekt spreadu: <b>{'+' if spread_eff >= 0 else '-'}${abs(spread_eff):,.2f}</b>"
+                    f" | Efekt zmiany linii: <b>{'+' if reassign_eff >= 0 else '-'}${abs(reassign_eff):,.2f}</b></span></div>",
+                    unsafe_allow_html=True,
+                )
+
+            with perf.stage("tables"):
+                st.dataframe(
+                    results.style.format(results_format_dict),
+                    use_container_width=True,
+                    hide_index=True,
+                    height=TABLE_HEIGHT
+                )
+
+    pool = get_compute_pool()
+    st.caption(f"Wspólna pula obliczeń: zlecenia w toku {pool.queue_depth} / {pool.max_pending}, "
+               f"połączone identyczne zlecenia: {pool.coalesced}")
+
+    render_library_section(tab_name, vol_dist_df, scenarios, edited_obs, OrderBook.from_frame(default_ob_df),
+                           lot_price, spread_multiplier)
+
+    # Dalsze porównania tylko dla scenariuszy z wynikami
+    scored = [(idx, s, ob, r) for idx, (s, ob, r) in enumerate(zip(scenarios, edited_obs, all_results)) if not r.empty]
+    results_base = all_results[base_idx]
 
-        edited_ob_a = st.data_editor(
-            default_ob_df.copy(),
-            num_rows="dynamic",
-            use_container_width=True,
-            hide_index=True,
-            key=f"ob_a_{tab_name}",
-            height=TABLE_HEIGHT,
-        )
+    st.divider()
 
-        errors_a = validate_order_book(edited_ob_a)
-        if errors_a:
-            for err in errors_a:
-                st.error(f"Order Book A — {err}")
-            return
+    # ==========================================
+    # SEKCJA: FILL RATE PER LINE
+    # ==========================================
+    st.header(f"Fill Rate per OB Line — {tab_name}")
 
-        results_a = calculate_per_bucket_revenue(edited_ob_a, vol_dist_df, lot_price, spread_multiplier)
-        if results_a.empty:
-            st.warning("Brak wyników dla Scenariusza A. Sprawdź dane wejściowe.")
-            return
+    with perf.stage("fill_rate"):
+        fills = {idx: calculate_fill_rate_per_line(results, ob, lot_price) for idx, _, ob, results in scored}
+
+    with perf.stage("tables"):
+        fill_columns: list = []
+        for start in range(0, len(scored), 2):
+            fill_columns.extend(st.columns(2))
+
+        for col, (idx, scenario, _, _) in zip(fill_columns, scored):
+            with col:
+                st.markdown(f"**Scenariusz {scenario_label(scenario)}**")
+                st.dataframe(
+                    fills[idx].style.format(fill_rate_format_dict),
+                    use_container_width=True,
+                    hide_index=True
+                )
+
+    with perf.stage("chart_fill"):
+        fig_fill = make_subplots(specs=[[{"secondary_y": True}]])
+
+        for idx, scenario, _, _ in scored:
+            fig_fill.add_trace(go.Bar(
+                x=fills[idx]["OB Line"].astype(str),
+                y=fills[idx]["Fill Volume (%)"],
+                name=f"Fill Volume % — {scenario_label(scenario)}",
+                marker_color=scenario_color(idx, "#5B9BD5", "#70AD47"),
+                opacity=0.85,
+            ), secondary_y=False)
+
+        for idx, scenario, _, _ in scored:
+            fig_fill.add_trace(go.Scatter(
+                x=fills[idx]["OB Line"].astype(str),
+                y=fills[idx]["Fill Count"],
+                name=f"Fill Count — {scenario['name']}",
+                mode="lines+markers",
+                marker_color=scenario_color(idx, "#EF553B", "#FFA15A"),
+                line=dict(width=2, dash="dot" if idx == 0 else "dash"),
+            ), secondary_y=True)
+
+        fig_fill.update_layout(
+            title="Udział wolumenu (%) i liczba użyć per linia OB",
+            barmode="group",
+            xaxis_title="OB Line",
+            hovermode="x unified",
+            margin=dict(l=0, r=0, t=50, b=0),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        )
+        fig_fill.update_yaxes(title_text="Fill Volume (%)", secondary_y=False)
+        fig_fill.update_yaxes(title_text="Fill Count (liczba bucketów)", secondary_y=True, showgrid=False)
+
+        st.plotly_chart(fig_fill, use_container_width=True, key=f"chart_fill_{tab_name}")
 
-        total_rev_a      = results_a["Revenue_USD"].sum()
-        total_turnover_a = results_a["Turnover_USD"].sum()
-        rpm_a            = (total_rev_a / total_turnover_a * 1_000_000) if total_turnover_a > 0 else 0.0
+    st.divider()
 
-        st.markdown(
-            f"<div style='margin-bottom:0.5rem;'><b>2. Wyniki A</b> &mdash; "
-            f"Total Revenue: <span style='color:#EF553B;font-size:1.1em;font-weight:bold;'>"
-            f"${total_rev_a:,.2f}</span> "
-            f"<span style='color:#888;font-size:0.9em;margin-left:10px;'>| RPM: <b>${rpm_a:,.0f}</b></span></div>",
-            unsafe_allow_html=True,
+    # ==========================================
+    # SEKCJA: PORÓWNANIE ORDER BOOKÓW — Lot Sizes & Spreads
+    # ==========================================
+    st.header(f"Order Book — porównanie scenariuszy — {tab_name}")
+
+    with perf.stage("chart_ob"):
+        n = min(len(ob) for ob in edited_obs)
+        ob_lines_str = [str(x) for x in edited_obs[base_idx].lines[:n].tolist()]
+        asks    = [ob.ask for ob in edited_obs]
+        spreads = [ob.spread for ob in edited_obs]
+
+        fig_ob = make_subplots(
+            rows=1, cols=2,
+            subplot_titles=("Lot Sizes per scenariusz", "Spreads per scenariusz"),
+            horizontal_spacing=0.10,
         )
-        
-        st.dataframe(
-            results_a.style.format(results_format_dict), 
-            use_container_width=True, 
-            hide_index=True, 
-            height=TABLE_HEIGHT
+
+        for idx, scenario in enumerate(scenarios):
+            fig_ob.add_trace(go.Bar(
+                x=ob_lines_str,
+                y=asks[idx][:n],
+                name=f"{scenario['desc'] or scenario['name']} (Ask Size)",
+                marker_color=scenario_color(idx, "#5B9BD5", "#70AD47"),
+                opacity=0.85,
+            ), row=1, col=1)
+
+        fixed_lines_count = min(2, n)
+        max_spr = max(float(s[:n].max()) for s in spreads) * 1.1 if n else 0
+
+        fig_ob.add_trace(go.Scatter(
+            x=ob_lines_str[:fixed_lines_count] + ob_lines_str[:fixed_lines_count][::-1],
+            y=[max_spr] * fixed_lines_count + [0] * fixed_lines_count,
+            fill="toself",
+            fillcolor="rgba(255, 182, 193, 0.25)",
+            line=dict(color="rgba(255,182,193,0)"),
+            name="Fixed (Lines 1-2)",
+            showlegend=True,
+            hoverinfo="skip",
+        ), row=1, col=2)
+
+        for idx, scenario in enumerate(scenarios):
+            color = scenario_color(idx, "#5B9BD5", "#375623")
+            fig_ob.add_trace(go.Scatter(
+                x=ob_lines_str,
+                y=spreads[idx][:n],
+                name=f"{scenario['desc'] or scenario['name']} (Spread)",
+                mode="lines+markers",
+                marker=dict(symbol="circle" if idx == 0 else "square", size=8, color=color),
+                line=dict(color=color, width=2),
+            ), row=1, col=2)
+
+        fig_ob.update_layout(
+            barmode="group",
+            hovermode="x unified",
+            height=420,
+            margin=dict(l=0, r=0, t=60, b=0),
+            legend=dict(orientation="h", yanchor="bottom", y=1.08, xanchor="right", x=1),
         )
+        fig_ob.update_xaxes(title_text="OB Line", row=1, col=1)
+        fig_ob.update_xaxes(title_text="OB Line", row=1, col=2)
+        fig_ob.update_yaxes(title_text="Lot Capacity", row=1, col=1)
+        fig_ob.update_yaxes(title_text="Spread (points)", row=1, col=2)
 
-    # --- Scenariusz B (Optimized) ---
-    with col_right:
-        st.header(f"Scenariusz B — {tab_name} (Optimized)")
-        st.markdown("**1. Edytuj Order Book B**")
+        st.plotly_chart(fig_ob, use_container_width=True, key=f"chart_ob_{tab_name}")
 
-        edited_ob_b = st.data_editor(
-            (default_ob_df_b if default_ob_df_b is not None else default_ob_df).copy(),
-            num_rows="dynamic",
-            use_container_width=True,
-            hide_index=True,
-            key=f"ob_b_{tab_name}",
-            height=TABLE_HEIGHT,
+    # ==========================================
+    # SEKCJA: PRZYCHOD — porownanie scenariuszy z bazowym
+    # ==========================================
+    st.header(f"Porównanie Przychodów — {tab_name}")
+
+    with perf.stage("chart_rev"):
+        fig_rev = make_subplots(specs=[[{"secondary_y": True}]])
+
+        for idx, scenario, _, results in scored:
+            fig_rev.add_trace(go.Bar(
+                x=results["Volume_Bucket"], y=results["Revenue_USD"],
+                name=f"Scenariusz {scenario_title(scenario)} (USD)",
+                marker_color=scenario_color(idx, "#EF553B", "#00CC96"),
+            ), secondary_y=False)
+
+        for idx, scenario, _, results in scored:
+            if idx == base_idx:
+                continue
+            fig_rev.add_trace(go.Scatter(
+                x=results["Volume_Bucket"],
+                y=pct_diff(results["Revenue_USD"], results_base["Revenue_USD"]),
+                name=f"Różnica {scenario['name']} vs {baseline_name} (%)",
+                mode="lines+markers",
+                marker_color=scenario_color(idx, "#FFA15A", "#FFA15A"),
+                line=dict(width=3, dash="dot"),
+            ), secondary_y=True)
+
+        fig_rev.update_layout(
+            barmode="group",
+            xaxis_title="Przedział Wolumenu (Volume Bucket)",
+            hovermode="x unified",
+            margin=dict(l=0, r=0, t=40, b=0),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        )
+        fig_rev.update_yaxes(title_text="Przychód (USD)", secondary_y=False)
+        fig_rev.update_yaxes(
+            title_text="Zmiana (%)", secondary_y=True,
+            showgrid=False, tickformat=".1f", ticksuffix="%",
         )
 
-        errors_b = validate_order_book(edited_ob_b)
-        if errors_b:
-            for err in errors_b:
-                st.error(f"Order Book B — {err}")
-            return
+        st.plotly_chart(fig_rev, use_container_width=True, key=f"chart_rev_{tab_name}")
 
-        results_b = calculate_per_bucket_revenue(edited_ob_b, vol_dist_df, lot_price, spread_multiplier)
+    compared = [(idx, scenario) for idx, scenario, _, _ in scored if idx != base_idx]
+    if compared:
+        render_attribution_section(tab_name, attribution, compared, baseline_name)
 
-        if results_b.empty:
-            st.warning("Brak wyników dla Scenariusza B. Sprawdź dane wejściowe.")
-            return
+    if not all_results[0].empty and not all_results[1].empty:
+        render_solver_section(tab_name, edited_ob_b, comparison.line_volumes[1], totals_rev[0], totals_rev[1],
+                              totals_turnover[1], spread_multiplier)
 
-        total_rev_b      = results_b["Revenue_USD"].sum()
-        total_turnover_b = results_b["Turnover_USD"].sum()
-        rpm_b            = (total_rev_b / total_turnover_b * 1_000_000) if total_turnover_b > 0 else 0.0
+    demand = render_elasticity_section(tab_name, vol_dist_df, scenarios, edited_obs, base_idx, totals_rev,
+                                       lot_price, spread_multiplier, segment_panel)
+    render_frontier_section(tab_name, vol_dist_df, edited_ob_b, lot_price, spread_multiplier, demand)
 
-        # Wyliczanie różnicy w dolarach
-        diff_vs_a  = total_rev_b - total_rev_a
-        diff_color = "#00CC96" if diff_vs_a >= 0 else "#EF553B"
-        diff_sign  = "+" if diff_vs_a >= 0 else ""
+    if period_panel is not None:
+        render_period_section(tab_name, period_panel, edited_ob_a, edited_ob_b, lot_price, spread_multiplier)
+        render_schedule_section(tab_name, period_panel, edited_ob_a, edited_ob_b, lot_price, spread_multiplier)
 
-        # Wyliczanie różnicy w procentach
-        if total_rev_a > 0:
-            pct_diff_vs_a = (diff_vs_a / total_rev_a) * 100
-        elif total_rev_a == 0 and total_rev_b > 0:
-            pct_diff_vs_a = 100.0
-        else:
-            pct_diff_vs_a = 0.0
-
-        diff_rpm  = rpm_b - rpm_a
-        rpm_color = "#00CC96" if diff_rpm >= 0 else "#EF553B"
-        rpm_sign  = "+" if diff_rpm >= 0 else ""
-
-        st.markdown(
-            f"<div style='margin-bottom:0.5rem;'><b>2. Wyniki B</b> &mdash; "
-            f"Total Revenue: <span style='color:#00CC96;font-size:1.1em;font-weight:bold;'>"
-            f"${total_rev_b:,.2f}</span> "
-            f"<span style='color:{diff_color};font-size:0.9em;font-weight:bold;'>"
-            f"({diff_sign}${diff_vs_a:,.2f} / {diff_sign}{pct_diff_vs_a:,.2f}% vs A)</span><br>"
-            f"<span style='color:#888;font-size:0.9em;'>RPM: <b>${rpm_b:,.0f}</b></span> "
-            f"<span style='color:{rpm_color};font-size:0.8em;font-weight:bold;'>({rpm_sign}${diff_rpm:,.0f})</span></div>",
-            unsafe_allow_html=True,
-        )
-        
-        st.dataframe(
-            results_b.style.format(results_format_dict), 
-            use_container_width=True, 
-            hide_index=True, 
-            height=TABLE_HEIGHT
-        )
+    if segment_panel is not None:
+        render_segment_section(tab_name, segment_panel, edited_ob_a, edited_ob_b, lot_price, spread_multiplier)
 
-    st.divider()
+    render_live_section(tab_name, vol_dist_df, edited_ob_a, edited_ob_b, lot_price, spread_multiplier)
 
     # ==========================================
-    # SEKCJA: FILL RATE PER LINE
+    # EKSPORT DO EXCELA
     # ==========================================
-    st.header(f"Fill Rate per OB Line — {tab_name}")
+    st.write("---")
+    # Skoroszyt budowany dopiero po kliknięciu (openpyxl importowany przez pandas tylko wtedy)
+    @perf.timed("excel")
+    def excel_export() -> bytes:
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine="openpyxl") as writer:
+            for idx, scenario, _, results in scored:
+                if idx != base_idx:
+                    results = results.assign(Pct_Diff=pct_diff(results["Revenue_USD"], results_base["Revenue_USD"]))
+                results.to_excel(writer, sheet_name=f"Scenariusz {scenario['name']}", index=False)
+                if idx != base_idx:
+                    attribution.frame(idx).to_excel(writer, sheet_name=f"Atrybucja {scenario['name']}", index=False)
+            for idx, scenario, _, _ in scored:
+                fills[idx].to_excel(writer, sheet_name=f"Fill Rate {scenario['name']}", index=False)
+
+            # Aplikujemy formatowanie tysięczne i finansowe bezpośrednio do arkuszy Excel
+            for sheet_name in writer.sheets:
+                worksheet = writer.sheets[sheet_name]
+                for row in worksheet.iter_rows(min_row=2):
+                    for cell in row:
+                        if isinstance(cell.value, (int, float)):
+                            cell.number_format = '#,##0.00'
+
+        return output.getvalue()
 
-    fill_a = calculate_fill_rate_per_line(results_a, edited_ob_a, lot_price)
-    fill_b = calculate_fill_rate_per_line(results_b, edited_ob_b, lot_price)
+    st.download_button(
+        label=f"Pobierz wyniki {tab_name} jako Excel",
+        data=excel_export,
+        file_name=f"symulacja_ab_revenue_{tab_name.lower().replace(' ', '_').replace(':', '')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key=f"download_btn_{tab_name}",
+    )
 
-    col_fill_left, col_fill_right = st.columns(2)
+# ==========================================
+# 5a. SZEREG CZASOWY (ROZKŁADY PER OKRES)
+# ==========================================
+@perf.timed("periods")
+def render_period_section(tab_name: str, panel: PanelDistribution, ob_a: OrderBook, ob_b: OrderBook,
+                          lot_price: float, spread_multiplier: float) -> None:
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
-    with col_fill_left:
-        st.markdown("**Scenariusz A (Current)**")
-        st.dataframe(
-            fill_a.style.format(fill_rate_format_dict), 
-            use_container_width=True, 
-            hide_index=True
-        )
+    st.divider()
+    st.header(f"Szereg czasowy — {tab_name}")
 
-    with col_fill_right:
-        st.markdown("**Scenariusz B (Optimized)**")
-        st.dataframe(
-            fill_b.style.format(fill_rate_format_dict), 
-            use_container_width=True, 
-            hide_index=True
-        )
+    n_periods = len(panel.keys)
+    window = st.slider(
+        "Okno kroczące (liczba okresów)", min_value=1, max_value=max(n_periods, 2),
+        value=min(7, n_periods), key=f"period_window_{tab_name}",
+    )
 
-    fig_fill = make_subplots(specs=[[{"secondary_y": True}]])
-
-    fig_fill.add_trace(go.Bar(
-        x=fill_a["OB Line"].astype(str),
-        y=fill_a["Fill Volume (%)"],
-        name="Fill Volume % — A (Current)",
-        marker_color="#5B9BD5",
-        opacity=0.85,
-    ), secondary_y=False)
-
-    fig_fill.add_trace(go.Bar(
-        x=fill_b["OB Line"].astype(str),
-        y=fill_b["Fill Volume (%)"],
-        name="Fill Volume % — B (Optimized)",
-        marker_color="#70AD47",
-        opacity=0.85,
-    ), secondary_y=False)
-
-    fig_fill.add_trace(go.Scatter(
-        x=fill_a["OB Line"].astype(str),
-        y=fill_a["Fill Count"],
-        name="Fill Count — A",
-        mode="lines+markers",
-        marker_color="#EF553B",
-        line=dict(width=2, dash="dot"),
-    ), secondary_y=True)
-
-    fig_fill.add_trace(go.Scatter(
-        x=fill_b["OB Line"].astype(str),
-        y=fill_b["Fill Count"],
-        name="Fill Count — B",
-        mode="lines+markers",
-        marker_color="#FFA15A",
-        line=dict(width=2, dash="dash"),
-    ), secondary_y=True)
-
-    fig_fill.update_layout(
-        title="Udział wolumenu (%) i liczba użyć per linia OB",
+    # Jedno mnożenie macierzowe na scenariusz — wszystkie okresy naraz
+    scores_a = score_panel(ob_a, panel, lot_price, spread_multiplier)
+    scores_b = score_panel(ob_b, panel, lot_price, spread_multiplier)
+
+    rolling = pd.DataFrame({"Period": panel.keys})
+    for label, scores in [("A", scores_a), ("B", scores_b)]:
+        rev_roll = scores["Revenue_USD"].rolling(window, min_periods=1).sum()
+        turn_roll = scores["Turnover_USD"].rolling(window, min_periods=1).sum()
+        rolling[f"Revenue_{label}"] = scores["Revenue_USD"]
+        rolling[f"RPM_{label}"] = scores["RPM"]
+        rolling[f"Rolling_Revenue_{label}"] = rev_roll
+        rolling[f"Rolling_RPM_{label}"] = (rev_roll / turn_roll * 1_000_000).where(turn_roll > 0, 0.0)
+
+    last = rolling.iloc[-1]
+    diff = last["Rolling_Revenue_B"] - last["Rolling_Revenue_A"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"Revenue A — ostatnie {window} okr.", f"${last['Rolling_Revenue_A']:,.2f}",
+              f"RPM ${last['Rolling_RPM_A']:,.0f}", delta_color="off")
+    c2.metric(f"Revenue B — ostatnie {window} okr.", f"${last['Rolling_Revenue_B']:,.2f}",
+              f"RPM ${last['Rolling_RPM_B']:,.0f}", delta_color="off")
+    c3.metric("Różnica B vs A (okno)", f"${diff:,.2f}")
+
+    fig_ts = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                           subplot_titles=("Revenue per okres i suma krocząca", "RPM per okres"))
+    fig_ts.add_trace(go.Bar(x=rolling["Period"], y=rolling["Revenue_A"], name="Revenue A",
+                            marker_color="#EF553B", opacity=0.6), row=1, col=1)
+    fig_ts.add_trace(go.Bar(x=rolling["Period"], y=rolling["Revenue_B"], name="Revenue B",
+                            marker_color="#00CC96", opacity=0.6), row=1, col=1)
+    fig_ts.add_trace(go.Scatter(x=rolling["Period"], y=rolling["Rolling_Revenue_A"], name=f"Suma {window} okr. — A",
+                                mode="lines", line=dict(color="#EF553B", width=2)), row=1, col=1)
+    fig_ts.add_trace(go.Scatter(x=rolling["Period"], y=rolling["Rolling_Revenue_B"], name=f"Suma {window} okr. — B",
+                                mode="lines", line=dict(color="#00CC96", width=2)), row=1, col=1)
+    fig_ts.add_trace(go.Scatter(x=rolling["Period"], y=rolling["RPM_A"], name="RPM A",
+                                mode="lines+markers", marker_color="#EF553B"), row=2, col=1)
+    fig_ts.add_trace(go.Scatter(x=rolling["Period"], y=rolling["RPM_B"], name="RPM B",
+                                mode="lines+markers", marker_color="#00CC96"), row=2, col=1)
+    fig_ts.update_layout(
         barmode="group",
-        xaxis_title="OB Line",
         hovermode="x unified",
-        margin=dict(l=0, r=0, t=50, b=0),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        height=560,
+        margin=dict(l=0, r=0, t=60, b=0),
+        legend=dict(orientation="h", yanchor="bottom", y=1.05, xanchor="right", x=1),
     )
-    fig_fill.update_yaxes(title_text="Fill Volume (%)", secondary_y=False)
-    fig_fill.update_yaxes(title_text="Fill Count (liczba bucketów)", secondary_y=True, showgrid=False)
+    fig_ts.update_yaxes(title_text="Przychód (USD)", row=1, col=1)
+    fig_ts.update_yaxes(title_text="RPM", row=2, col=1)
+    st.plotly_chart(fig_ts, use_container_width=True, key=f"chart_periods_{tab_name}")
+
+    with st.expander("Tabela per okres"):
+        st.dataframe(
+            rolling.style.format({c: "{:,.2f}" for c in rolling.columns if c != "Period"}),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    key_revenue = np.column_stack([scores_a["Revenue_USD"].to_numpy(), scores_b["Revenue_USD"].to_numpy()])
+    render_bootstrap_section(tab_name, key_revenue)
 
-    st.plotly_chart(fig_fill, use_container_width=True, key=f"chart_fill_{tab_name}")
 
+# ==========================================
+# 5b. HARMONOGRAM ORDER BOOKÓW PER SESJA
+# ==========================================
+@perf.timed("schedule")
+def render_schedule_section(tab_name: str, panel: PanelDistribution, ob_a: OrderBook, ob_b: OrderBook,
+                            lot_price: float, spread_multiplier: float) -> None:
     st.divider()
+    st.header(f"Harmonogram sesji — {tab_name}")
+
+    hours = pd.to_datetime(pd.Series(panel.keys), errors="coerce").dt.hour
+    if hours.nunique() < 2:
+        st.caption("Harmonogram sesji wymaga rozkładu godzinowego (`clean_csv.py ingest --period hour`).")
+        return
+
+    window_volumes = group_panel(panel, hour_window_index(panel.keys, SESSION_WINDOWS), len(SESSION_WINDOWS))
+    names = [name for name, _, _ in SESSION_WINDOWS]
+
+    books_a, books_b, errors = [], [], []
+    with st.expander("Order Booki per sesja (domyślnie kopia Order Book A i B)"):
+        for col, (name, start, end) in zip(st.columns(len(SESSION_WINDOWS)), SESSION_WINDOWS):
+            with col:
+                st.markdown(f"**{name}** ({start:02d}:00–{end:02d}:00 UTC)")
+                for label, base, books in [("A", ob_a, books_a), ("B", ob_b, books_b)]:
+                    edited = st.data_editor(
+                        base.frame(),
+                        num_rows="dynamic",
+                        use_container_width=True,
+                        hide_index=True,
+                        key=f"ob_sched_{label.lower()}_{name}_{tab_name}",
+                    )
+                    try:
+                        books.append(OrderBook.from_frame(edited))
+                    except InvalidOrderBook as e:
+                        errors += [f"{name} — Order Book {label} — {err}" for err in e.errors]
+
+    if errors:
+        for err in errors:
+            st.error(err)
+        return
+
+    # Wszystkie okna A i B w jednym przebiegu silnika: scenariusz i ma własny rozkład okna
+    score = score_batch_reduced(books_a + books_b, panel.bucket_ends, np.vstack([window_volumes, window_volumes]),
+                                lot_price, spread_multiplier, MEMORY_BUDGET_MB)
+    n = len(names)
+    rev_a, rev_b = score.revenue[:n], score.revenue[n:]
+    turnover = score.turnover[:n]
+    volume = score.volume[:n]
+
+    summary = pd.DataFrame({
+        "Sesja":           names + ["Łącznie (blended)"],
+        "Filled_Volume":   np.append(volume, volume.sum()),
+        "Udział (%)":      np.append(volume / volume.sum() * 100 if volume.sum() > 0 else np.zeros(n), 100.0),
+        "Revenue_A":       np.append(rev_a, rev_a.sum()),
+        "Revenue_B":       np.append(rev_b, rev_b.sum()),
+        "Turnover_USD":    np.append(turnover, turnover.sum()),
+    })
+    summary["RPM_A"] = (summary["Revenue_A"] / summary["Turnover_USD"] * 1_000_000).where(summary["Turnover_USD"] > 0, 0.0)
+    summary["RPM_B"] = (summary["Revenue_B"] / summary["Turnover_USD"] * 1_000_000).where(summary["Turnover_USD"] > 0, 0.0)
+    summary["Różnica B−A"] = summary["Revenue_B"] - summary["Revenue_A"]
+
+    st.dataframe(
+        summary.style.format({
+            "Filled_Volume": "{:,.2f}", "Udział (%)": "{:,.1f}", "Revenue_A": "{:,.2f}", "Revenue_B": "{:,.2f}",
+            "Turnover_USD": "{:,.2f}", "RPM_A": "{:,.0f}", "RPM_B": "{:,.0f}", "Różnica B−A": "{:,.2f}",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
 
-    # ==========================================
-    # SEKCJA: CURRENT vs OPTIMIZED — Lot Sizes & Spreads
-    # ==========================================
-    st.header(f"Order Book — Current vs Optimized — {tab_name}")
+    # Fill Volume (%) per linia w każdej sesji
+    st.markdown("**Fill Volume (%) per linia OB w każdej sesji**")
+    col_fill_a, col_fill_b = st.columns(2)
+    for col, label, rows in [(col_fill_a, "A", slice(0, n)), (col_fill_b, "B", slice(n, 2 * n))]:
+        line_volume = score.line_volume[rows]
+        share = np.divide(line_volume * 100, volume[:, None], out=np.zeros_like(line_volume), where=volume[:, None] > 0)
+        fill = pd.DataFrame(share, columns=[f"Linia {i + 1}" for i in range(share.shape[1])])
+        fill.insert(0, "Sesja", names)
+        with col:
+            st.markdown(f"Scenariusz {label}")
+            st.dataframe(fill.style.format({c: "{:,.1f}" for c in fill.columns if c != "Sesja"}),
+                         use_container_width=True, hide_index=True)
+
+
+# ==========================================
+# 5c. SEGMENTY KLIENTÓW
+# ==========================================
+@perf.timed("segments")
+def render_segment_section(tab_name: str, panel: PanelDistribution, ob_a: OrderBook, ob_b: OrderBook,
+                           lot_price: float, spread_multiplier: float) -> None:
+    st.divider()
+    st.header(f"Segmenty klientów — {tab_name}")
+
+    # Segmenty × scenariusze liczone raz; zmiana wag poniżej tylko łączy gotowe sumy
+    score = score_segments([ob_a, ob_b], panel, lot_price, spread_multiplier)
+    total_volume = score.volume.sum()
+
+    per_segment = pd.DataFrame({
+        "Segment":       score.keys,
+        "Filled_Volume": score.volume,
+        "Udział (%)":    score.volume / total_volume * 100 if total_volume > 0 else 0.0,
+        "Revenue_A":     score.revenue[:, 0],
+        "Revenue_B":     score.revenue[:, 1],
+        "RPM_A":         score.rpm[:, 0],
+        "RPM_B":         score.rpm[:, 1],
+    })
+    per_segment["Różnica B−A"] = per_segment["Revenue_B"] - per_segment["Revenue_A"]
+    st.dataframe(
+        per_segment.style.format({
+            "Filled_Volume": "{:,.2f}", "Udział (%)": "{:,.1f}", "Revenue_A": "{:,.2f}", "Revenue_B": "{:,.2f}",
+            "RPM_A": "{:,.0f}", "RPM_B": "{:,.0f}", "Różnica B−A": "{:,.2f}",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
 
-    ob_lines = edited_ob_a["OB Line"].tolist() if "OB Line" in edited_ob_a.columns else list(range(1, len(edited_ob_a) + 1))
+    render_segment_mix(tab_name, score)
 
-    ask_a = pd.to_numeric(edited_ob_a["Ask Size"], errors="coerce").tolist()
-    ask_b = pd.to_numeric(edited_ob_b["Ask Size"], errors="coerce").tolist()
-    spr_a = pd.to_numeric(edited_ob_a["Spread"],   errors="coerce").tolist()
-    spr_b = pd.to_numeric(edited_ob_b["Spread"],   errors="coerce").tolist()
 
-    n = min(len(ob_lines), len(ask_a), len(ask_b), len(spr_a), len(spr_b))
-    ob_lines_str = [str(x) for x in ob_lines[:n]]
+@st.fragment
+def render_segment_mix(tab_name: str, score: SegmentScore) -> None:
+    """Fragment — zmiana wag przelicza tylko tę sekcję na podstawie sum per segment."""
+    st.markdown("**Mieszanka segmentów** — waga 1.0 = flow jak w danych, 0 = segment pominięty")
+    weights = []
+    for col, key in zip(st.columns(len(score.keys)), score.keys):
+        with col:
+            weights.append(st.number_input(str(key), min_value=0.0, value=1.0, step=0.1,
+                                           key=f"segment_weight_{key}_{tab_name}"))
 
-    fig_ob = make_subplots(
-        rows=1, cols=2,
-        subplot_titles=("Lot Sizes: Current vs Optimized", "Spreads: Current vs Optimized"),
-        horizontal_spacing=0.10,
+    revenue, turnover = score.mix(weights)
+    rpm = revenue / turnover * 1_000_000 if turnover > 0 else np.zeros_like(revenue)
+    diff = revenue[1] - revenue[0]
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Revenue A (mix)", f"${revenue[0]:,.2f}", f"RPM ${rpm[0]:,.0f}", delta_color="off")
+    c2.metric("Revenue B (mix)", f"${revenue[1]:,.2f}", f"RPM ${rpm[1]:,.0f}", delta_color="off")
+    c3.metric("Różnica B vs A (mix)", f"${diff:,.2f}", f"{diff / revenue[0] * 100:,.2f}%" if revenue[0] > 0 else None)
+
+
+# ==========================================
+# 5d. TRYB LIVE
+# ==========================================
+LIVE_MIN_REFRESH_S = 1.0   # Dolny limit częstotliwości odświeżania sekcji live
+
+
+@perf.timed("live")
+def render_live_section(tab_name: str, vol_dist_df: pd.DataFrame, ob_a: OrderBook, ob_b: OrderBook,
+                        lot_price: float, spread_multiplier: float) -> None:
+    st.divider()
+    st.header(f"Tryb live — dzisiejszy flow — {tab_name}")
+
+    if not st.toggle("Włącz tryb live", key=f"live_on_{tab_name}"):
+        st.caption("Tryb live śledzi lokalny plik z transakcjami (append-only) i na bieżąco liczy przychód A i B.")
+        return
+
+    slug = tab_name.lower().replace(" ", "_")
+    col_path, col_refresh = st.columns([3, 1])
+    with col_path:
+        path = st.text_input("Plik z transakcjami (CSV, kolumna `volume`)", value=f"fills_live_{slug}.csv",
+                             key=f"live_path_{tab_name}")
+    with col_refresh:
+        refresh_s = st.number_input("Odświeżanie (s)", min_value=LIVE_MIN_REFRESH_S, value=5.0, step=1.0,
+                                    key=f"live_refresh_{tab_name}")
+
+    ends = parse_bucket_ends(vol_dist_df["volume_range"])
+    ends = ends[np.isfinite(ends)]
+
+    state_key = f"live_state_{tab_name}"
+    state = st.session_state.get(state_key)
+    # Zmiana rozdzielczości zmienia granice bucketów — wolumeny trzeba zbudować od nowa z całego pliku
+    if state is None or state[0].path != path or not np.array_equal(state[1].bucket_ends, ends):
+        state = (FillTail(path), LiveDistribution(ends, lot_price, spread_multiplier))
+        st.session_state[state_key] = state
+    tail, live = state
+
+    # Zmiana Order Booka (lub mnożnika) przelicza sumy raz; kolejne transakcje aktualizują już tylko przyrosty
+    live.set_pricing(lot_price, spread_multiplier)
+    live.set_scenario("A", bucket_spreads(ob_a, ends), ob_a.fingerprint)
+    live.set_scenario("B", bucket_spreads(ob_b, ends), ob_b.fingerprint)
+
+    @st.fragment(run_every=max(float(refresh_s), LIVE_MIN_REFRESH_S))
+    def live_view() -> None:
+        import plotly.graph_objects as go
+
+        try:
+            sizes = tail.poll()
+            if tail.restarted:   # nowy plik (rotacja) — dzisiejszy flow liczony od zera
+                live.reset()
+            live.apply(sizes)
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+        rev_a, rev_b = live.revenue["A"], live.revenue["B"]
+        diff = rev_b - rev_a
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Transakcje / wolumen", f"{live.fill_count:,}", f"{live.total_volume:,.2f} lot", delta_color="off")
+        c2.metric("Revenue A (Current)", f"${rev_a:,.2f}", f"RPM ${live.rpm('A'):,.0f}", delta_color="off")
+        c3.metric("Revenue B (Optimized)", f"${rev_b:,.2f}", f"RPM ${live.rpm('B'):,.0f}", delta_color="off")
+        c4.metric("Różnica B vs A", f"${diff:,.2f}", f"{diff / rev_a * 100:,.2f}%" if rev_a > 0 else None)
+
+        fig_live = go.Figure(go.Bar(x=ends, y=live.volumes, marker_color="#5B9BD5", name="Wolumen dziś"))
+        fig_live.update_layout(
+            xaxis_title="Górna granica bucketu (loty)",
+            yaxis_title="Wolumen (loty)",
+            height=280,
+            margin=dict(l=0, r=0, t=20, b=0),
+        )
+        st.plotly_chart(fig_live, use_container_width=True, key=f"chart_live_{tab_name}")
+
+    live_view()
+
+
+# ==========================================
+# 5e. PORTFOLIO — WSZYSTKIE INSTRUMENTY
+# ==========================================
+@perf.timed("portfolio")
+def render_portfolio(registry: dict[str, Instrument]) -> None:
+    import plotly.graph_objects as go
+
+    st.header("Portfolio — wszystkie instrumenty i rynki")
+    st.caption("Scenariusz A i B każdego rynku to ostatnio edytowane Order Booki z jego zakładki (lub domyślne z rejestru), "
+               "liczone w rozdzielczości bucketów wybranej w tej zakładce.")
+
+    cache = get_result_cache()
+    current = st.session_state.get("current_obs", {})
+    current_edges = st.session_state.get("current_edges", {})
+
+    # (instrument, rynek, scenariusz, klucz cache, argumenty silnika)
+    jobs = []
+    for inst in registry.values():
+        for market in inst.markets:
+            vol_dist_df = market_distribution(market)
+            if vol_dist_df.empty:
+                continue
+            # Ta sama rozdzielczość co w zakładce rynku — te same sumy i te same wpisy cache
+            edges = current_edges.get(market.key)
+            if edges is not None:
+                identity = get_file_fingerprints().identity(market.distribution)
+                vol_dist_df = rebinned_distribution(market.key, identity, edges, vol_dist_df)
+            obs = current.get(market.key) or default_order_books(market)
+            for side, ob in zip(("A", "B"), obs):
+                key = scenario_key(market.key, vol_dist_df, ob, inst.lot_price, inst.spread_multiplier)
+                jobs.append((inst, market, side, key, (ob, vol_dist_df, inst.lot_price, inst.spread_multiplier)))
+
+    # Liczone są tylko brakujące wpisy — równolegle w puli procesów
+    missing = {key: args for _, _, _, key, args in jobs if key not in cache}
+    if missing:
+        pool = get_worker_pool()
+        with st.spinner(f"Liczenie {len(missing)} scenariuszy..."):
+            futures = {pool.submit(score_order_book, *args): key for key, args in missing.items()}
+            for future in as_completed(futures):
+                cache.put(futures[future], future.result())
+
+    totals = {}
+    for inst, market, side, key, _ in jobs:
+        results, _ = cache.get(key)
+        entry = totals.setdefault((inst.symbol, market.name), {"Instrument": inst.symbol, "Rynek": market.name})
+        entry[f"Revenue_{side}"] = results["Revenue_USD"].sum()
+        entry["Turnover_USD"] = results["Turnover_USD"].sum()
+
+    if not totals:
+        st.warning("Brak danych dla zarejestrowanych instrumentów.")
+        return
+
+    summary = pd.DataFrame(list(totals.values()))
+    grand = {"Instrument": "Łącznie", "Rynek": ""}
+    grand.update(summary[["Revenue_A", "Revenue_B", "Turnover_USD"]].sum().to_dict())
+    summary = pd.concat([summary, pd.DataFrame([grand])], ignore_index=True)
+
+    turnover = summary["Turnover_USD"]
+    summary["RPM_A"] = (summary["Revenue_A"] / turnover * 1_000_000).where(turnover > 0, 0.0)
+    summary["RPM_B"] = (summary["Revenue_B"] / turnover * 1_000_000).where(turnover > 0, 0.0)
+    summary["Różnica B−A"] = summary["Revenue_B"] - summary["Revenue_A"]
+    summary["Różnica B−A (%)"] = (summary["Różnica B−A"] / summary["Revenue_A"] * 100).where(summary["Revenue_A"] > 0, 0.0)
+
+    last = summary.iloc[-1]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Total Revenue A", f"${last['Revenue_A']:,.2f}", f"RPM ${last['RPM_A']:,.0f}", delta_color="off")
+    c2.metric("Total Revenue B", f"${last['Revenue_B']:,.2f}", f"RPM ${last['RPM_B']:,.0f}", delta_color="off")
+    c3.metric("Różnica B vs A", f"${last['Różnica B−A']:,.2f}", f"{last['Różnica B−A (%)']:,.2f}%")
+
+    st.dataframe(
+        summary.style.format({
+            "Revenue_A": "{:,.2f}", "Revenue_B": "{:,.2f}", "Turnover_USD": "{:,.2f}",
+            "RPM_A": "{:,.0f}", "RPM_B": "{:,.0f}", "Różnica B−A": "{:,.2f}", "Różnica B−A (%)": "{:,.2f}",
+        }),
+        use_container_width=True,
+        hide_index=True,
     )
 
-    fig_ob.add_trace(go.Bar(
-        x=ob_lines_str,
-        y=ask_a[:n],
-        name="Current (Ask Size)",
-        marker_color="#5B9BD5",
-        opacity=0.85,
-    ), row=1, col=1)
-
-    fig_ob.add_trace(go.Bar(
-        x=ob_lines_str,
-        y=ask_b[:n],
-        name="Optimized (Ask Size)",
-        marker_color="#70AD47",
-        opacity=0.85,
-    ), row=1, col=1)
-
-    fixed_lines_count = min(2, n)
-    max_spr = max(max(spr_a[:n]), max(spr_b[:n])) * 1.1
-
-    fig_ob.add_trace(go.Scatter(
-        x=ob_lines_str[:fixed_lines_count] + ob_lines_str[:fixed_lines_count][::-1],
-        y=[max_spr] * fixed_lines_count + [0] * fixed_lines_count,
-        fill="toself",
-        fillcolor="rgba(255, 182, 193, 0.25)",
-        line=dict(color="rgba(255,182,193,0)"),
-        name="Fixed (Lines 1-2)",
-        showlegend=True,
-        hoverinfo="skip",
-    ), row=1, col=2)
-
-    fig_ob.add_trace(go.Scatter(
-        x=ob_lines_str,
-        y=spr_a[:n],
-        name="Current (Spread)",
-        mode="lines+markers",
-        marker=dict(symbol="circle", size=8, color="#5B9BD5"),
-        line=dict(color="#5B9BD5", width=2),
-    ), row=1, col=2)
-
-    fig_ob.add_trace(go.Scatter(
-        x=ob_lines_str,
-        y=spr_b[:n],
-        name="Optimized (Spread)",
-        mode="lines+markers",
-        marker=dict(symbol="square", size=8, color="#375623"),
-        line=dict(color="#375623", width=2),
-    ), row=1, col=2)
-
-    fig_ob.update_layout(
+    per_market = summary.iloc[:-1]
+    labels = per_market["Rynek"] + " " + per_market["Instrument"]
+    fig_pf = go.Figure([
+        go.Bar(x=labels, y=per_market["Revenue_A"], name="Scenariusz A — Current (USD)", marker_color="#EF553B"),
+        go.Bar(x=labels, y=per_market["Revenue_B"], name="Scenariusz B — Optimized (USD)", marker_color="#00CC96"),
+    ])
+    fig_pf.update_layout(
         barmode="group",
-        hovermode="x unified",
-        height=420,
-        margin=dict(l=0, r=0, t=60, b=0),
-        legend=dict(orientation="h", yanchor="bottom", y=1.08, xanchor="right", x=1),
+        yaxis_title="Przychód (USD)",
+        margin=dict(l=0, r=0, t=40, b=0),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
     )
-    fig_ob.update_xaxes(title_text="OB Line", row=1, col=1)
-    fig_ob.update_xaxes(title_text="OB Line", row=1, col=2)
-    fig_ob.update_yaxes(title_text="Lot Capacity", row=1, col=1)
-    fig_ob.update_yaxes(title_text="Spread (points)", row=1, col=2)
+    st.plotly_chart(fig_pf, use_container_width=True, key="chart_portfolio")
 
-    st.plotly_chart(fig_ob, use_container_width=True, key=f"chart_ob_{tab_name}")
 
-    # ==========================================
-    # SEKCJA: PRZYCHOD — porownanie A vs B
-    # ==========================================
-    st.header(f"Porównanie Przychodów — {tab_name}")
+# ==========================================
+# 5f. ATRYBUCJA ZMIANY PRZYCHODU
+# ==========================================
+@perf.timed("attribution")
+def render_attribution_section(tab_name: str, attribution: RevenueAttribution,
+                               compared: list[tuple[int, dict]], baseline_name: str) -> None:
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    st.header(f"Atrybucja zmiany przychodu — {tab_name}")
+    st.caption(
+        "Zmiana przychodu każdego bucketu względem scenariusza bazowego rozbita na efekt spreadu "
+        "(ta sama linia, inny spread) i efekt zmiany linii (bucket trafia na inną linię przez zmianę Ask Size)."
+    )
 
-    pct_diff_list = []
-    for rev_a, rev_b in zip(results_a["Revenue_USD"], results_b["Revenue_USD"]):
-        if rev_a > 0:
-            pct = round(((rev_b - rev_a) / rev_a) * 100, 2)
-        elif rev_a == 0 and rev_b > 0:
-            pct = 100.0
-        else:
-            pct = 0.0
-        pct_diff_list.append(pct)
-
-    results_b = results_b.copy()
-    results_b["Pct_Diff"] = pct_diff_list
-
-    fig_rev = make_subplots(specs=[[{"secondary_y": True}]])
-
-    fig_rev.add_trace(go.Bar(
-        x=results_a["Volume_Bucket"], y=results_a["Revenue_USD"],
-        name="Scenariusz A — Current (USD)", marker_color="#EF553B",
-    ), secondary_y=False)
-
-    fig_rev.add_trace(go.Bar(
-        x=results_b["Volume_Bucket"], y=results_b["Revenue_USD"],
-        name="Scenariusz B — Optimized (USD)", marker_color="#00CC96",
-    ), secondary_y=False)
-
-    fig_rev.add_trace(go.Scatter(
-        x=results_b["Volume_Bucket"],
-        y=results_b["Pct_Diff"],
-        name="Różnica B vs A (%)",
-        mode="lines+markers",
-        marker_color="#FFA15A",
-        line=dict(width=3, dash="dot"),
-    ), secondary_y=True)
-
-    fig_rev.update_layout(
-        barmode="group",
+    labels = [scenario_label(s) for _, s in compared]
+    choice = st.selectbox("Scenariusz", labels, key=f"attribution_scenario_{tab_name}") if len(compared) > 1 else labels[0]
+    idx, scenario = compared[labels.index(choice)] if choice in labels else compared[0]
+
+    spread_total, reassign_total = attribution.totals()
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"Zmiana {scenario['name']} vs {baseline_name}", f"${spread_total[idx] + reassign_total[idx]:,.2f}")
+    c2.metric("Efekt spreadu", f"${spread_total[idx]:,.2f}")
+    c3.metric("Efekt zmiany linii", f"${reassign_total[idx]:,.2f}")
+
+    fig = make_subplots(specs=[[{"secondary_y": False}]])
+    fig.add_trace(go.Bar(x=attribution.labels, y=attribution.spread_effect[idx],
+                         name="Efekt spreadu (USD)", marker_color="#636EFA"))
+    fig.add_trace(go.Bar(x=attribution.labels, y=attribution.reassignment_effect[idx],
+                         name="Efekt zmiany linii (USD)", marker_color="#FFA15A"))
+    fig.add_trace(go.Scatter(x=attribution.labels, y=attribution.delta[idx], name="Zmiana łącznie (USD)",
+                             mode="lines+markers", marker_color="#00CC96", line=dict(width=2, dash="dot")))
+    fig.update_layout(
+        barmode="relative",
         xaxis_title="Przedział Wolumenu (Volume Bucket)",
+        yaxis_title="Zmiana przychodu (USD)",
         hovermode="x unified",
         margin=dict(l=0, r=0, t=40, b=0),
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
     )
-    fig_rev.update_yaxes(title_text="Przychód (USD)", secondary_y=False)
-    fig_rev.update_yaxes(
-        title_text="Zmiana (%)", secondary_y=True,
-        showgrid=False, tickformat=".1f", ticksuffix="%",
+    st.plotly_chart(fig, use_container_width=True, key=f"chart_attribution_{tab_name}")
+
+    # Sumy efektów per linia bazowego Order Booka
+    detail = attribution.frame(idx)
+    per_line = (detail.groupby("OB_Line_Base")[["Spread_Effect_USD", "Reassignment_Effect_USD", "Delta_USD"]]
+                .sum().reset_index())
+    st.dataframe(
+        per_line.style.format({c: "{:,.2f}" for c in per_line.columns if c != "OB_Line_Base"}),
+        use_container_width=True,
+        hide_index=True,
     )
 
-    st.plotly_chart(fig_rev, use_container_width=True, key=f"chart_rev_{tab_name}")
 
-    # ==========================================
-    # EKSPORT DO EXCELA
-    # ==========================================
-    st.write("---")
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        results_a.to_excel(writer, sheet_name=f"Scenariusz A", index=False)
-        results_b.to_excel(writer, sheet_name=f"Scenariusz B", index=False)
-        fill_a.to_excel(writer,    sheet_name=f"Fill Rate A",  index=False)
-        fill_b.to_excel(writer,    sheet_name=f"Fill Rate B",  index=False)
-
-        # Aplikujemy formatowanie tysięczne i finansowe bezpośrednio do arkuszy Excel
-        for sheet_name in writer.sheets:
-            worksheet = writer.sheets[sheet_name]
-            for row in worksheet.iter_rows(min_row=2):
-                for cell in row:
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = '#,##0.00'
-
-    output.seek(0)
+# ==========================================
+# 5g. SOLVER: DOCELOWY PRZYCHÓD / RPM
+# ==========================================
+SOLVER_TARGETS = ["RPM", "Przychód (USD)", "Uplift B − A (USD)"]
+SOLVER_TIERS = ["Wszystkie linie", "Linie 3+ (Fixed 1–2 zamrożone)", "Tylko Fixed (linie 1–2)"]
 
-    st.download_button(
-        label=f"Pobierz wyniki {tab_name} jako Excel",
-        data=output,
-        file_name=f"symulacja_ab_revenue_{tab_name.lower().replace(' ', '_').replace(':', '')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key=f"download_btn_{tab_name}",
+
+@perf.timed("solver")
+def render_solver_section(tab_name: str, ob_b: OrderBook, line_volume_b: np.ndarray, revenue_a: float,
+                          revenue_b: float, turnover_b: float, spread_multiplier: float) -> None:
+    st.header(f"Solver — docelowy przychód / RPM — {tab_name}")
+    st.caption(
+        "Przypisanie bucketów do linii nie zależy od spreadów, więc przychód Scenariusza B jest liniowy "
+        "w mnożniku spreadów — solver podaje dokładny mnożnik dla wybranego celu bez przeliczania bucketów."
+    )
+
+    rpm_b = (revenue_b / turnover_b * 1_000_000) if turnover_b > 0 else 0.0
+    current = {"RPM": rpm_b, "Przychód (USD)": revenue_b, "Uplift B − A (USD)": revenue_b - revenue_a}
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        kind = st.radio("Cel", SOLVER_TARGETS, key=f"solver_kind_{tab_name}")
+    with c2:
+        tier = st.radio("Skalowane linie", SOLVER_TIERS, key=f"solver_tier_{tab_name}")
+    with c3:
+        target = st.number_input("Wartość docelowa", value=round(float(current[kind]), 2),
+                                 key=f"solver_target_{SOLVER_TARGETS.index(kind)}_{tab_name}")
+
+    if kind == "RPM":
+        target_revenue = target_revenue_for_rpm(target, turnover_b)
+    elif kind == "Uplift B − A (USD)":
+        target_revenue = revenue_a + target
+    else:
+        target_revenue = target
+
+    positions = np.arange(len(ob_b))
+    scaled = {
+        SOLVER_TIERS[0]: positions >= 0,
+        SOLVER_TIERS[1]: positions >= 2,
+        SOLVER_TIERS[2]: positions < 2,
+    }[tier]
+    spreads = ob_b.spread
+    solution = solve_spread_scaling(line_volume_b, spreads, scaled, target_revenue, spread_multiplier)
+
+    if not solution.feasible:
+        if solution.revenue_scaled <= 0:
+            st.warning("Wybrane linie nie mają przypisanego wolumenu — zmiana ich spreadów nie wpływa na przychód.")
+        else:
+            st.warning(
+                f"Cel nieosiągalny samym skalowaniem: linie poza skalowanymi dają już "
+                f"${solution.revenue_fixed:,.2f}, a wymagany mnożnik byłby ujemny ({solution.multiplier:,.4f})."
+            )
+        return
+
+    solved_ob = solution.apply(ob_b)
+    solved_spreads = solved_ob["Spread"].to_numpy(dtype=np.float64)
+    solved_revenue = float(line_volume_b @ solved_spreads) * spread_multiplier / 2
+    solved_rpm = (solved_revenue / turnover_b * 1_000_000) if turnover_b > 0 else 0.0
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Wymagany mnożnik spreadów", f"× {solution.multiplier:,.4f}")
+    m2.metric("Przychód B po zmianie", f"${solved_revenue:,.2f}", f"{solved_revenue - revenue_b:+,.2f}")
+    m3.metric("RPM B po zmianie", f"${solved_rpm:,.0f}", f"{solved_rpm - rpm_b:+,.0f}")
+
+    st.dataframe(
+        pd.DataFrame({
+            "OB Line":        ob_b.lines,
+            "Spread (B)":     spreads,
+            "Spread (solver)": solved_spreads,
+            "Fill Volume":    line_volume_b,
+        }).style.format({"Fill Volume": "{:,.2f}"}),
+        use_container_width=True,
+        hide_index=True,
+    )
+    st.button("Zastosuj do Order Booka B", key=f"solver_apply_{tab_name}",
+              on_click=load_order_book, args=(tab_name, "b", solved_ob))
+
+
+# ==========================================
+# 5h. MODEL ELASTYCZNOŚCI POPYTU
+# ==========================================
+@perf.timed("elasticity")
+def render_elasticity_section(tab_name: str, vol_dist_df: pd.DataFrame, scenarios: list[dict],
+                              order_books: list[OrderBook], base_idx: int, static_revenue: list[float],
+                              lot_price: float, spread_multiplier: float,
+                              segment_panel: PanelDistribution | None) -> ElasticityModel | None:
+    st.divider()
+    st.header(f"Elastyczność popytu — {tab_name}")
+
+    if not st.toggle("Włącz model elastyczności", key=f"elastic_on_{tab_name}"):
+        st.caption("Domyślnie wolumen nie reaguje na spread. Model elastyczności skaluje wolumen bucketu "
+                   "względem spreadu w scenariuszu bazowym.")
+        return None
+
+    dist = prepare_distribution(vol_dist_df)
+    by_segment = (segment_panel is not None and not segment_panel.empty
+                  and np.array_equal(segment_panel.bucket_ends, dist.bucket_ends))
+
+    if by_segment:
+        st.caption("Elastyczność per segment klienta (wolumeny z pliku segmentów, te same buckety co rozkład).")
+        edited = st.data_editor(
+            pd.DataFrame({"Segment": segment_panel.keys, "Elasticity": 0.5}),
+            disabled=["Segment"],
+            hide_index=True,
+            use_container_width=True,
+            key=f"elastic_segments_{tab_name}",
+        )
+        elasticity = pd.to_numeric(edited["Elasticity"], errors="coerce").fillna(0.0).to_numpy()
+        volumes = segment_panel.volumes
+    else:
+        elasticity = st.number_input("Elastyczność ε (V' = V · (s / s_bazowy)^−ε)", min_value=0.0, max_value=10.0,
+                                     value=0.5, step=0.1, key=f"elastic_eps_{tab_name}")
+        volumes = dist.volumes
+
+    model = elasticity_model(order_books[base_idx], dist.bucket_ends, volumes, elasticity)
+    score = score_elastic(order_books, dist.bucket_ends, model, lot_price, spread_multiplier)
+    base_volume = float(model.volumes.sum())
+
+    st.dataframe(
+        pd.DataFrame({
+            "Scenariusz":         [scenario_label(s) for s in scenarios],
+            "Revenue (statyczny)": static_revenue,
+            "Revenue (elastyczny)": score.batch.revenue,
+            "Wolumen (elastyczny)": score.batch.volume,
+            "Zmiana wolumenu (%)": (score.batch.volume / base_volume - 1) * 100 if base_volume > 0 else 0.0,
+            "RPM (elastyczny)":    score.batch.rpm,
+        }).style.format({
+            "Revenue (statyczny)": "{:,.2f}", "Revenue (elastyczny)": "{:,.2f}", "Wolumen (elastyczny)": "{:,.2f}",
+            "Zmiana wolumenu (%)": "{:,.2f}", "RPM (elastyczny)": "{:,.0f}",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
+    st.caption(f"Iteracje: {score.iterations} — {'zbieżne' if score.converged else 'brak zbieżności'}. "
+               "Przypisanie linii zależy tylko od granic bucketów, więc rozwiązanie jest wprost. "
+               "Front Pareto poniżej używa tego samego modelu.")
+    return model
+
+
+# ==========================================
+# 5i. FRONT PARETO — PRZYCHÓD vs KONKURENCYJNOŚĆ
+# ==========================================
+FRONTIER_REFRESH_S = 1.0
+
+
+def start_frontier_sweep(tab_name: str, ob_b: OrderBook, vol_dist_df: pd.DataFrame, lot_price: float,
+                         spread_multiplier: float, demand: ElasticityModel | None) -> None:
+    dist = prepare_distribution(vol_dist_df)
+    spec = frontier_spec(
+        ob_b, dist.bucket_ends, dist.volumes, lot_price, spread_multiplier,
+        spread_range=st.session_state[f"frontier_spread_{tab_name}"],
+        ask_range=st.session_state[f"frontier_ask_{tab_name}"],
+        demand=demand,
+        memory_budget_mb=MEMORY_BUDGET_MB,
+        low_memory=st.session_state[f"frontier_lowmem_{tab_name}"],
+    )
+    n_candidates = int(st.session_state[f"frontier_n_{tab_name}"])
+    subscription: JobSubscription = st.session_state[f"frontier_job_{tab_name}"]
+    # Ten sam sweep z innej sesji (albo już policzony) nie jest liczony ponownie
+    subscription.start((tab_name, "frontier", spec.fingerprint, n_candidates),
+                       frontier_tasks(spec, n_candidates), reduce=merge_frontiers)
+    st.session_state[f"frontier_spec_{tab_name}"] = (spec, n_candidates)
+    st.session_state.pop(f"frontier_stopped_{tab_name}", None)
+
+
+def stop_frontier_sweep(tab_name: str) -> None:
+    """Zwalnia subskrypcję sesji; front z ukończonych paczek zostaje do wyboru punktu."""
+    subscription: JobSubscription = st.session_state[f"frontier_job_{tab_name}"]
+    st.session_state[f"frontier_stopped_{tab_name}"] = subscription.job
+    subscription.cancel()
+
+
+def sweep_frontier(job: Job) -> Frontier | None:
+    return job.result if job.status == DONE else merge_frontiers(list(job.partial))
+
+
+@perf.timed("frontier")
+def render_frontier_section(tab_name: str, vol_dist_df: pd.DataFrame, ob_b: OrderBook, lot_price: float,
+                            spread_multiplier: float, demand: ElasticityModel | None = None) -> None:
+    st.divider()
+    st.header(f"Front Pareto — przychód vs konkurencyjność — {tab_name}")
+    st.caption(
+        "Sweep losowych drabin wokół Order Booka B (spready i Ask Size skalowane per linia). Zostają tylko "
+        "punkty niezdominowane: żaden inny kandydat nie daje wyższego przychodu przy niższym spreadzie "
+        "ważonym wolumenem na liniach 1–2 (tier Fixed). Paczki kandydatów liczone są w tle w puli procesów."
+    )
+
+    c1, c2, c3 = st.columns(3)
+    c1.number_input("Liczba kandydatów", min_value=100, max_value=200_000, value=DEFAULT_CANDIDATES, step=1000,
+                    key=f"frontier_n_{tab_name}")
+    c2.slider("Zakres skalowania spreadów", 0.1, 5.0, (0.5, 2.0), step=0.1, key=f"frontier_spread_{tab_name}")
+    c3.slider("Zakres skalowania Ask Size", 0.1, 5.0, (0.5, 2.0), step=0.1, key=f"frontier_ask_{tab_name}")
+    st.toggle("Niska pamięć (float32)", key=f"frontier_lowmem_{tab_name}",
+              help=f"Kandydaci oceniani we float32 w paczkach do {MEMORY_BUDGET_MB:,.0f} MB — tylko gdy oszacowanie "
+                   f"błędu względnego przychodu mieści się w tolerancji rankingu frontu.")
+
+    subscription: JobSubscription = st.session_state.setdefault(f"frontier_job_{tab_name}",
+                                                                JobSubscription(get_job_runner()))
+    job = subscription.job or st.session_state.get(f"frontier_stopped_{tab_name}")
+    b1, b2, _ = st.columns([1, 1, 3])
+    b1.button("Uruchom sweep", key=f"frontier_start_{tab_name}", on_click=start_frontier_sweep,
+              args=(tab_name, ob_b, vol_dist_df, lot_price, spread_multiplier, demand), use_container_width=True)
+    if subscription.job is not None and not subscription.job.finished:
+        b2.button("Zatrzymaj", key=f"frontier_stop_{tab_name}", on_click=stop_frontier_sweep, args=(tab_name,),
+                  use_container_width=True)
+    if job is None:
+        return
+    spec, n_candidates = st.session_state[f"frontier_spec_{tab_name}"]
+
+    @st.fragment(run_every=FRONTIER_REFRESH_S if not job.finished else None)
+    def frontier_view() -> None:
+        import plotly.graph_objects as go
+
+        if job.status == FAILED:
+            st.error(f"Sweep przerwany: {job.error}")
+            return
+        frontier = sweep_frontier(job)
+        if frontier is None:
+            st.info("Sweep startuje…")
+            return
+
+        st.progress(min(frontier.evaluated / n_candidates, 1.0),
+                    text=f"Ocenione drabiny: {frontier.evaluated:,} / {n_candidates:,} — "
+                         f"punkty na froncie: {len(frontier)} — precyzja: {np.dtype(spec.dtype).name}")
+
+        fig = go.Figure(go.Scatter(
+            x=frontier.top_spread, y=frontier.revenue, mode="lines+markers", name="Front Pareto",
+            marker=dict(size=8, color="#636EFA"), line=dict(color="#636EFA", width=2, shape="hv"),
+            text=[f"#{i}" for i in range(len(frontier))],
+            hovertemplate="%{text}<br>Spread linii 1–2: %{x:,.2f}<br>Przychód: $%{y:,.2f}<extra></extra>",
+        ))
+        base = base_frontier(spec)
+        fig.add_trace(go.Scatter(
+            x=base.top_spread, y=base.revenue, mode="markers", name="Order Book B (obecny)",
+            marker=dict(size=14, symbol="star", color="#00CC96"),
+        ))
+        fig.update_layout(
+            xaxis_title="Spread ważony wolumenem — linie 1–2 (points)",
+            yaxis_title="Przychód (USD)",
+            height=420,
+            margin=dict(l=0, r=0, t=40, b=0),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        )
+        st.plotly_chart(fig, use_container_width=True, key=f"chart_frontier_{tab_name}")
+
+        # Sweep zakończony w trakcie odświeżania fragmentu — pełny rerun pokazuje wybór punktu
+        if job.finished and st.session_state.get(f"frontier_seen_{tab_name}") is not job:
+            st.session_state[f"frontier_seen_{tab_name}"] = job
+            st.rerun()
+
+    frontier_view()
+
+    frontier = sweep_frontier(job)
+    if not job.finished or frontier is None or len(frontier) == 0:
+        return
+    options = list(range(len(frontier)))
+    point = st.selectbox(
+        "Punkt frontu", options, key=f"frontier_point_{tab_name}",
+        format_func=lambda i: f"#{i} — spread linii 1–2: {frontier.top_spread[i]:,.2f}, "
+                              f"przychód: ${frontier.revenue[i]:,.2f}",
     )
+    st.dataframe(frontier.order_book(point, ob_b), use_container_width=True, hide_index=True)
+    st.button("Wczytaj do Order Booka B", key=f"frontier_load_{tab_name}",
+              on_click=load_order_book, args=(tab_name, "b", frontier.order_book(point, ob_b)))
+
+
+# ==========================================
+# 5j. BOOTSTRAP UPLIFTU B−A (ZADANIE W TLE)
+# ==========================================
+BOOTSTRAP_REFRESH_S = 0.5
+
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """Zadania w tle wspólne dla wszystkich sesji — na puli procesów, z wynikami w cache wyników."""
+    return JobRunner(get_worker_pool(), get_result_cache())
+
+
+@perf.timed("bootstrap")
+def render_bootstrap_section(tab_name: str, key_revenue: np.ndarray) -> None:
+    st.subheader("Bootstrap uplift B − A")
+    st.caption("Okresy losowane ze zwracaniem — rozkład łącznego uplift B − A pokazuje, czy przewaga B "
+               "nie wynika z kilku nietypowych okresów. Liczone w tle, strona pozostaje responsywna.")
+
+    runner = get_job_runner()
+    col_n, col_btn = st.columns([3, 1], vertical_alignment="bottom")
+    n_resamples = col_n.number_input("Liczba losowań", min_value=100, max_value=1_000_000, value=10_000,
+                                     step=1000, key=f"bootstrap_n_{tab_name}")
+
+    # Klucz zawiera przychody per okres, więc zmiana Order Booka A/B daje nowe zadanie
+    key = (tab_name, "bootstrap", hashlib.sha1(key_revenue.tobytes()).hexdigest(), int(n_resamples))
+    # Jedna subskrypcja na sesję — ponowne kliknięcie nie dubluje subskrybenta, anulowanie zwalnia tylko tę sesję
+    subscription: JobSubscription = st.session_state.setdefault(f"bootstrap_job_{tab_name}", JobSubscription(runner))
+    job = subscription.follow(key)
+
+    if col_btn.button("Uruchom bootstrap", key=f"bootstrap_start_{tab_name}", use_container_width=True):
+        job = subscription.start(key, bootstrap_tasks(key_revenue, int(n_resamples)), reduce=np.vstack)
+    if job is None:
+        return
+
+    @st.fragment(run_every=BOOTSTRAP_REFRESH_S if not job.finished else None)
+    def bootstrap_view() -> None:
+        import plotly.graph_objects as go
+
+        if not job.finished:
+            st.progress(job.progress, text=f"Paczki: {job.completed} / {job.total}")
+            if st.button("Anuluj", key=f"bootstrap_cancel_{tab_name}"):
+                subscription.cancel()
+                st.rerun()
+            return
+        if job.status == CANCELLED:
+            st.info("Bootstrap anulowany.")
+            return
+        if job.status == FAILED:
+            st.error(f"Bootstrap przerwany: {job.error}")
+            return
+
+        uplift = job.result[:, 1] - job.result[:, 0]
+        lo, mid, hi = np.percentile(uplift, [2.5, 50, 97.5])
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Uplift B − A (mediana)", f"${mid:,.2f}")
+        c2.metric("95% przedział", f"${lo:,.2f} … ${hi:,.2f}")
+        c3.metric("P(uplift > 0)", f"{(uplift > 0).mean() * 100:,.1f}%")
+
+        fig = go.Figure(go.Histogram(x=uplift, nbinsx=60, marker_color="#636EFA"))
+        fig.update_layout(xaxis_title="Uplift B − A (USD)", yaxis_title="Liczba losowań", height=300,
+                          margin=dict(l=0, r=0, t=20, b=0))
+        st.plotly_chart(fig, use_container_width=True, key=f"chart_bootstrap_{tab_name}")
+
+    bootstrap_view()
+
+
+# ==========================================
+# 5k. PANEL DEBUG (?debug=1)
+# ==========================================
+def render_debug_panel(profile: perf.Profile) -> None:
+    """Czasy etapów bieżącego reruna i trafienia cache'y — tylko dla sesji otwartej z `?debug=1`."""
+    cache = get_result_cache()
+    pool = get_compute_pool()
+    with st.expander(f"🛠 Profil reruna — {profile.elapsed * 1000:,.0f} ms (sesja {profile.session})", expanded=True):
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Rerun", f"{profile.elapsed * 1000:,.0f} ms")
+        c2.metric("Cache wyników — trafienia", f"{cache.hit_ratio * 100:,.1f}%",
+                  help=f"{cache.hits} trafień / {cache.misses} chybień, wpisów: {len(cache)}")
+        c3.metric("Połączone zlecenia puli", f"{pool.coalesced}")
+
+        warmup = start_warmup()
+        status = f"{warmup.elapsed:,.1f} s" if warmup.finished else "w toku"
+        st.caption(f"Rozgrzewanie cache po starcie: {warmup.completed} / {warmup.total} rynków ({status})"
+                   + (f" — błędy: {', '.join(label for label, _ in warmup.errors)}" if warmup.errors else ""))
+        watcher = start_file_watcher()
+        changes = ", ".join(f"{key} ×{n}" for key, n in watcher.changes.items()) or "brak"
+        st.caption(f"Zmiany plików rozkładów od startu: {changes}"
+                   + (f" — błędy: {', '.join(label for label, _ in watcher.errors)}" if watcher.errors else ""))
+
+        st.markdown("**Etapy** (zagnieżdżone — `dashboard` obejmuje m.in. `score`, `tables`, `chart_*`)")
+        st.dataframe(pd.DataFrame(profile.summary(), columns=["stage", "tab", "calls", "ms"])
+                     .style.format({"ms": "{:,.1f}"}), use_container_width=True, hide_index=True)
+
+        st.markdown("**Loadery `st.cache_data`** (od startu procesu)")
+        st.dataframe(pd.DataFrame(perf.cache_stats(), columns=["cache", "calls", "hits", "misses", "hit_ratio"])
+                     .style.format({"hit_ratio": "{:.1%}"}), use_container_width=True, hide_index=True)
+
+
+# ==========================================
+# 5l. BIBLIOTEKA SCENARIUSZY (SQLITE)
+# ==========================================
+LIBRARY_SORT_LABELS = {
+    "Revenue_USD": "Przychód",
+    "RPM":         "RPM",
+    "Uplift_USD":  "Uplift vs A (Current)",
+    "Zapisano":    "Data zapisu",
+}
+
+
+@st.cache_resource
+def get_scenario_store() -> ScenarioStore:
+    """Wspólna baza zapisanych scenariuszy (plik SQLite obok aplikacji lub SPREAD_CALC_SCENARIO_DB)."""
+    return ScenarioStore(os.environ.get("SPREAD_CALC_SCENARIO_DB", DEFAULT_STORE_PATH))
+
+
+def save_to_library(tab_name: str, order_books: dict[str, OrderBook]) -> None:
+    name = st.session_state.get(f"library_name_{tab_name}", "").strip()
+    if not name:
+        st.session_state[f"library_msg_{tab_name}"] = "Podaj nazwę, pod którą zapisać scenariusz."
+        return
+    source = st.session_state[f"library_source_{tab_name}"]
+    author = st.session_state.get(f"library_author_{tab_name}", "").strip()
+    get_scenario_store().save(tab_name, name, author, order_books[source])
+    st.session_state[f"library_name_{tab_name}"] = ""
+
+
+def load_from_library(tab_name: str, scenarios: list[dict]) -> None:
+    saved = get_scenario_store().get(st.session_state[f"library_pick_{tab_name}"])
+    if saved is None:
+        st.session_state[f"library_msg_{tab_name}"] = "Scenariusz został w międzyczasie usunięty z biblioteki."
+        return
+    target = next(s for s in scenarios if s["name"] == st.session_state[f"library_target_{tab_name}"])
+    load_order_book(tab_name, target["id"], saved.order_book.frame())
+
+
+def delete_from_library(tab_name: str) -> None:
+    get_scenario_store().delete(st.session_state[f"library_pick_{tab_name}"])
+
+
+@perf.timed("library")
+def render_library_section(tab_name: str, vol_dist_df: pd.DataFrame, scenarios: list[dict],
+                           order_books: list[OrderBook], current: OrderBook, lot_price: float,
+                           spread_multiplier: float) -> None:
+    st.divider()
+    st.header(f"Biblioteka scenariuszy — {tab_name}")
+    st.caption("Zapisane Order Booki przetrwają odświeżenie strony i są wspólne dla wszystkich użytkowników. "
+               "Sumy są liczone raz i przechowywane w bazie — ponownie tylko po zmianie rozkładu, "
+               "Order Booka A z rejestru, wartości lota lub mnożnika spreadu.")
+
+    store = get_scenario_store()
+    names = [s["name"] for s in scenarios]
+
+    c1, c2, c3, c4 = st.columns([1, 2, 2, 1], vertical_alignment="bottom")
+    c1.selectbox("Scenariusz", names, key=f"library_source_{tab_name}")
+    c2.text_input("Nazwa w bibliotece", key=f"library_name_{tab_name}")
+    c3.text_input("Autor", key=f"library_author_{tab_name}")
+    c4.button("💾 Zapisz", key=f"library_save_{tab_name}", on_click=save_to_library,
+              args=(tab_name, dict(zip(names, order_books))), use_container_width=True)
+    msg = st.session_state.pop(f"library_msg_{tab_name}", None)
+    if msg:
+        st.warning(msg)
+
+    if store.count(tab_name) == 0:
+        st.caption("Biblioteka tego rynku jest pusta.")
+        return
+
+    fingerprint = distribution_fingerprint(vol_dist_df)
+    basis = totals_basis(fingerprint, current, lot_price, spread_multiplier)
+    # Silnik liczy tylko scenariusze bez sum dla bieżącej podstawy — listowanie i sortowanie to już samo zapytanie SQL
+    rescored = store.refresh_totals(tab_name, basis, prepared_distribution(fingerprint, vol_dist_df), current,
+                                    lot_price, spread_multiplier, MEMORY_BUDGET_MB)
+
+    s1, s2 = st.columns([2, 1], vertical_alignment="bottom")
+    sort_by = s1.selectbox("Sortuj według", list(SORT_COLUMNS), format_func=LIBRARY_SORT_LABELS.get,
+                           key=f"library_sort_{tab_name}")
+    descending = s2.toggle("Malejąco", value=True, key=f"library_desc_{tab_name}")
+    saved = store.list_scenarios(tab_name, basis, sort_by, descending)
+
+    st.dataframe(
+        saved.drop(columns="id").style.format({"Revenue_USD": "{:,.2f}", "RPM": "{:,.0f}", "Uplift_USD": "{:+,.2f}"}),
+        use_container_width=True,
+        hide_index=True,
+    )
+    if rescored:
+        st.caption(f"Przeliczono sumy {rescored} scenariuszy (nowe lub po zmianie rozkładu).")
+
+    labels = dict(zip(saved["id"].tolist(), saved["Nazwa"].tolist()))
+    l1, l2, l3, l4 = st.columns([2, 1, 1, 1], vertical_alignment="bottom")
+    l1.selectbox("Zapisany scenariusz", list(labels), format_func=labels.get, key=f"library_pick_{tab_name}")
+    l2.selectbox("Wczytaj jako", names, key=f"library_target_{tab_name}")
+    l3.button("Wczytaj", key=f"library_load_{tab_name}", on_click=load_from_library, args=(tab_name, scenarios),
+              use_container_width=True)
+    l4.button("Usuń", key=f"library_delete_{tab_name}", on_click=delete_from_library, args=(tab_name,),
+              use_container_width=True)
+
 
 # ==========================================
 # 6. INSTRUKCJA
 # ==========================================
-def render_instruction_tab() -> None:
+@perf.timed("instruction")
+def render_instruction_tab(registry: dict[str, Instrument]) -> None:
     st.header("Metodologia i opis kalkulatora")
 
-    st.markdown("""
+    def fmt_num(x: float) -> str:
+        return f"{x:,.0f}".replace(",", " ") if float(x).is_integer() else f"{x:g}"
+
+    instruments_rows = "\n".join(
+        f"| **{inst.symbol}** | {', '.join(m.name for m in inst.markets)} | {fmt_num(inst.lot_price)} USD |"
+        for inst in registry.values()
+    )
+    multiplier_rows = "\n".join(
+        f"- **{inst.symbol}**: Spread_Multiplier = {fmt_num(inst.spread_multiplier)}" for inst in registry.values()
+    )
+    lot_price_rows = "\n".join(
+        f"- **{inst.symbol}**: 1 Lot = {fmt_num(inst.lot_price)} USD notional" for inst in registry.values()
+    )
+    default_ob_rows = "\n".join(
+        f"| Domyślny OB {m.key} | {len(ob)} linii | Ask: {', '.join(fmt_num(x) for x in ob['Ask Size'])} "
+        f"/ Spready: {', '.join(fmt_num(x) for x in ob['Spread'])} |"
+        for inst in registry.values() for m in inst.markets
+        for ob in [m.default_order_book("a")]
+    )
+
+    st.markdown(f"""
 ---
 
 ### Dane wejściowe — skąd pochodzi wolumen?
 
-Kalkulator korzysta z automatycznego mechanizmu oczyszczania danych. Przed załadowaniem aplikacji wczytywane są surowe pliki CSV dla poszczególnych instrumentów, a następnie usuwane są z nich niepotrzebne znaki (jak nawiasy czy spacje zastępujące przecinki). Czyste dane trafiają prosto do kalkulatora w standardowym formacie `0.0 - 0.1`.
+Kalkulator korzysta z automatycznego mechanizmu oczyszczania danych. Przy pierwszym otwarciu instrumentu wczytywane są jego surowe pliki CSV, a następnie usuwane są z nich niepotrzebne znaki (jak nawiasy czy spacje zastępujące przecinki). Czyste dane trafiają prosto do kalkulatora w standardowym formacie `0.0 - 0.1`. Podmiana pliku rozkładu (także okresów i segmentów) na serwerze jest wykrywana w ciągu kilku sekund po treści pliku, bez restartu: przeliczany jest tylko rynek, którego plik się zmienił, a pozostałe instrumenty zostają w cache.
 
 Każdy wiersz opisuje:
 - **volume_range** — przedział wielkości zlecenia w lotach.
 - **filled_volume** — łączny wolumen (w lotach) który historycznie wpadł w ten przedział. To zagregowana liczba z danych transakcyjnych.
 
+### Rozdzielczość bucketów
+
+Selektor "Rozdzielczość bucketów" nad scenariuszami zmienia szerokość bucketów całej zakładki (wyniki, wykresy, okresy, segmenty, solver, front Pareto) na 0.5 lota, 1 lot albo własną listę górnych granic, np. `1, 2, 5, 10, 25, 50, 100`. Nowe buckety powstają z sumy skumulowanej wolumenu już wczytanego rozkładu — bez ponownego czytania plików — a łączny wolumen się nie zmienia. Oryginalny bucket trafia do pierwszego nowego, którego górna granica jest nie mniejsza niż jego własna (ta sama reguła co przypisanie do linii OB), a ostatni bucket sięga końca rozkładu. Każda wybrana rozdzielczość jest zapamiętywana per rynek, więc powrót do niej jest natychmiastowy.
+
 ---
 
 ### Obsługiwane instrumenty
 
 | Instrument | Rynki | Wartość 1 Lota |
 |------------|-------|----------------|
-| **XAUUSD** | Futures, Spot | 500 000 USD |
-| **XAGUSD** | Futures, Spot | 400 000 USD |
+{instruments_rows}
+
+Instrumenty są zdefiniowane w pliku `instruments.toml` (wartość 1 lota, mnożnik spreadu, pliki rozkładów i domyślne Order Booki). Dodanie instrumentu nie wymaga zmian w kodzie — wystarczy nowa sekcja w rejestrze i plik rozkładu. Dane instrumentu są ładowane dopiero po wybraniu go z listy.
 
 ---
 
@@ -731,15 +1815,13 @@ Zlecenie z bucketu `6 - 11` (górna granica = 11) trafi w **linię 3**, bo dopie
 Dzielenie przez 2 wynika z tego, że spread jest kwotowany jako różnica bid-ask, a LP zarabia połowę spreadu na każdej stronie transakcji.
 
 Wartość Spread_Multiplier zależy od instrumentu:
-- **XAUUSD**: Spread_Multiplier = 1
-- **XAGUSD**: Spread_Multiplier = 10
+{multiplier_rows}
 
 ---
 
 ### Jak wyliczany jest Turnover?
 Wartość LOT_PRICE_USD zależy od instrumentu:
-- **XAUUSD**: 1 Lot = 500 000 USD notional
-- **XAGUSD**: 1 Lot = 400 000 USD notional
+{lot_price_rows}
 
 ---
 
@@ -786,88 +1868,163 @@ Słupki pokazują Revenue per bucket dla Scenariusza A (czerwony) i B (zielony).
 
 ---
 
-### Dane zakodowane na stałe w aplikacji
+### Parametry z rejestru instrumentów (`instruments.toml`)
 
 | Parametr | Wartość | Opis |
 |----------|---------|------|
-| `LOT_PRICE_XAUUSD` | 500 000 USD | Wartość notional 1 lota XAUUSD |
-| `LOT_PRICE_XAGUSD` | 400 000 USD | Wartość notional 1 lota XAGUSD |
-| `Spread Multiplier XAUUSD` | 1 | Mnożnik spreadu dla XAUUSD |
-| `Spread Multiplier XAGUSD` | 10 | Mnożnik spreadu dla XAGUSD |
 | Fixed Lines (wykres) | Linie 1-2 | Competitive tier oznaczony różowym tłem |
-| Domyślny OB XAUUSD Futures | 7 linii | Ask: 1, 6, 11, 15, 18, 19, 20 / Spready: 31, 42, 57, 84, 115, 164, 247 |
-| Domyślny OB XAUUSD Spot | 10 linii | Ask: 1, 4.5, 6, 9, 11.5, 14, 16.5, 23.5, 35, 44 / Spready: 20, 44, 65, 82, 112, 145, 180, 211, 241, 270 |
-| Domyślny OB XAGUSD Futures | 7 linii | Ask: 2, 3, 4, 6, 7, 9, 11 / Spready: 46, 52, 66, 80, 96, 110, 132 |
-| Domyślny OB XAGUSD Spot | 5 linii | Ask: 1, 2, 5, 10, 20 / Spready: 22, 40, 60, 82, 112 |
+{default_ob_rows}
 
 ---
 
-### Eksport danych
+### Więcej scenariuszy
 
-Przycisk "Pobierz wyniki jako Excel" na dole każdej zakładki generuje plik z czterema arkuszami: wyniki per bucket dla Scenariusza A i B oraz tabele Fill Rate dla obu scenariuszy.
-    """)
+Poza Scenariuszem A (Current) i B (Optimized) można dodać dowolną liczbę nazwanych scenariuszy ("Dodaj scenariusz"); każdy ma własny edytor Order Booka. Wszystkie scenariusze są liczone jednym wsadowym wywołaniem silnika. Nagłówki wyników, wykresy Fill Rate i Porównanie Przychodów oraz eksport do Excela porównują każdy scenariusz ze scenariuszem bazowym wybranym z listy (domyślnie A). Sekcje poniżej wykresu przychodów (szereg czasowy, sesje, segmenty, live, portfolio) używają scenariuszy A i B.
 
-# ==========================================
-# 7. GŁÓWNA STRONA I ZAKŁADKI
-# ==========================================
-st.title("A/B Spread & Revenue Calculator")
-st.write("Wybierz instrument i rynek z zakładek poniżej, aby porównać scenariusze na odpowiednich wolumenach.")
+---
+
+### Atrybucja zmiany przychodu
+
+Dla każdego scenariusza zmiana przychodu względem bazowego jest rozbijana per bucket na dwa składniki: **efekt spreadu** — bucket zostaje na tej samej linii co w scenariuszu bazowym, zmienia się tylko jej spread, oraz **efekt zmiany linii** — bucket trafia na inną linię, bo zmieniły się Ask Size. Sumy obu efektów są w nagłówkach wyników, a wykres i tabela per linia w sekcji "Atrybucja zmiany przychodu". Oba efekty sumują się do zmiany przychodu (z dokładnością do zaokrągleń do centów).
 
-# Ładowanie danych
-df_xau_futures, df_xau_spot = load_distributions_xauusd()
-df_xag_futures, df_xag_spot = load_distributions_xagusd()
+---
 
-# Domyślne Order Booki — XAUUSD
-ob_xau_futures   = load_default_ob_xauusd_futures()
-ob_xau_spot_a    = load_default_ob_xauusd_spot_a()
-ob_xau_spot_b    = load_default_ob_xauusd_spot_b()
+### Solver — docelowy przychód / RPM
 
-# Domyślne Order Booki — XAGUSD
-ob_xag_futures   = load_default_ob_xagusd_futures()
-ob_xag_spot_a    = load_default_ob_xagusd_spot_a()
-ob_xag_spot_b    = load_default_ob_xagusd_spot_b()
+Przypisanie bucketów do linii zależy tylko od Ask Size, więc przy stałym przypisaniu przychód Scenariusza B rośnie liniowo ze spreadami. Solver wylicza z wolumenów per linia dokładny mnożnik spreadów, który daje docelowy RPM, przychód albo uplift B − A. Skalować można wszystkie linie, tylko linie 3+ (linie 1–2 jako zamrożony tier Fixed) albo tylko tier Fixed. Przycisk "Zastosuj do Order Booka B" wpisuje wynik do edytora B (spready zaokrąglone do 0.01, stąd możliwa minimalna różnica względem celu).
 
-# Sprawdzenie dostępności danych
-xau_ok = not df_xau_futures.empty and not df_xau_spot.empty
-xag_ok = not df_xag_futures.empty and not df_xag_spot.empty
+---
 
-if xau_ok or xag_ok:
-    tab_names = []
-    if xau_ok:
-        tab_names += ["Futures XAUUSD", "Spot XAUUSD"]
-    if xag_ok:
-        tab_names += ["Futures XAGUSD", "Spot XAGUSD"]
-    tab_names.append("Instrukcja")
+### Front Pareto
 
-    tabs = st.tabs(tab_names)
+Sekcja "Front Pareto" przeszukuje tysiące drabin wokół Order Booka B (spready i Ask Size skalowane losowo per linia w podanych zakresach) i zostawia tylko punkty niezdominowane na osiach: przychód łączny oraz spread ważony wolumenem na liniach 1–2 (tier Fixed — miara konkurencyjności top-of-book). Sweep działa w tle — paczki kandydatów liczone są w puli procesów, ten sam sweep uruchomiony w kilku sesjach liczy się raz, a gotowy front trafia do wspólnego cache — a wykres odświeża się co sekundę wraz z poprawą frontu. Po zakończeniu (albo zatrzymaniu) dowolny punkt można wczytać do Order Booka B.
 
-    idx = 0
+Kandydaci (i okna harmonogramu sesji) są oceniani w paczkach mieszczących się w budżecie pamięci (domyślnie 256 MB, zmienna środowiskowa `SPREAD_CALC_MEMORY_MB`) i liczone są tylko sumy per scenariusz i linia — wyniki per bucket nie powstają. Przełącznik "Niska pamięć (float32)" dodatkowo liczy paczki we float32; jest używany tylko wtedy, gdy oszacowanie błędu względnego przychodu (rzędu 10⁻⁶ dla typowych rozkładów) mieści się w tolerancji rankingu frontu.
 
-    if xau_ok:
-        with tabs[idx]:
-            render_dashboard(df_xau_futures, "Futures XAUUSD", ob_xau_futures, LOT_PRICE_XAUUSD)
-        idx += 1
+---
 
-        with tabs[idx]:
-            render_dashboard(df_xau_spot, "Spot XAUUSD", ob_xau_spot_a, LOT_PRICE_XAUUSD, ob_xau_spot_b)
-        idx += 1
+### Elastyczność popytu
 
-    if xag_ok:
-        with tabs[idx]:
-            render_dashboard(df_xag_futures, "Futures XAGUSD", ob_xag_futures, LOT_PRICE_XAGUSD, spread_multiplier=10.0)
-        idx += 1
+Domyślnie kalkulator zakłada, że `filled_volume` nie zależy od spreadu. Po włączeniu modelu elastyczności wolumen każdego bucketu skaluje się względem spreadu, jaki ten bucket ma w scenariuszu bazowym: V' = V · (s / s_bazowy)^−ε. Przy pliku segmentów (te same buckety co rozkład) elastyczność ustawia się osobno dla każdego segmentu. Tabela pokazuje przychód statyczny i elastyczny każdego scenariusza oraz liczbę iteracji solvera — przypisanie linii nie zależy od wolumenu, więc wynik jest dokładny po jednej iteracji. Włączony model jest też używany przez sweep frontu Pareto; solver mnożnika spreadów pozostaje statyczny.
 
-        with tabs[idx]:
-            render_dashboard(df_xag_spot, "Spot XAGUSD", ob_xag_spot_a, LOT_PRICE_XAGUSD, ob_xag_spot_b, spread_multiplier=10.0)
-        idx += 1
+---
 
-    with tabs[idx]:
-        render_instruction_tab()
+### Wspólna pula obliczeń
 
-else:
-    st.warning(
-        "Oczekuję na pliki. Upewnij się, że w repozytorium znajdują się surowe pliki: "
-        "`futures_distribution.csv`, `spot_distribution.csv` dla XAUUSD i/lub "
-        "`futures_distribution_XAGUSD.csv`, `spot_distribution_XAGUSD.csv` dla XAGUSD "
-        "oraz skrypt czyszczący `clean_csv.py`."
+Porównania scenariuszy są liczone we wspólnej dla wszystkich użytkowników puli procesów, a nie w wątku sesji. Rozkłady wolumenu są umieszczane raz w pamięci współdzielonej, więc do procesów trafiają tylko Order Booki. Identyczne zlecenia w toku (ten sam rynek, rozkład, Order Booki i mnożnik) są liczone raz. Liczba zleceń w toku jest ograniczona — gdy pula jest pełna dłużej niż 30 s, pojawia się komunikat z prośbą o ponowienie. Pod wynikami widać bieżącą głębokość kolejki.
+
+---
+
+### Szereg czasowy
+
+Jeśli obok rozkładu leży plik `<nazwa>_periods.csv` (kolumny `period, volume_range, filled_volume`, np. wygenerowany przez `python clean_csv.py ingest --period day`), zakładka pokazuje przychód i RPM Scenariusza A i B per okres oraz sumy w oknie kroczącym. Wszystkie okresy są liczone jednym mnożeniem macierzy okresy × buckety.
+
+---
+
+### Bootstrap uplift B − A
+
+Pod szeregiem czasowym można uruchomić bootstrap: okresy są losowane ze zwracaniem, a dla każdego losowania liczony jest łączny uplift B − A. Wynik to mediana, 95% przedział i prawdopodobieństwo, że B jest lepszy od A. Obliczenia działają w tle w puli procesów (postęp na pasku, przycisk "Anuluj"); zmiana Order Booka A lub B anuluje nieaktualne zadanie, a identyczne zadania z różnych sesji są liczone raz i trafiają do wspólnego cache.
+
+---
+
+### Harmonogram sesji
+
+Przy rozkładzie godzinowym (`--period hour`) każda sesja (Azja 22–7, Londyn 7–13, Nowy Jork 13–22 UTC) może mieć własny Order Book A i B. Kalkulator pokazuje przychód, RPM i Fill Volume (%) per sesja oraz wynik łączny (blended). Wszystkie sesje i oba scenariusze są liczone w jednym przebiegu silnika.
+
+---
+
+### Segmenty klientów
+
+Jeśli obok rozkładu leży plik `<nazwa>_segments.csv` (kolumny `segment, volume_range, filled_volume`, np. retail / prop / institutional na wspólnych bucketach), kalkulator liczy przychód i RPM Scenariusza A i B osobno dla każdego segmentu. Wagi mieszanki (1.0 = flow jak w danych) przeliczają wynik natychmiast, bo łączą tylko gotowe sumy per segment.
+
+---
+
+### Portfolio
+
+Widok "Portfolio" (przełącznik nad listą instrumentów) sumuje przychód, turnover i RPM Scenariusza A i B dla wszystkich zarejestrowanych instrumentów i rynków. Brakujące wyniki są liczone równolegle w puli procesów; wyniki już policzone w zakładkach są brane z tego samego cache.
+
+---
+
+### Tryb live
+
+Przełącznik "Włącz tryb live" pod wykresem przychodów śledzi lokalny plik z transakcjami (CSV z kolumną `volume`, dopisywany na bieżąco). Nowe transakcje są przypisywane do bucketów rozkładu, a przychód Scenariusza A i B jest aktualizowany wyłącznie o przyrost ze zmienionych bucketów. Sekcja odświeża się nie częściej niż co sekundę.
+
+---
+
+### Eksport danych
+
+Przycisk "Pobierz wyniki jako Excel" na dole każdej zakładki generuje plik z arkuszami dla każdego scenariusza zakładki (A, B i wszystkich dodanych): "Scenariusz <nazwa>" z wynikami per bucket (w scenariuszach innych niż bazowy z kolumną `Pct_Diff` względem scenariusza bazowego), "Atrybucja <nazwa>" z podziałem zmiany przychodu na efekt spreadu i przesunięcia linii (dla każdego scenariusza poza bazowym) oraz "Fill Rate <nazwa>". Skoroszyt jest budowany dopiero po kliknięciu przycisku.
+
+---
+
+### Biblioteka scenariuszy
+
+Sekcja "Biblioteka scenariuszy" zapisuje wybrany Order Book pod nazwą (z autorem i datą) w lokalnej bazie SQLite `scenarios.sqlite` obok aplikacji (ścieżkę można zmienić zmienną `SPREAD_CALC_SCENARIO_DB`). Zapis pod istniejącą nazwą nadpisuje scenariusz. Zapisane scenariusze przetrwają odświeżenie strony, są widoczne dla wszystkich użytkowników i można je wczytać do dowolnego scenariusza zakładki. Przychód, RPM i uplift względem domyślnego Order Booka A (Current) są liczone raz i przechowywane razem ze scenariuszem — lista jest sortowana bezpośrednio w bazie, bez ponownego liczenia. Przeliczenie następuje tylko dla nowych scenariuszy oraz po zmianie rozkładu, Order Booka A w rejestrze, wartości lota lub mnożnika spreadu.
+
+### Panel debug
+
+Otwarcie strony z parametrem `?debug=1` dodaje na dole panel z czasami etapów bieżącego reruna (czas do pierwszego renderu, czyszczenie CSV, wczytanie, walidacja, scoring, Fill Rate, tabele, każdy wykres, eksport do Excela — per zakładka), współczynnikami trafień cache loaderów i wspólnego cache wyników oraz stanem rozgrzewania. Po starcie serwera wszystkie rynki z rejestru są w tle wczytywane i liczone dla domyślnych Order Booków, więc pierwsze otwarcie instrumentu trafia w ciepłe cache. Te same etapy trafiają do logów serwera jako linie `perf session=… tab="…" stage=… ms=…`. Zmienna środowiskowa `SPREAD_CALC_PROFILE=1` włącza logi dla wszystkich sesji bez panelu. Bez tych przełączników pomiar jest wyłączony.
+    """)
+
+# ==========================================
+# 7. GŁÓWNA STRONA I ZAKŁADKI
+# ==========================================
+st.title("A/B Spread & Revenue Calculator")
+st.write("Wybierz instrument z listy, a rynek z zakładek poniżej, aby porównać scenariusze na odpowiednich wolumenach.")
+
+registry = get_registry()
+perf.since_start("first_render")
+start_warmup()
+start_file_watcher()
+
+
+def render_market(instrument: Instrument, market: Market) -> None:
+    """Ładuje dane rynku (leniwie, przy pierwszym otwarciu instrumentu) i renderuje dashboard."""
+    vol_dist_df = market_distribution(market)
+    if vol_dist_df.empty:
+        st.warning(f"Brak danych dla {market.key}. Upewnij się, że w repozytorium znajduje się plik `{market.distribution}`.")
+        return
+
+    # Rozkład i panele w wybranej rozdzielczości — te same granice dla wszystkich sekcji zakładki
+    identity = get_file_fingerprints().identity(market.distribution)
+    edges = select_resolution(market.key, market_cumulative(market.key, identity, vol_dist_df))
+    st.session_state.setdefault("current_edges", {})[market.key] = edges
+    if edges is not None:
+        vol_dist_df = rebinned_distribution(market.key, identity, edges, vol_dist_df)
+
+    render_dashboard(
+        vol_dist_df,
+        market.key,
+        load_default_ob(market.distribution, "a"),
+        instrument.lot_price,
+        load_default_ob(market.distribution, "b"),
+        spread_multiplier=instrument.spread_multiplier,
+        period_panel=market_panel(market.periods_path, "period", edges),
+        segment_panel=market_panel(market.segments_path, "segment", edges),
     )
+
+
+if registry:
+    view = st.radio("Widok", ["Instrument", "Portfolio"], horizontal=True, key="view", label_visibility="collapsed")
+
+    if view == "Portfolio":
+        with perf.tagged("Portfolio"):
+            render_portfolio(registry)
+    else:
+        symbol = st.selectbox("Instrument", list(registry), key="instrument")
+        instrument = registry[symbol]
+
+        tabs = st.tabs([m.key for m in instrument.markets] + ["Instrukcja"])
+        for tab, market in zip(tabs, instrument.markets):
+            with tab, perf.tagged(market.key):
+                render_market(instrument, market)
+
+        with tabs[-1], perf.tagged("Instrukcja"):
+            render_instruction_tab(registry)
+
+else:
+    st.warning("Rejestr instrumentów `instruments.toml` jest pusty — dodaj co najmniej jeden instrument.")
+
+profile = perf.end()
+if DEBUG and profile is not None:
+    render_debug_panel(profile)
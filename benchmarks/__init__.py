@@ -0,0 +1 @@
+"""Skrypty benchmarkowe — uruchamiane z katalogu repozytorium, np. `python -m benchmarks.bench_sketch`."""
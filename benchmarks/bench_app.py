@@ -0,0 +1,222 @@
+"""
+Opóźnienie rerunów całej aplikacji: app.py uruchamiany headless przez `streamlit.testing`
+z sekwencją typowych interakcji (zimny start, rerun bez zmian, edycja jednej komórki
+Order Booka B na Spot XAUUSD, zmiana instrumentu, widok portfolio i powrót).
+
+Dla każdego kroku mierzone są: czas ściany reruna, czas do pierwszego renderu (tytuł strony,
+od początku skryptu łącznie z importami), szczytowa pamięć (tracemalloc) oraz czasy etapów
+z `perf.py` (load, score, tables, chart_*, excel, sekcje...).
+Raport JSON trafia do --output, a z --history jest dopisywany do pliku JSONL
+(śledzenie w czasie). Krok wolniejszy niż `threshold` × baseline albo z pamięcią
+powyżej `memory-threshold` × baseline to regresja — kod wyjścia 1.
+
+Zakładki `st.tabs` przełączane są po stronie przeglądarki (bez reruna) — przełączenie
+widoku symulowane jest zmianą instrumentu i widoku portfolio, które wywołują rerun.
+
+Uruchomienie:
+    python -m benchmarks.bench_app
+    python -m benchmarks.bench_app --save-baseline
+    python -m benchmarks.bench_app --no-memory --threshold 1.3 --history benchmarks/app_history.jsonl
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+import perf
+from benchmarks.bench_engine import environment
+from registry import load_registry
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline_app.json")
+DEFAULT_TIMEOUT_S = 300
+
+EDIT_INSTRUMENT = "XAUUSD"
+EDIT_MARKET = "Spot"
+
+
+# ==========================================
+# INTERAKCJE
+# ==========================================
+def edit_order_book_b(at: AppTest) -> None:
+    """Zmienia spread jednej linii Order Booka B (tak jak edycja komórki w edytorze)."""
+    market = next(m for m in load_registry()[EDIT_INSTRUMENT].markets if m.name == EDIT_MARKET)
+    key = f"ob_data_b_{market.key}"
+    ob = at.session_state[key] if key in at.session_state else market.default_order_book("b")
+    ob = ob.copy()
+    ob.loc[ob.index[2], "Spread"] = float(ob["Spread"].iloc[2]) + 1.0
+    at.session_state[key] = ob
+
+
+def select_instrument(symbol: str):
+    return lambda at: at.selectbox(key="instrument").set_value(symbol)
+
+
+def select_view(view: str):
+    return lambda at: at.radio(key="view").set_value(view)
+
+
+STEPS = [
+    ("cold_start",         None),
+    ("rerun",              lambda at: None),
+    ("edit_ob_b",          edit_order_book_b),
+    ("switch_instrument",  select_instrument("XAGUSD")),
+    ("portfolio",          select_view("Portfolio")),
+    ("back_to_instrument", select_view("Instrument")),  # selectbox instrumentu wraca do domyślnego XAUUSD
+]
+
+
+# ==========================================
+# POMIAR
+# ==========================================
+def run_step(at: AppTest, name: str, interact, memory: bool) -> dict:
+    if interact is not None:
+        interact(at)
+    perf.reset()
+    if memory:
+        tracemalloc.reset_peak()
+
+    t0 = time.perf_counter()
+    at.run()
+    wall = time.perf_counter() - t0
+
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2 if memory else None
+    exceptions = [str(e.value) for e in at.exception]
+    stages = perf.snapshot()
+    return {
+        "step": name,
+        "wall_s": wall,
+        "first_render_s": stages.get("first_render", {}).get("seconds"),
+        "peak_mb": peak,
+        "stages": stages,
+        "exceptions": exceptions,
+    }
+
+
+def run_session(timeout: float, memory: bool) -> list[dict]:
+    perf.enable()
+    if memory:
+        tracemalloc.start()
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        return [run_step(at, name, interact, memory) for name, interact in STEPS]
+    finally:
+        if memory:
+            tracemalloc.stop()
+        perf.enable(False)
+
+
+def print_report(steps: list[dict]) -> None:
+    stage_names = sorted({s for step in steps for s in step["stages"]})
+    print(f"{'krok':<20}{'czas [s]':>10}{'1. render [s]':>15}{'pamięć [MB]':>13}")
+    for step in steps:
+        first = f"{step['first_render_s']:>15.3f}" if step["first_render_s"] is not None else f"{'—':>15}"
+        peak = f"{step['peak_mb']:>13.1f}" if step["peak_mb"] is not None else f"{'—':>13}"
+        print(f"{step['step']:<20}{step['wall_s']:>10.3f}{first}{peak}")
+    print()
+    print(f"{'etap [s]':<14}" + "".join(f"{step['step'][:12]:>14}" for step in steps))
+    for stage in stage_names:
+        cells = [step["stages"].get(stage, {}).get("seconds") for step in steps]
+        print(f"{stage:<14}" + "".join(f"{c:>14.3f}" if c is not None else f"{'—':>14}" for c in cells))
+
+
+# ==========================================
+# BASELINE
+# ==========================================
+def load_baseline(path: str, memory: bool) -> dict:
+    """Kroki baseline'u — tylko jeśli zmierzone w tym samym trybie (tracemalloc zmienia czasy)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("memory", True) != memory:
+        print(f"Baseline {path} zmierzony w innym trybie pamięci — pomijam porównanie.")
+        return {}
+    return data.get("steps", {})
+
+
+def regressions(steps: list[dict], baseline: dict, threshold: float, memory_threshold: float,
+                min_delta: float) -> list[str]:
+    found = []
+    for step in steps:
+        base = baseline.get(step["step"])
+        if not base:
+            continue
+        wall, base_wall = step["wall_s"], base.get("wall_s")
+        if base_wall and wall > base_wall * threshold and wall - base_wall > min_delta:
+            found.append(f"{step['step']}: {wall:.3f} s vs baseline {base_wall:.3f} s (×{wall / base_wall:.2f})")
+        first, base_first = step["first_render_s"], base.get("first_render_s")
+        if first is not None and base_first and first > base_first * threshold and first - base_first > min_delta:
+            found.append(f"{step['step']}: pierwszy render {first:.3f} s vs baseline {base_first:.3f} s")
+        peak, base_peak = step["peak_mb"], base.get("peak_mb")
+        if peak is not None and base_peak and peak > base_peak * memory_threshold:
+            found.append(f"{step['step']}: {peak:.1f} MB vs baseline {base_peak:.1f} MB (×{peak / base_peak:.2f})")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Ścieżka raportu JSON z bieżącego przebiegu.")
+    parser.add_argument("--history", help="Plik JSONL, do którego dopisywany jest raport (śledzenie w czasie).")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Zapisuje bieżące wyniki jako baseline.")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Dopuszczalny stosunek czasu do baseline'u.")
+    parser.add_argument("--memory-threshold", type=float, default=1.3,
+                        help="Dopuszczalny stosunek szczytowej pamięci do baseline'u.")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Minimalna różnica [s] uznawana za regresję.")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Bez tracemalloc (który sam spowalnia reruny) — tylko czasy.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_S)
+    args = parser.parse_args()
+
+    steps = run_session(args.timeout, memory=not args.no_memory)
+    print_report(steps)
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "memory": not args.no_memory,
+        "steps": steps,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+
+    failed = [f"{step['step']}: {e}" for step in steps for e in step["exceptions"]]
+    if failed:
+        print("\nWyjątki w aplikacji:")
+        print("\n".join(f"  {f}" for f in failed))
+
+    slow = []
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "environment": report["environment"],
+                "memory": report["memory"],
+                "steps": {step["step"]: {"wall_s": step["wall_s"], "first_render_s": step["first_render_s"],
+                                         "peak_mb": step["peak_mb"]} for step in steps},
+            }, f, indent=2, sort_keys=True)
+        print(f"\nZapisano baseline: {args.baseline}")
+    else:
+        baseline = load_baseline(args.baseline, report["memory"])
+        if not baseline:
+            print(f"\nBrak baseline'u ({args.baseline}) — uruchom z --save-baseline.")
+        slow = regressions(steps, baseline, args.threshold, args.memory_threshold, args.min_delta)
+        if slow:
+            print(f"\nRegresje (próg czasu ×{args.threshold}, pamięci ×{args.memory_threshold}):")
+            print("\n".join(f"  {s}" for s in slow))
+
+    if failed or slow:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Mikro-benchmark silnika: syntetyczne rozkłady o ciężkim ogonie (10^2–10^7 bucketów),
+wszystkie formaty etykiet `volume_range` i Order Booki 5–50 linii.
+
+Osobno mierzone są etapy:
+  - load   — wczytanie wyczyszczonego CSV (`clean_csv.read_clean_csv`, jak w app.py),
+  - parse  — górne granice bucketów (`parse_bucket_ends`),
+  - score  — przychód per bucket (`calculate_per_bucket_revenue`),
+  - fill   — fill rate per linia (`calculate_fill_rate_per_line`).
+
+Dla małych rozkładów (<= --reference-max) wyniki są porównywane z pętlowymi
+implementacjami z `benchmarks/reference.py` — każda różnica kończy się kodem wyjścia 1.
+Dla większych referencja liczy tylko losową próbkę --reference-sample wierszy (przypisanie
+bucketu do linii OB nie zależy od pozostałych wierszy), a --skip-reference wyłącza porównanie.
+Czasy są porównywane z zapisanym baseline'em; etap wolniejszy niż `threshold` × baseline
+to regresja (również kod wyjścia 1).
+
+Uruchomienie:
+    python -m benchmarks.bench_engine
+    python -m benchmarks.bench_engine --buckets 100 1000000 --lines 5 50 --threshold 1.3
+    python -m benchmarks.bench_engine --save-baseline
+    python -m benchmarks.bench_engine --buckets 10000000 --formats dash --lines 5 50 --repeat 1
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import clean_csv
+from engine import calculate_fill_rate_per_line, calculate_per_bucket_revenue, parse_bucket_ends
+from benchmarks import reference
+
+LOT_PRICE = 500_000.0
+MAX_SIZE = 100.0  # górna granica ostatniego bucketu [loty]
+PARETO_ALPHA = 1.3
+
+# Formaty etykiet obsługiwane przez `parse_bucket_end`
+LABEL_FORMATS = {
+    "dash":   "{lo} - {hi}",   # format po clean_csv
+    "comma":  "({lo}, {hi}]",  # pandas interval z przecinkiem
+    "space":  "({lo} {hi}]",   # pandas interval ze spacją
+    "raw":    "{lo} {hi}",     # surowy format ze spacją
+}
+STAGES = ["load", "parse", "score", "fill"]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline_engine.json")
+
+
+# ==========================================
+# DANE SYNTETYCZNE
+# ==========================================
+def synthetic_distribution(n_buckets: int, label_format: str = "dash", seed: int = 0) -> pd.DataFrame:
+    """
+    Rozkład `volume_range`/`filled_volume` na `n_buckets` równych bucketach do MAX_SIZE.
+    Wolumen per bucket ~ wielkość × gęstość Pareto (ciężki ogon) z szumem i ~10% pustych bucketów.
+    """
+    rng = np.random.default_rng(seed)
+    width = MAX_SIZE / n_buckets
+    decimals = max(1, int(np.ceil(-np.log10(width))) + 1)
+    starts = width * np.arange(n_buckets)
+    mids = starts + width / 2
+
+    xm = 0.01
+    density = PARETO_ALPHA * xm ** PARETO_ALPHA / np.maximum(mids, xm) ** (PARETO_ALPHA + 1)
+    volumes = mids * density * width * 1e6 * rng.gamma(2.0, 0.5, n_buckets)
+    volumes[rng.random(n_buckets) < 0.1] = 0.0
+    volumes = np.round(volumes, 2)
+
+    template = LABEL_FORMATS[label_format]
+    lo = [f"{v:.{decimals}f}" for v in starts.tolist()]
+    hi = lo[1:] + [f"{MAX_SIZE:.{decimals}f}"]
+    labels = [template.format(lo=a, hi=b) for a, b in zip(lo, hi)]
+    return pd.DataFrame({"volume_range": labels, "filled_volume": volumes})
+
+
+def synthetic_order_book(n_lines: int, seed: int = 0) -> pd.DataFrame:
+    """Order Book o rosnących spreadach; pojemność ~80% MAX_SIZE, więc część bucketów trafia na ostatnią linię."""
+    rng = np.random.default_rng(seed)
+    cum_ask = np.round(np.geomspace(0.5, 0.8 * MAX_SIZE, n_lines), 2)
+    ask = np.diff(cum_ask, prepend=0.0)
+    spread = np.round(np.linspace(20.0, 300.0, n_lines) + rng.uniform(0, 5, n_lines), 2)
+    return pd.DataFrame({
+        "OB Line": np.arange(1, n_lines + 1),
+        "Ask Size": np.round(ask, 2),
+        "Spread": spread,
+    })
+
+
+def write_clean_csv(dist: pd.DataFrame, path: str) -> None:
+    """Zapis w formacie pliku `_clean` (separator ',' , BOM utf-8)."""
+    with open(path, "w", encoding="utf-8-sig") as f:
+        f.write("volume_range,filled_volume\n")
+        for label, vol in zip(dist["volume_range"].tolist(), dist["filled_volume"].tolist()):
+            f.write(f"{label},{vol}\n")
+
+
+# ==========================================
+# POMIAR I ZGODNOŚĆ
+# ==========================================
+def best_of(func, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def check_reference(dist: pd.DataFrame, ob: pd.DataFrame, ends: np.ndarray,
+                    results: pd.DataFrame, fill: pd.DataFrame) -> tuple[list[str], float]:
+    """Porównanie szybkich ścieżek z implementacją pętlową. Zwraca (rozbieżności, czas referencji score)."""
+    problems = []
+    dist = dist.reset_index(drop=True)
+
+    ref_ends = reference.parse_bucket_ends(dist["volume_range"])
+    ref_ends = np.array([np.nan if e is None else e for e in ref_ends], dtype=np.float64)
+    if not np.array_equal(ends, ref_ends, equal_nan=True):
+        problems.append("parse: różne granice bucketów")
+
+    t0 = time.perf_counter()
+    ref_results = reference.calculate_per_bucket_revenue(ob, dist, LOT_PRICE)
+    t_ref = time.perf_counter() - t0
+    try:
+        pd.testing.assert_frame_equal(results.reset_index(drop=True), ref_results, check_dtype=False)
+    except AssertionError as e:
+        problems.append(f"score: {str(e).splitlines()[0]}")
+
+    ref_fill = reference.calculate_fill_rate_per_line(ref_results, ob, LOT_PRICE)
+    try:
+        pd.testing.assert_frame_equal(fill.reset_index(drop=True), ref_fill, check_dtype=False)
+    except AssertionError as e:
+        problems.append(f"fill: {str(e).splitlines()[0]}")
+
+    return problems, t_ref
+
+
+def sample_rows(n_rows: int, size: int, seed: int = 0) -> np.ndarray:
+    """Posortowane indeksy losowej próbki wierszy; pierwszy i ostatni wiersz (krańce OB) zawsze w próbce."""
+    rng = np.random.default_rng(seed)
+    inner = rng.choice(np.arange(1, n_rows - 1), size=max(0, min(size, n_rows) - 2), replace=False)
+    return np.unique(np.concatenate([[0, n_rows - 1], inner]))
+
+
+def run_case(n_buckets: int, label_format: str, n_lines: int, repeat: int,
+             check: str | None, sample_size: int, tmpdir: str) -> dict:
+    """`check`: "full" — cały rozkład, "sample" — próbka `sample_size` wierszy, None — bez referencji."""
+    dist = synthetic_distribution(n_buckets, label_format)
+    ob = synthetic_order_book(n_lines)
+    path = os.path.join(tmpdir, f"dist_{n_buckets}_{label_format}.csv")
+    if not os.path.exists(path):
+        write_clean_csv(dist, path)
+
+    timings = {}
+    timings["load"], loaded = best_of(lambda: clean_csv.read_clean_csv(path), repeat)
+    timings["parse"], ends = best_of(lambda: parse_bucket_ends(loaded["volume_range"]), repeat)
+    timings["score"], results = best_of(lambda: calculate_per_bucket_revenue(ob, loaded, LOT_PRICE), repeat)
+    timings["fill"], fill = best_of(lambda: calculate_fill_rate_per_line(results, ob, LOT_PRICE), repeat)
+
+    case = {"timings": timings, "problems": [], "reference_score": None}
+    if check == "full":
+        case["problems"], case["reference_score"] = check_reference(loaded, ob, ends, results, fill)
+    elif check == "sample":
+        rows = sample_rows(len(loaded), sample_size)
+        sampled = results.iloc[rows]
+        case["problems"], case["reference_score"] = check_reference(
+            loaded.iloc[rows], ob, ends[rows], sampled,
+            calculate_fill_rate_per_line(sampled, ob, LOT_PRICE),
+        )
+    return case
+
+
+# ==========================================
+# BASELINE
+# ==========================================
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("cases", {})
+
+
+def save_baseline(path: str, cases: dict) -> None:
+    data = {
+        "environment": environment(),
+        "cases": {case_id: case["timings"] for case_id, case in cases.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def regressions(case_id: str, timings: dict, baseline: dict, threshold: float, min_delta: float) -> list[str]:
+    """Etapy wolniejsze niż threshold × baseline (i o więcej niż min_delta s — szum dla bardzo krótkich pomiarów)."""
+    base = baseline.get(case_id)
+    if not base:
+        return []
+    found = []
+    for stage, t in timings.items():
+        b = base.get(stage)
+        if b and t > b * threshold and t - b > min_delta:
+            found.append(f"{case_id} {stage}: {t:.4f} s vs baseline {b:.4f} s (×{t / b:.2f})")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buckets", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", choices=list(LABEL_FORMATS), default=list(LABEL_FORMATS))
+    parser.add_argument("--lines", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--repeat", type=int, default=3, help="Liczba powtórzeń — raportowany najlepszy czas.")
+    parser.add_argument("--reference-max", type=int, default=1_000,
+                        help="Maksymalna liczba bucketów, dla której z referencją porównywany jest cały rozkład.")
+    parser.add_argument("--reference-sample", type=int, default=1_000,
+                        help="Liczba losowych wierszy porównywanych z referencją powyżej --reference-max.")
+    parser.add_argument("--skip-reference", action="store_true", help="Bez porównania z implementacją referencyjną.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Zapisuje bieżące czasy jako baseline.")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Dopuszczalny stosunek czasu do baseline'u.")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Minimalna różnica [s] uznawana za regresję.")
+    args = parser.parse_args()
+
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+    cases, problems, slow = {}, [], []
+
+    print(f"{'przypadek':<24}" + "".join(f"{s + ' [s]':>12}" for s in STAGES) + f"{'ref score [s]':>15}  zgodność")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_buckets in args.buckets:
+            for label_format in args.formats:
+                for n_lines in args.lines:
+                    case_id = f"{n_buckets}/{label_format}/{n_lines}"
+                    if args.skip_reference:
+                        check = None
+                    else:
+                        check = "full" if n_buckets <= args.reference_max else "sample"
+                    case = run_case(n_buckets, label_format, n_lines, args.repeat, check,
+                                    args.reference_sample, tmpdir)
+                    cases[case_id] = case
+
+                    ref = f"{case['reference_score']:>15.4f}" if case["reference_score"] is not None else f"{'—':>15}"
+                    status = ("OK" if not case["problems"] else "RÓŻNICE") if check else "—"
+                    if check == "sample":
+                        status += " (próbka)"
+                    print(f"{case_id:<24}" + "".join(f"{case['timings'][s]:>12.4f}" for s in STAGES) + f"{ref}  {status}")
+
+                    problems += [f"{case_id} {p}" for p in case["problems"]]
+                    slow += regressions(case_id, case["timings"], baseline, args.threshold, args.min_delta)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, cases)
+        print(f"\nZapisano baseline: {args.baseline}")
+    elif not baseline:
+        print(f"\nBrak baseline'u ({args.baseline}) — uruchom z --save-baseline.")
+
+    if problems:
+        print("\nNiezgodność z implementacją referencyjną:")
+        print("\n".join(f"  {p}" for p in problems))
+    if slow:
+        print(f"\nRegresje wydajności (próg ×{args.threshold}):")
+        print("\n".join(f"  {s}" for s in slow))
+    if problems or slow:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
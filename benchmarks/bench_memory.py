@@ -0,0 +1,165 @@
+"""
+Pamięć i dokładność ocen wsadowych: siatka S drabin (Order Booków) × B bucketów × L linii.
+
+Dla każdego przypadku mierzone są (czas i szczytowa pamięć wg tracemalloc):
+  - full     — `score_batch` (wszystkie tablice scenariusze × buckety naraz, float64),
+  - reduced  — `score_batch_reduced` w budżecie pamięci, float64,
+  - float32  — `score_batch_reduced` w budżecie pamięci, paczki liczone we float32.
+
+Odchylenie to maksymalny błąd względny przychodu i wolumenu per linia względem float64
+(`full`, a gdy jest pominięty — `reduced`). Kod wyjścia 1, gdy:
+  - `reduced` odbiega od `full` o więcej niż --tolerance,
+  - `float32` przekracza oszacowanie `float32_error_bound`,
+  - szczytowa pamięć `reduced` lub `float32` przekracza budżet o więcej niż --memory-slack (poza tablicami wyników).
+
+Uruchomienie:
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --scenarios 20000 --buckets 100000 --budget 64
+    python -m benchmarks.bench_memory --output benchmarks/memory_report.json
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from engine import (
+    StackedOrderBooks, batch_chunks, float32_error_bound, prepare_distribution, score_batch, score_batch_reduced,
+)
+from benchmarks.bench_engine import LOT_PRICE, environment, synthetic_distribution, synthetic_order_book
+
+MODES = ["full", "reduced", "float32"]
+
+
+# ==========================================
+# DANE SYNTETYCZNE
+# ==========================================
+def synthetic_ladders(n_books: int, n_lines: int, seed: int = 0) -> StackedOrderBooks:
+    """Drabiny wokół `synthetic_order_book` — spready i Ask Size skalowane losowo per linia (jak sweep frontu)."""
+    base = synthetic_order_book(n_lines, seed)
+    rng = np.random.default_rng(seed)
+    asks = np.maximum(np.round(base["Ask Size"].to_numpy() * rng.uniform(0.5, 2.0, (n_books, n_lines)), 1), 0.1)
+    spreads = np.round(base["Spread"].to_numpy() * rng.uniform(0.5, 2.0, (n_books, n_lines)), 1)
+    return StackedOrderBooks(
+        cum_ask=np.cumsum(asks, axis=1),
+        spreads=spreads,
+        n_lines=np.full(n_books, n_lines, dtype=np.int64),
+    )
+
+
+# ==========================================
+# POMIAR
+# ==========================================
+def measure(func) -> tuple[float, float, object]:
+    """(czas [s], szczytowa pamięć ponad stan początkowy [MB], wynik)."""
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - t0
+    peak = (tracemalloc.get_traced_memory()[1] - start) / 1024 ** 2
+    return seconds, peak, result
+
+
+def deviation(result, reference) -> float:
+    """Maksymalny błąd względny przychodu per scenariusz i wolumenu per linia."""
+    def rel(a: np.ndarray, b: np.ndarray) -> float:
+        scale = np.maximum(np.abs(b), 1e-12)
+        return float((np.abs(a - b) / scale)[np.abs(b) > 0].max(initial=0.0))
+    return max(rel(result.revenue, reference.revenue), rel(result.line_volume, reference.line_volume))
+
+
+def run_case(n_books: int, n_buckets: int, n_lines: int, budget_mb: float, with_full: bool) -> dict:
+    dist = prepare_distribution(synthetic_distribution(n_buckets))
+    books = synthetic_ladders(n_books, n_lines)
+
+    runs = {
+        "full":    lambda: score_batch(books, dist.bucket_ends, dist.volumes, LOT_PRICE),
+        "reduced": lambda: score_batch_reduced(books, dist.bucket_ends, dist.volumes, LOT_PRICE,
+                                               memory_budget_mb=budget_mb),
+        "float32": lambda: score_batch_reduced(books, dist.bucket_ends, dist.volumes, LOT_PRICE,
+                                               memory_budget_mb=budget_mb, dtype=np.float32),
+    }
+    if not with_full:
+        del runs["full"]
+
+    case = {"seconds": {}, "peak_mb": {}, "deviation": {}}
+    results = {}
+    tracemalloc.start()
+    try:
+        for mode, func in runs.items():
+            case["seconds"][mode], case["peak_mb"][mode], results[mode] = measure(func)
+    finally:
+        tracemalloc.stop()
+
+    reference = results.get("full", results["reduced"])
+    for mode in ("reduced", "float32"):
+        if results[mode] is not reference:
+            case["deviation"][mode] = deviation(results[mode], reference)
+
+    _, bucket_step = batch_chunks(n_books, len(dist.bucket_ends), n_lines, budget_mb, np.float32)
+    case["float32_bound"] = float32_error_bound(bucket_step)
+    # Wyniki (sumy per scenariusz i per linia) nie zależą od budżetu — nie wliczane do jego przekroczenia
+    case["output_mb"] = n_books * (2 + 3 * n_lines) * 8 / 1024 ** 2
+    return case
+
+
+def problems(case_id: str, case: dict, budget_mb: float, tolerance: float, memory_slack: float) -> list[str]:
+    found = []
+    if case["deviation"].get("reduced", 0.0) > tolerance:
+        found.append(f"{case_id}: reduced odbiega od full o {case['deviation']['reduced']:.2e} (> {tolerance:.0e})")
+    if case["deviation"].get("float32", 0.0) > case["float32_bound"]:
+        found.append(f"{case_id}: float32 odbiega o {case['deviation']['float32']:.2e} "
+                     f"(> oszacowanie {case['float32_bound']:.2e})")
+    for mode in ("reduced", "float32"):
+        limit = budget_mb * memory_slack + case["output_mb"]
+        if case["peak_mb"][mode] > limit:
+            found.append(f"{case_id}: {mode} zajął {case['peak_mb'][mode]:.1f} MB (> {limit:.1f} MB)")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, nargs="+", default=[200, 2_000])
+    parser.add_argument("--buckets", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=64.0, help="Budżet pamięci paczki [MB].")
+    parser.add_argument("--full-max-cells", type=float, default=5e6,
+                        help="Maksymalne scenariusze × buckety, dla których liczony jest wariant full.")
+    parser.add_argument("--tolerance", type=float, default=1e-9,
+                        help="Dopuszczalny błąd względny reduced (float64) względem full.")
+    parser.add_argument("--memory-slack", type=float, default=1.25,
+                        help="Dopuszczalny stosunek szczytowej pamięci do budżetu.")
+    parser.add_argument("--output", help="Ścieżka raportu JSON.")
+    args = parser.parse_args()
+
+    cases, failed = {}, []
+    header = "".join(f"{m + ' [s]':>13}" for m in MODES) + "".join(f"{m + ' [MB]':>14}" for m in MODES)
+    print(f"{'przypadek':<22}{header}{'odch. reduced':>15}{'odch. float32':>15}{'oszacowanie':>13}")
+    for n_books in args.scenarios:
+        for n_buckets in args.buckets:
+            case_id = f"{n_books}x{n_buckets}x{args.lines}"
+            case = run_case(n_books, n_buckets, args.lines, args.budget, n_books * n_buckets <= args.full_max_cells)
+            cases[case_id] = case
+
+            cells = "".join(f"{case['seconds'][m]:>13.3f}" if m in case["seconds"] else f"{'—':>13}" for m in MODES)
+            cells += "".join(f"{case['peak_mb'][m]:>14.1f}" if m in case["peak_mb"] else f"{'—':>14}" for m in MODES)
+            devs = "".join(f"{case['deviation'][m]:>15.2e}" if m in case["deviation"] else f"{'—':>15}"
+                           for m in ("reduced", "float32"))
+            print(f"{case_id:<22}{cells}{devs}{case['float32_bound']:>13.2e}")
+            failed += problems(case_id, case, args.budget, args.tolerance, args.memory_slack)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "budget_mb": args.budget, "cases": cases}, f, indent=2)
+
+    if failed:
+        print("\nProblemy:")
+        print("\n".join(f"  {p}" for p in failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
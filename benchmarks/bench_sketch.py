@@ -0,0 +1,76 @@
+"""
+Porównanie przychodu liczonego z `VolumeSketch` z przychodem z dokładnych bucketów.
+
+Uruchomienie:
+    python -m benchmarks.bench_sketch --fills 5000000 --bucket-width 0.1
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import clean_csv
+from engine import calculate_per_bucket_revenue
+from sketch import VolumeSketch
+
+# Domyślny Order Book Spot XAUUSD (kopia z app.py)
+ORDER_BOOK = pd.DataFrame({
+    "OB Line": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+    "Ask Size": [1.0, 3.5, 4.5, 6.5, 9.5, 14.0, 16.5, 23.5, 35.0, 44.0],
+    "Spread":   [20.0, 44.0, 65.0, 82.0, 112.0, 145.0, 180.0, 211.0, 241.0, 270.0],
+})
+LOT_PRICE = 500_000.0
+
+
+def synthetic_fills(n: int, seed: int = 0) -> np.ndarray:
+    """Wielkości transakcji o ciężkim ogonie (Pareto), zaokrąglone do 0.01 lota."""
+    rng = np.random.default_rng(seed)
+    return np.round(0.01 + rng.pareto(1.3, n) * 0.4, 2)
+
+
+def total_revenue(dist: pd.DataFrame) -> float:
+    return float(calculate_per_bucket_revenue(ORDER_BOOK, dist, LOT_PRICE)["Revenue_USD"].sum())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fills", type=int, default=2_000_000)
+    parser.add_argument("--bucket-width", type=float, default=0.1)
+    parser.add_argument("--max-size", type=float, default=100.0)
+    parser.add_argument("--days", type=int, default=20, help="Na ile dziennych szkiców podzielić transakcje.")
+    parser.add_argument("--accuracy", type=float, nargs="+", default=[0.05, 0.01, 0.005, 0.001])
+    args = parser.parse_args()
+
+    sizes = np.minimum(synthetic_fills(args.fills), args.max_size)
+
+    t0 = time.perf_counter()
+    acc = clean_csv.accumulate_chunk(np.zeros(0), sizes, args.bucket_width)
+    exact = pd.DataFrame({
+        "volume_range":  [clean_csv.format_bucket_label(k, args.bucket_width) for k in range(acc.size)],
+        "filled_volume": acc,
+    })
+    t_exact = time.perf_counter() - t0
+    rev_exact = total_revenue(exact)
+
+    print(f"Transakcje: {args.fills:,}  |  bucket: {args.bucket_width}  |  dni: {args.days}")
+    print(f"Dokładne buckety: {acc.size} bucketów, {t_exact:.3f} s, przychód ${rev_exact:,.2f}")
+    print()
+    print(f"{'accuracy':>9} {'koszyki':>8} {'JSON [KB]':>10} {'build [s]':>10} {'przychód':>16} {'błąd wzgl.':>11}")
+
+    for accuracy in args.accuracy:
+        t0 = time.perf_counter()
+        daily = [VolumeSketch(accuracy).add(chunk) for chunk in np.array_split(sizes, args.days)]
+        sketch = VolumeSketch.merged(daily)
+        dist = sketch.to_distribution(bucket_width=args.bucket_width)
+        t_sketch = time.perf_counter() - t0
+
+        rev = total_revenue(dist)
+        size_kb = len(json.dumps(sketch.to_dict())) / 1024
+        rel_err = abs(rev - rev_exact) / rev_exact if rev_exact else 0.0
+        print(f"{accuracy:>9} {len(sketch):>8} {size_kb:>10.1f} {t_sketch:>10.3f} {rev:>16,.2f} {rel_err:>11.4%}")
+
+
+if __name__ == "__main__":
+    main()
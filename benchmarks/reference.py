@@ -0,0 +1,130 @@
+"""
+Referencyjne (pętlowe) implementacje silnika sprzed wektoryzacji — punkt odniesienia
+dla sprawdzenia numerycznej zgodności szybkich ścieżek w `benchmarks/bench_engine.py`.
+Nie używać w aplikacji.
+"""
+from typing import Callable
+
+import pandas as pd
+
+
+def parse_bucket_end(vol_range_str: str) -> float | None:
+    """
+    Obsługuje wszystkie warianty formatowania przedziałów:
+      - '0.0 - 0.1'      (format po clean_csv)
+      - '(0.0, 0.1]'     (format pandas interval z przecinkiem)
+      - '(0.0 0.1]'      (format pandas interval ze spacją)
+      - '0.0 0.1'        (surowy format ze spacją, bez nawiasów)
+    """
+    try:
+        s = str(vol_range_str).strip()
+        # Usuń nawiasy interwałowe
+        s = s.replace('(', '').replace(')', '').replace('[', '').replace(']', '').strip()
+
+        if ' - ' in s:
+            # Format po clean_csv: "0.0 - 0.1"
+            end_str = s.split(' - ')[1].strip()
+        elif ',' in s:
+            # Format pandas z przecinkiem: "0.0, 0.1"
+            end_str = s.split(',')[1].strip()
+        else:
+            # Format ze spacją: "0.0 0.1"
+            parts = s.split()
+            if len(parts) < 2:
+                return None
+            end_str = parts[-1].strip()
+
+        return float(end_str)
+    except (IndexError, ValueError):
+        return None
+
+
+def calculate_per_bucket_revenue(order_book: pd.DataFrame, volume_distribution: pd.DataFrame, lot_price: float,
+                                 spread_multiplier: float = 1.0,
+                                 on_unparsed: Callable[[str], None] | None = None) -> pd.DataFrame:
+    ob = order_book.copy()
+    ob["Ask Size"] = pd.to_numeric(ob["Ask Size"], errors="coerce")
+    ob["Spread"]   = pd.to_numeric(ob["Spread"],   errors="coerce")
+    ob["Cum_Ask_Size"] = ob["Ask Size"].cumsum()
+
+    if "OB Line" not in ob.columns:
+        ob["OB Line"] = range(1, len(ob) + 1)
+
+    results = []
+
+    for _, row in volume_distribution.iterrows():
+        bucket_end = parse_bucket_end(row["volume_range"])
+
+        if bucket_end is None:
+            if on_unparsed is not None:
+                on_unparsed(row["volume_range"])
+            continue
+
+        filled_volume = float(row["filled_volume"])
+        valid_lines   = ob[ob["Cum_Ask_Size"] >= bucket_end]
+
+        if not valid_lines.empty:
+            assigned_spread = float(valid_lines.iloc[0]["Spread"])
+            ob_line_used    = int(valid_lines.iloc[0]["OB Line"])
+        else:
+            assigned_spread = float(ob.iloc[-1]["Spread"])
+            ob_line_used    = int(ob.iloc[-1]["OB Line"])
+
+        revenue      = round((filled_volume * assigned_spread * spread_multiplier) / 2, 2)
+        turnover_usd = filled_volume * lot_price
+        rpm          = (revenue / turnover_usd * 1_000_000) if turnover_usd > 0 else 0.0
+
+        results.append({
+            "Volume_Bucket":   row["volume_range"],
+            "Filled_Volume":   round(filled_volume, 2),
+            "OB_Line_Used":    ob_line_used,
+            "Assigned_Spread": round(assigned_spread, 2),
+            "Turnover_USD":    round(turnover_usd, 2),
+            "Revenue_USD":     revenue,
+            "RPM":             round(rpm, 2),
+        })
+
+    return pd.DataFrame(results)
+
+
+def calculate_fill_rate_per_line(results: pd.DataFrame, order_book: pd.DataFrame, lot_price: float) -> pd.DataFrame:
+    ob = order_book.copy()
+    if "OB Line" not in ob.columns:
+        ob["OB Line"] = range(1, len(ob) + 1)
+
+    lines = ob["OB Line"].tolist()
+
+    fill_counts   = {line: 0   for line in lines}
+    fill_volumes  = {line: 0.0 for line in lines}
+    fill_revenues = {line: 0.0 for line in lines}
+
+    for _, row in results.iterrows():
+        line = row["OB_Line_Used"]
+        if line in fill_counts:
+            fill_counts[line]   += 1
+            fill_volumes[line]  += float(row["Filled_Volume"])
+            fill_revenues[line] += float(row["Revenue_USD"])
+
+    total_volume = sum(fill_volumes.values())
+
+    rows = []
+    for line in lines:
+        count  = fill_counts[line]
+        volume = fill_volumes[line]
+        rev    = fill_revenues[line]
+        turnover = volume * lot_price
+        rpm      = (rev / turnover * 1_000_000) if turnover > 0 else 0.0
+
+        rows.append({
+            "OB Line":         line,
+            "Fill Count":      count,
+            "Fill Volume":     round(volume, 2),
+            "Fill Volume (%)": round((volume / total_volume * 100), 1) if total_volume > 0 else 0.0,
+            "RPM":             round(rpm, 2),
+        })
+
+    return pd.DataFrame(rows)
+
+
+def parse_bucket_ends(vol_ranges) -> list[float | None]:
+    return [parse_bucket_end(v) for v in vol_ranges]
@@ -1,11 +1,29 @@
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-FILES_TO_CLEAN = [
-    "futures_distribution.csv",
-    "spot_distribution.csv",
-    "futures_distribution_XAGUSD.csv",
-    "spot_distribution_XAGUSD.csv"
-]
+import numpy as np
+import pandas as pd
+
+from registry import load_registry, distribution_files
+from sketch import VolumeSketch
+
+# Surowe pliki rozkładów wszystkich instrumentów z rejestru (instruments.toml)
+FILES_TO_CLEAN = distribution_files(load_registry())
+
+# Domyślne parametry ingestii surowych transakcji (fills)
+DEFAULT_BUCKET_WIDTH = 0.1
+DEFAULT_CHUNK_SIZE   = 1_000_000
+DEFAULT_SIZE_COLUMN  = "volume"
+DEFAULT_TIME_COLUMN  = "time"
+DEFAULT_MAX_BUCKETS  = 100_000      # Bez --max-size: większe transakcje trafiają do ostatniego bucketu (stała pamięć)
+DENSE_PERIOD_CELLS   = 20_000_000   # Maks. okresy × buckety paczki liczone gęsto (160 MB) — powyżej rzadko
+
+# Formaty etykiet okresów dla rozkładów w czasie (period, volume_range, filled_volume)
+PERIOD_FORMATS = {
+    "day":  "%Y-%m-%d",
+    "hour": "%Y-%m-%d %H:00",
+}
 
 def clean_range_string(val):
     val = str(val).replace('(', '').replace(']', '').replace('[', '').replace(')', '').replace('"', '').replace("'", "").strip()
@@ -14,40 +32,389 @@ def clean_range_string(val):
         return f"{parts[0]} - {parts[1]}"
     return val
 
-def clean_all():
-    """Funkcja odpalana przez app.py, czyści pliki w locie na serwerze."""
-    for filename in FILES_TO_CLEAN:
-        if not os.path.exists(filename):
-            continue
+def clean_file(filename, force=False):
+    """
+    Czyści jeden surowy plik do `<nazwa>_clean.csv` i zwraca ścieżkę wyniku.
+    Plik czysty nowszy od surowego jest pozostawiany bez zmian, chyba że `force` — app.py wymusza
+    czyszczenie, gdy zmieniła się treść surowego pliku (kopia z zachowaną starszą datą też się liczy).
+    """
+    new_filename = filename.replace(".csv", "_clean.csv")
+    if not os.path.exists(filename):
+        return new_filename
+    if not force and os.path.exists(new_filename) and os.path.getmtime(new_filename) >= os.path.getmtime(filename):
+        return new_filename
+
+    cleaned_lines = []
+    try:
+        with open(filename, 'r', encoding='utf-8-sig') as f:
+            lines = [line.strip() for line in f if line.strip()]
             
-        cleaned_lines = []
-        try:
-            with open(filename, 'r', encoding='utf-8-sig') as f:
-                lines = [line.strip() for line in f if line.strip()]
+        if not lines:
+            return new_filename
+            
+        sep = ";" if ";" in lines[0] else ","
+        cleaned_lines.append(f"volume_range{sep}filled_volume")
+        
+        for line in lines[1:]:
+            last_sep_idx = line.rfind(sep)
+            if last_sep_idx != -1:
+                vol_range = line[:last_sep_idx].strip()
+                filled_vol = line[last_sep_idx+1:].strip()
                 
-            if not lines:
-                continue
+                clean_vol_range = clean_range_string(vol_range)
+                cleaned_lines.append(f"{clean_vol_range}{sep}{filled_vol}")
                 
-            sep = ";" if ";" in lines[0] else ","
-            cleaned_lines.append(f"volume_range{sep}filled_volume")
-            
-            for line in lines[1:]:
-                last_sep_idx = line.rfind(sep)
-                if last_sep_idx != -1:
-                    vol_range = line[:last_sep_idx].strip()
-                    filled_vol = line[last_sep_idx+1:].strip()
-                    
-                    clean_vol_range = clean_range_string(vol_range)
-                    cleaned_lines.append(f"{clean_vol_range}{sep}{filled_vol}")
-                    
-            new_filename = filename.replace(".csv", "_clean.csv")
-            with open(new_filename, 'w', encoding='utf-8-sig') as f:
-                for line in cleaned_lines:
-                    f.write(line + "\n")
-                    
-        except Exception as e:
-            print(f"Błąd podczas czyszczenia {filename}: {e}")
+        with open(new_filename, 'w', encoding='utf-8-sig') as f:
+            for line in cleaned_lines:
+                f.write(line + "\n")
+                
+    except Exception as e:
+        print(f"Błąd podczas czyszczenia {filename}: {e}")
+    return new_filename
+
+def clean_all():
+    """Czyści wszystkie pliki z FILES_TO_CLEAN (np. ręcznie z konsoli po wgraniu nowych danych)."""
+    for filename in FILES_TO_CLEAN:
+        clean_file(filename)
+
+def read_clean_csv(path):
+    """Wczytuje wyczyszczony plik `volume_range`/`filled_volume` (separator ',' lub ';', dzielony po ostatnim)."""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    if not lines:
+        return pd.DataFrame(columns=["volume_range", "filled_volume"])
+
+    sep = ";" if ";" in lines[0] else ","
+
+    data = []
+    for line in lines[1:]:
+        last_sep_idx = line.rfind(sep)
+        if last_sep_idx != -1:
+            data.append({
+                "volume_range":  line[:last_sep_idx].strip(),
+                "filled_volume": line[last_sep_idx+1:].strip(),
+            })
+
+    df = pd.DataFrame(data)
+    if not df.empty:
+        df["filled_volume"] = pd.to_numeric(df["filled_volume"], errors="coerce")
+    return df
+
+# ==========================================
+# INGESTIA SUROWYCH TRANSAKCJI (FILLS)
+# ==========================================
+def bucket_indices(sizes, bucket_width):
+    """
+    Zwraca indeks bucketu (k*w, (k+1)*w] dla każdej wielkości transakcji.
+    Zaokrąglenie ilorazu chroni przed błędami float typu 0.1 * 3 = 0.30000000000000004.
+    """
+    quotient = np.round(np.asarray(sizes, dtype=np.float64) / bucket_width, 9)
+    return np.ceil(quotient).astype(np.int64) - 1
+
+
+def last_bucket(bucket_width, max_size=None):
+    """Indeks ostatniego bucketu akumulatora: z `max_size` albo `DEFAULT_MAX_BUCKETS` bucketów."""
+    if max_size is not None:
+        return int(bucket_indices([max_size], bucket_width)[0])
+    return DEFAULT_MAX_BUCKETS - 1
+
+
+def accumulate_chunk(acc, sizes, bucket_width, max_size=None):
+    """Dodaje wolumen jednej paczki transakcji do akumulatora (tablica wolumenu per bucket)."""
+    sizes = np.asarray(sizes, dtype=np.float64)
+    sizes = sizes[np.isfinite(sizes) & (sizes > 0)]
+    if sizes.size == 0:
+        return acc
+
+    # Transakcje powyżej limitu trafiają do ostatniego bucketu — rozmiar akumulatora jest stały,
+    # także bez `max_size` (pojedyncza odstająca transakcja nie alokuje miliardów bucketów)
+    idx = np.minimum(bucket_indices(sizes, bucket_width), last_bucket(bucket_width, max_size))
+
+    chunk_acc = np.bincount(idx, weights=sizes)
+    if chunk_acc.size > acc.size:
+        acc = np.concatenate([acc, np.zeros(chunk_acc.size - acc.size)])
+    acc[:chunk_acc.size] += chunk_acc
+    return acc
+
+
+def _iter_sizes(path, size_column, chunksize):
+    reader = pd.read_csv(
+        path,
+        sep=_detect_sep(path),
+        usecols=[size_column],
+        chunksize=chunksize,
+        encoding="utf-8-sig",
+    )
+    for chunk in reader:
+        yield pd.to_numeric(chunk[size_column], errors="coerce").to_numpy()
+
+
+def _iter_timed_sizes(path, size_column, time_column, chunksize):
+    reader = pd.read_csv(
+        path,
+        sep=_detect_sep(path),
+        usecols=[time_column, size_column],
+        chunksize=chunksize,
+        encoding="utf-8-sig",
+    )
+    for chunk in reader:
+        times = pd.to_datetime(chunk[time_column], errors="coerce")
+        sizes = pd.to_numeric(chunk[size_column], errors="coerce").to_numpy()
+        yield times, sizes
+
+
+def _detect_sep(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        header = f.readline()
+    return ";" if ";" in header else ","
+
+
+def ingest_file(path, bucket_width=DEFAULT_BUCKET_WIDTH, size_column=DEFAULT_SIZE_COLUMN,
+                chunksize=DEFAULT_CHUNK_SIZE, max_size=None):
+    """
+    Strumieniowo czyta jeden plik z surowymi transakcjami paczkami po `chunksize` wierszy
+    i zwraca tablicę wolumenu per bucket. Pamięć zależy od liczby bucketów, nie od rozmiaru pliku.
+    """
+    acc = np.zeros(0)
+    for sizes in _iter_sizes(path, size_column, chunksize):
+        acc = accumulate_chunk(acc, sizes, bucket_width, max_size)
+    return acc
+
+
+def ingest_file_sketch(path, relative_accuracy, size_column=DEFAULT_SIZE_COLUMN, chunksize=DEFAULT_CHUNK_SIZE):
+    """Jak `ingest_file`, ale akumuluje do `VolumeSketch` — rozmiar stały niezależnie od zakresu wielkości."""
+    sketch = VolumeSketch(relative_accuracy)
+    for sizes in _iter_sizes(path, size_column, chunksize):
+        sketch.add(sizes)
+    return sketch
+
+
+def ingest_file_periods(path, period, bucket_width=DEFAULT_BUCKET_WIDTH, size_column=DEFAULT_SIZE_COLUMN,
+                        time_column=DEFAULT_TIME_COLUMN, chunksize=DEFAULT_CHUNK_SIZE, max_size=None):
+    """
+    Jak `ingest_file`, ale osobny akumulator dla każdego okresu (dzień / godzina).
+    Zwraca słownik {etykieta okresu: tablica wolumenu per bucket}.
+    """
+    fmt = PERIOD_FORMATS[period]
+    accs = {}
+    for times, sizes in _iter_timed_sizes(path, size_column, time_column, chunksize):
+        labels = times.dt.strftime(fmt).to_numpy()
+        sizes = np.asarray(sizes, dtype=np.float64)
+        ok = pd.notna(labels) & np.isfinite(sizes) & (sizes > 0)
+        codes, uniques = pd.factorize(labels[ok])
+        if uniques.size == 0:
+            continue
+        sizes = sizes[ok]
+        idx = np.minimum(bucket_indices(sizes, bucket_width), last_bucket(bucket_width, max_size))
+        for label, row in zip(uniques, _period_rows(codes, idx, sizes, len(uniques))):
+            accs[label] = merge_accumulators([accs.get(label, np.zeros(0)), row])
+    return accs
+
+
+def _period_rows(codes, idx, sizes, n_periods):
+    """
+    Wolumen per (okres, bucket) jednej paczki jednym `bincount` po kluczu `okres * buckety + bucket`
+    (jedno przejście zamiast jednego na okres). Gdy macierz okresy × buckety byłaby większa niż
+    `DENSE_PERIOD_CELLS` (np. odstająca transakcja przy wielu okresach), sumowane są tylko niezerowe pary.
+    """
+    n_buckets = int(idx.max()) + 1
+    keys = codes.astype(np.int64) * n_buckets + idx
+    if n_periods * n_buckets <= DENSE_PERIOD_CELLS:
+        matrix = np.bincount(keys, weights=sizes, minlength=n_periods * n_buckets).reshape(n_periods, n_buckets)
+        return [row[:np.flatnonzero(row)[-1] + 1] if row.any() else row[:0] for row in matrix]
+
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    volumes = np.bincount(inverse, weights=sizes)
+    period_of, bucket_of = np.divmod(unique_keys, n_buckets)
+    bounds = np.searchsorted(period_of, np.arange(n_periods + 1))
+    rows = []
+    for c in range(n_periods):
+        buckets = bucket_of[bounds[c]:bounds[c + 1]]
+        row = np.zeros(buckets[-1] + 1 if buckets.size else 0)
+        row[buckets] = volumes[bounds[c]:bounds[c + 1]]
+        rows.append(row)
+    return rows
+
+
+def merge_period_accumulators(period_accs):
+    """Łączy słowniki okres -> akumulator z wielu plików."""
+    merged = {}
+    for accs in period_accs:
+        for label, acc in accs.items():
+            merged.setdefault(label, []).append(acc)
+    return {label: merge_accumulators(accs) for label, accs in sorted(merged.items())}
+
+
+def merge_accumulators(accs):
+    """Sumuje akumulatory o różnej długości (różne maksymalne wielkości transakcji)."""
+    length = max((a.size for a in accs), default=0)
+    total = np.zeros(length)
+    for a in accs:
+        total[:a.size] += a
+    return total
+
+
+def label_decimals(*values):
+    """Liczba miejsc po przecinku etykiet (co najmniej 1), tak aby każda z `values` była zapisana dokładnie."""
+    return max([1] + [len(f"{v:g}".partition(".")[2]) for v in values])
+
+
+def format_range_label(lo, hi, decimals=1):
+    """Etykieta przedziału (lo, hi] w formacie po clean_csv, np. '0.0 - 0.5'."""
+    return f"{lo:.{decimals}f} - {hi:.{decimals}f}"
+
+
+def format_bucket_label(k, bucket_width):
+    """Etykieta bucketu w formacie po clean_csv, np. '0.0 - 0.1'."""
+    return format_range_label(k * bucket_width, (k + 1) * bucket_width, label_decimals(bucket_width))
+
+
+def write_distribution(acc, output, bucket_width, sep=","):
+    """Zapisuje rozkład `volume_range`/`filled_volume`, który app.py ładuje bezpośrednio."""
+    nonzero = np.flatnonzero(acc)
+    last = nonzero[-1] + 1 if nonzero.size else 0
+    with open(output, 'w', encoding='utf-8-sig') as f:
+        f.write(f"volume_range{sep}filled_volume\n")
+        for k in range(last):
+            f.write(f"{format_bucket_label(k, bucket_width)}{sep}{round(float(acc[k]), 6)}\n")
+
+
+def _map_files(func, args, workers):
+    if len(args) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, args))
+    return [func(a) for a in args]
+
+
+def write_period_distribution(period_accs, output, bucket_width, sep=","):
+    """
+    Zapisuje rozkład w czasie w długim formacie `period, volume_range, filled_volume` na wspólnych bucketach.
+    Wiersze powstają operacjami na tablicach: okresy przez `np.repeat`, etykiety bucketów (formatowane raz
+    na bucket) przez `np.tile`, a wolumeny z macierzy okresy × buckety.
+    """
+    length = max((a.size for a in period_accs.values()), default=0)
+    matrix = np.zeros((len(period_accs), length))
+    for row, acc in zip(matrix, period_accs.values()):
+        row[:acc.size] = acc
+    periods = np.array([f"{label}{sep}" for label in period_accs], dtype=object)
+    bucket_labels = np.array([f"{format_bucket_label(k, bucket_width)}{sep}" for k in range(length)], dtype=object)
+    volumes = np.round(matrix, 6).ravel().astype(str).astype(object)
+    lines = np.repeat(periods, length) + np.tile(bucket_labels, len(period_accs)) + volumes
+    with open(output, 'w', encoding='utf-8-sig') as f:
+        f.write(f"period{sep}volume_range{sep}filled_volume\n")
+        if lines.size:
+            f.write("\n".join(lines) + "\n")
+
+
+def ingest_fills(paths, output, bucket_width=DEFAULT_BUCKET_WIDTH, size_column=DEFAULT_SIZE_COLUMN,
+                 chunksize=DEFAULT_CHUNK_SIZE, max_size=None, workers=None,
+                 sketch_accuracy=None, sketch_output=None, period=None, time_column=DEFAULT_TIME_COLUMN):
+    """
+    Buduje rozkład wolumenu z surowych plików transakcji. Niezależne pliki są przetwarzane
+    równolegle (po jednym procesie na plik), a wyniki sumowane na końcu.
+
+    Przy `sketch_accuracy` zamiast dokładnych bucketów używany jest `VolumeSketch`;
+    połączony szkic można zapisać do `sketch_output` i później materializować w innej rozdzielczości.
+    Przy `period` ("day" / "hour") powstaje rozkład w czasie, jeden wiersz na okres i bucket.
+    """
+    if bucket_width <= 0:
+        raise ValueError("Szerokość bucketu musi być większa od zera.")
+    if period is not None and sketch_accuracy is not None:
+        raise ValueError("Rozkład w czasie jest budowany tylko z dokładnych bucketów (bez szkicu).")
+
+    if period is not None:
+        args = [(p, period, bucket_width, size_column, time_column, chunksize, max_size) for p in paths]
+        period_accs = merge_period_accumulators(_map_files(_ingest_file_periods_args, args, workers))
+        write_period_distribution(period_accs, output, bucket_width)
+        return period_accs
+
+    if sketch_accuracy is not None:
+        args = [(p, sketch_accuracy, size_column, chunksize) for p in paths]
+        sketch = VolumeSketch.merged(_map_files(_ingest_file_sketch_args, args, workers))
+        if sketch_output:
+            sketch.save(sketch_output)
+        write_sketch_distribution(sketch, output, bucket_width)
+        return sketch
+
+    args = [(p, bucket_width, size_column, chunksize, max_size) for p in paths]
+    acc = merge_accumulators(_map_files(_ingest_file_args, args, workers))
+    write_distribution(acc, output, bucket_width)
+    return acc
+
+
+def write_sketch_distribution(sketch, output, bucket_width, sep=","):
+    """Materializuje szkic w zadanej rozdzielczości i zapisuje w formacie ładowanym przez app.py."""
+    df = sketch.to_distribution(bucket_width=bucket_width)
+    write_distribution(df["filled_volume"].to_numpy(), output, bucket_width, sep)
+
+
+def materialize_sketches(sketch_paths, output, bucket_width=DEFAULT_BUCKET_WIDTH):
+    """Łączy zapisane szkice (np. dzienne) i zapisuje rozkład o szerokości `bucket_width`."""
+    sketch = VolumeSketch.merged(VolumeSketch.load(p) for p in sketch_paths)
+    write_sketch_distribution(sketch, output, bucket_width)
+    return sketch
+
+
+def _ingest_file_args(args):
+    return ingest_file(*args)
+
+
+def _ingest_file_sketch_args(args):
+    return ingest_file_sketch(*args)
+
+
+def _ingest_file_periods_args(args):
+    return ingest_file_periods(*args)
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(description="Czyszczenie plików dystrybucji i ingestia surowych transakcji.")
+    sub = parser.add_subparsers(dest="command")
+
+    sub.add_parser("clean", help="Czyści pliki z FILES_TO_CLEAN (domyślna akcja).")
+
+    ingest = sub.add_parser("ingest", help="Buduje rozkład volume_range/filled_volume z surowych transakcji.")
+    ingest.add_argument("paths", nargs="+", help="Pliki CSV z surowymi transakcjami.")
+    ingest.add_argument("-o", "--output", required=True, help="Plik wynikowy, np. spot_distribution.csv")
+    ingest.add_argument("--bucket-width", type=float, default=DEFAULT_BUCKET_WIDTH, help="Szerokość bucketu w lotach.")
+    ingest.add_argument("--size-column", default=DEFAULT_SIZE_COLUMN, help="Kolumna z wielkością transakcji w lotach.")
+    ingest.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE, help="Liczba wierszy w jednej paczce.")
+    ingest.add_argument("--max-size", type=float, default=None,
+                        help="Transakcje powyżej limitu trafiają do ostatniego bucketu "
+                             f"(domyślnie {DEFAULT_MAX_BUCKETS:,} × szerokość bucketu).")
+    ingest.add_argument("--workers", type=int, default=None, help="Liczba procesów (domyślnie liczba rdzeni).")
+    ingest.add_argument("--sketch-accuracy", type=float, default=None,
+                        help="Akumuluj do szkicu o zadanym błędzie względnym (np. 0.01) zamiast dokładnych bucketów.")
+    ingest.add_argument("--sketch-output", default=None, help="Zapisz połączony szkic do pliku JSON.")
+    ingest.add_argument("--period", choices=sorted(PERIOD_FORMATS), default=None,
+                        help="Buduj rozkład w czasie (jeden histogram na dzień / godzinę).")
+    ingest.add_argument("--time-column", default=DEFAULT_TIME_COLUMN, help="Kolumna ze znacznikiem czasu transakcji.")
+
+    materialize = sub.add_parser("materialize", help="Łączy szkice JSON i zapisuje rozkład w zadanej rozdzielczości.")
+    materialize.add_argument("paths", nargs="+", help="Pliki JSON ze szkicami.")
+    materialize.add_argument("-o", "--output", required=True, help="Plik wynikowy, np. spot_distribution.csv")
+    materialize.add_argument("--bucket-width", type=float, default=DEFAULT_BUCKET_WIDTH, help="Szerokość bucketu w lotach.")
+    return parser
+
 
 # Umożliwia odpalenie skryptu także ręcznie w konsoli
 if __name__ == "__main__":
-    clean_all()
\ No newline at end of file
+    args = _build_parser().parse_args()
+    if args.command == "ingest":
+        ingest_fills(
+            args.paths, args.output,
+            bucket_width=args.bucket_width,
+            size_column=args.size_column,
+            chunksize=args.chunksize,
+            max_size=args.max_size,
+            workers=args.workers,
+            sketch_accuracy=args.sketch_accuracy,
+            sketch_output=args.sketch_output,
+            period=args.period,
+            time_column=args.time_column,
+        )
+    elif args.command == "materialize":
+        materialize_sketches(args.paths, args.output, bucket_width=args.bucket_width)
+    else:
+        clean_all()
@@ -0,0 +1,248 @@
+"""
+Wspólna pula obliczeń dla wszystkich sesji Streamlit.
+
+Rozkłady są publikowane raz w pamięci współdzielonej (`multiprocessing.shared_memory`), więc procesy
+robocze nie dostają ich przy każdym zleceniu — przesyłane są tylko Order Booki. Identyczne zlecenia
+będące w toku (ten sam klucz: rynek, odcisk rozkładu, odciski Order Booków, mnożnik) są łączone w jedno
+obliczenie. Liczba zleceń w kolejce jest ograniczona (backpressure), a jej głębokość jest dostępna
+do podglądu. Wersja rozkładu jest zwalniana dopiero, gdy nie używa jej żadne zlecenie w toku, a procesy
+robocze odłączają bloki, których proces główny już nie publikuje.
+"""
+import atexit
+import os
+import sys
+import threading
+import types
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from multiprocessing import context, shared_memory
+from typing import Hashable
+
+import numpy as np
+import pandas as pd
+
+from engine import Distribution, ScenarioComparison, compare_scenarios
+
+DEFAULT_MAX_PENDING = 64          # Maksymalna liczba różnych zleceń w toku
+DEFAULT_SUBMIT_TIMEOUT_S = 30.0   # Jak długo zlecenie czeka na miejsce w kolejce
+GENERATIONS_PER_MARKET = 2        # Ile wersji rozkładu rynku trzymać (więcej, dopóki zlecenia w toku ich używają)
+
+
+class PoolBusy(RuntimeError):
+    """Kolejka puli jest pełna dłużej niż `submit_timeout`."""
+
+
+# ==========================================
+# PROCESY ROBOCZE
+# ==========================================
+class _ScriptSafeProcess(context.SpawnProcess):
+    """
+    Proces `spawn`, który nie wykonuje ponownie skryptu aplikacji. Streamlit uruchamia skrypt jako `__main__`,
+    a `spawn` importuje moduł `__main__` w każdym nowym procesie — na czas startu podstawiany jest pusty moduł.
+    """
+
+    def start(self) -> None:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            super().start()
+        finally:
+            sys.modules["__main__"] = main
+
+
+class _ScriptSafeContext(context.SpawnContext):
+    Process = _ScriptSafeProcess
+
+
+def create_worker_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Pula procesów dla silnika — wspólna dla porównań scenariuszy, portfolio i zadań w tle."""
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=_ScriptSafeContext())
+
+
+# ==========================================
+# ROZKŁADY W PAMIĘCI WSPÓŁDZIELONEJ
+# ==========================================
+def _to_shared(array: np.ndarray) -> tuple[shared_memory.SharedMemory, tuple]:
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+class SharedDistribution:
+    """`Distribution` skopiowana do bloków pamięci współdzielonej; `descriptor` jest lekki i picklowalny."""
+
+    def __init__(self, dist: Distribution):
+        labels = np.asarray(dist.labels).astype(str)
+        blocks = [_to_shared(labels), _to_shared(np.asarray(dist.bucket_ends, dtype=np.float64)),
+                  _to_shared(np.asarray(dist.volumes, dtype=np.float64))]
+        self._blocks = [shm for shm, _ in blocks]
+        self.descriptor = (tuple(desc for _, desc in blocks), dist.unparsed)
+        self.names = frozenset(shm.name for shm in self._blocks)
+        self.refs = 0   # zlecenia (i przypięcia z `publish`), które jeszcze potrzebują bloków
+
+    def close(self) -> None:
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+
+# Bloki podłączone w procesie roboczym — każdy rozkład mapowany raz na proces
+_attached: dict[str, tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _detach_stale(published: frozenset[str]) -> None:
+    """Odłącza bloki, których proces główny już nie publikuje — nieaktualne wersje nie zostają zmapowane."""
+    for name in [n for n in _attached if n not in published]:
+        shm, _ = _attached.pop(name)
+        shm.close()
+
+
+def _attach(name: str, shape: tuple, dtype: str) -> np.ndarray:
+    if name not in _attached:
+        # Procesy `spawn` dzielą resource_tracker z procesem głównym — blok zwalnia tylko właściciel
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    return _attached[name][1]
+
+
+def attach_distribution(descriptor: tuple) -> Distribution:
+    (labels, ends, volumes), unparsed = descriptor
+    return Distribution(labels=_attach(*labels), bucket_ends=_attach(*ends), volumes=_attach(*volumes),
+                        unparsed=unparsed)
+
+
+def compare_shared(descriptor: tuple, order_books: list[pd.DataFrame], base_idx: int, lot_price: float,
+                   spread_multiplier: float, published: frozenset[str] = frozenset()) -> ScenarioComparison:
+    """
+    Funkcja procesu roboczego: `compare_scenarios` na rozkładzie z pamięci współdzielonej.
+    `published` — bloki publikowane w chwili zlecenia; pozostałe podłączone wcześniej są zamykane.
+    """
+    _detach_stale(published)
+    return compare_scenarios(order_books, attach_distribution(descriptor), base_idx, lot_price, spread_multiplier)
+
+
+# ==========================================
+# PULA Z ŁĄCZENIEM ZLECEŃ I BACKPRESSURE
+# ==========================================
+class ComputePool:
+    """Kolejkuje porównania scenariuszy na wspólnej puli procesów."""
+
+    def __init__(self, executor: Executor, max_pending: int = DEFAULT_MAX_PENDING,
+                 submit_timeout: float = DEFAULT_SUBMIT_TIMEOUT_S):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self.coalesced = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._inflight: dict[Hashable, Future] = {}
+        self._distributions: dict[str, list[tuple[str, SharedDistribution]]] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    # ------------------------------------------
+    # Rozkłady
+    # ------------------------------------------
+    def publish(self, market_key: str, fingerprint: str, dist: Distribution) -> tuple:
+        """
+        Deskryptor rozkładu rynku w pamięci współdzielonej (publikowany raz na odcisk). Wersja jest przypięta
+        do czasu `submit` z tym deskryptorem (albo `release`) — nie zostanie zwolniona przed wysłaniem zlecenia.
+        """
+        with self._lock:
+            generations = self._distributions.setdefault(market_key, [])
+            shared = next((sh for fp, sh in generations if fp == fingerprint), None)
+            if shared is None:
+                shared = SharedDistribution(dist)
+                generations.append((fingerprint, shared))
+            shared.refs += 1
+            self._evict(market_key)
+            return shared.descriptor
+
+    def release(self, descriptor: tuple) -> None:
+        """Zwalnia przypięcie z `publish` (deskryptor nie trafił do żadnego zlecenia)."""
+        with self._lock:
+            self._unref(descriptor)
+
+    def _find(self, descriptor: tuple) -> tuple[str, SharedDistribution] | None:
+        for market_key, generations in self._distributions.items():
+            for _, shared in generations:
+                if shared.descriptor == descriptor:
+                    return market_key, shared
+        return None
+
+    def _unref(self, descriptor: tuple) -> None:
+        found = self._find(descriptor)
+        if found is not None:
+            found[1].refs -= 1
+            self._evict(found[0])
+
+    def _evict(self, market_key: str) -> None:
+        """Zwalnia najstarsze wersje ponad limit — tylko te, których nie używa żadne zlecenie (pod blokadą)."""
+        generations = self._distributions.get(market_key, [])
+        for entry in list(generations):
+            if len(generations) <= GENERATIONS_PER_MARKET:
+                break
+            if entry[1].refs <= 0:
+                generations.remove(entry)
+                entry[1].close()
+
+    def _published_names(self) -> frozenset[str]:
+        return frozenset(name for generations in self._distributions.values()
+                         for _, shared in generations for name in shared.names)
+
+    # ------------------------------------------
+    # Zlecenia
+    # ------------------------------------------
+    def submit(self, key: Hashable, descriptor: tuple, order_books: list[pd.DataFrame], base_idx: int,
+               lot_price: float, spread_multiplier: float) -> Future:
+        """
+        Zleca porównanie albo zwraca Future identycznego zlecenia w toku. Przypięcie deskryptora z `publish`
+        przechodzi na zlecenie (zwalniane po jego zakończeniu) albo jest zwalniane od razu.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                self._unref(descriptor)
+                return future
+
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            self.release(descriptor)
+            raise PoolBusy(f"Pula obliczeń zajęta ({self.max_pending} zleceń w toku).")
+
+        with self._lock:
+            # Inna sesja mogła zlecić to samo w czasie oczekiwania na miejsce
+            future = self._inflight.get(key)
+            if future is not None:
+                self._slots.release()
+                self.coalesced += 1
+                self._unref(descriptor)
+                return future
+            try:
+                future = self.executor.submit(compare_shared, descriptor, order_books, base_idx, lot_price,
+                                              spread_multiplier, self._published_names())
+            except Exception:
+                self._slots.release()
+                self._unref(descriptor)
+                raise
+            self._inflight[key] = future
+        future.add_done_callback(lambda f, key=key: self._done(key, f, descriptor))
+        return future
+
+    def _done(self, key: Hashable, future: Future, descriptor: tuple) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            self._unref(descriptor)
+        self._slots.release()
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def close(self) -> None:
+        with self._lock:
+            for generations in self._distributions.values():
+                for _, shared in generations:
+                    shared.close()
+            self._distributions.clear()
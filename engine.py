@@ -0,0 +1,1000 @@
+"""
+Silnik kalkulacji przychodu — niezależny od Streamlit, dzięki czemu może być używany
+przez app.py, skrypty w `benchmarks/` oraz procesy robocze.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================================
+# 3. ORDER BOOK I WALIDACJA
+# ==========================================
+def validate_order_book(ob: pd.DataFrame) -> list[str]:
+    errors = []
+    for col in ["Ask Size", "Spread"]:
+        if col not in ob.columns:
+            errors.append(f"Brak kolumny: {col}")
+            return errors
+
+    if ob["Ask Size"].isnull().any():
+        errors.append("Kolumna 'Ask Size' zawiera puste wartości.")
+    elif (ob["Ask Size"] <= 0).any():
+        errors.append("Wartości 'Ask Size' muszą być większe od zera.")
+
+    if ob["Spread"].isnull().any():
+        errors.append("Kolumna 'Spread' zawiera puste wartości.")
+    elif (ob["Spread"] <= 0).any():
+        errors.append("Wartości 'Spread' muszą być większe od zera.")
+
+    return errors
+
+
+class InvalidOrderBook(ValueError):
+    """Order Book odrzucony przy budowie `OrderBook` — `errors` to komunikaty `validate_order_book`."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _readonly(values: np.ndarray) -> np.ndarray:
+    values.flags.writeable = False
+    return values
+
+
+@dataclass(frozen=True, eq=False)
+class OrderBook:
+    """
+    Niezmienny Order Book na ciągłych tablicach numerycznych. Budowany raz z wyjścia edytora
+    (`from_frame`, z walidacją) i współdzielony przez silnik, fill rate, wykresy i cache —
+    bez kopii tabeli i konwersji kolumn przy każdym wywołaniu. Równość i hash wg `fingerprint`.
+    """
+    lines: np.ndarray      # (L,) int64 — OB Line
+    bid: np.ndarray        # (L,)
+    ask: np.ndarray        # (L,)
+    spread: np.ndarray     # (L,)
+    cum_ask: np.ndarray    # (L,) — skumulowany Ask Size
+    fingerprint: str       # skrót (OB Line, Ask Size, Spread) — tego, co wpływa na przychód
+
+    def __len__(self) -> int:
+        return len(self.ask)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, OrderBook) and other.fingerprint == self.fingerprint
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
+    @classmethod
+    def from_arrays(cls, lines, ask, spread, bid=None) -> "OrderBook":
+        """Z tablic (kopiowanych raz, tylko do odczytu); bez `bid` Bid Size = Ask Size."""
+        lines  = _readonly(np.array(lines, dtype=np.int64))
+        ask    = _readonly(np.array(ask, dtype=np.float64))
+        spread = _readonly(np.array(spread, dtype=np.float64))
+        bid    = ask if bid is None else _readonly(np.array(bid, dtype=np.float64))
+
+        h = hashlib.sha1(np.stack([ask, spread]).tobytes())
+        h.update("|".join(map(str, lines.tolist())).encode())
+        return cls(lines=lines, bid=bid, ask=ask, spread=spread, cum_ask=_readonly(np.cumsum(ask)),
+                   fingerprint=h.hexdigest())
+
+    @classmethod
+    def from_frame(cls, order_book: pd.DataFrame, validate: bool = True) -> "OrderBook":
+        """
+        Z tabeli edytora (OB Line, Bid Size, Ask Size, Spread). Przy `validate` błędy
+        `validate_order_book` kończą się `InvalidOrderBook`; brakujące lub puste OB Line = numeracja wg pozycji.
+        """
+        if validate:
+            errors = validate_order_book(order_book)
+            if errors:
+                raise InvalidOrderBook(errors)
+
+        ask    = pd.to_numeric(order_book["Ask Size"], errors="coerce").to_numpy(dtype=np.float64)
+        spread = pd.to_numeric(order_book["Spread"],   errors="coerce").to_numpy(dtype=np.float64)
+        bid = (pd.to_numeric(order_book["Bid Size"], errors="coerce").to_numpy(dtype=np.float64)
+               if "Bid Size" in order_book.columns else None)
+        lines = pd.to_numeric(order_book["OB Line"], errors="coerce") if "OB Line" in order_book.columns else None
+        if lines is None or lines.isnull().any():
+            # Brak kolumny lub nowe wiersze bez numeru linii — numeracja wg pozycji
+            lines = np.arange(1, len(order_book) + 1)
+        else:
+            lines = lines.to_numpy().astype(np.int64)
+        return cls.from_arrays(lines, ask, spread, bid)
+
+    def frame(self) -> pd.DataFrame:
+        """Tabela w formacie edytora (np. do podmiany Order Booka scenariusza)."""
+        return pd.DataFrame({"OB Line": self.lines, "Bid Size": self.bid, "Ask Size": self.ask, "Spread": self.spread})
+
+
+OrderBookLike = OrderBook | pd.DataFrame
+
+
+def as_order_book(order_book: OrderBookLike) -> OrderBook:
+    """`OrderBook` bez zmian; tabela (np. w benchmarkach) jest konwertowana bez walidacji, jak dotąd w silniku."""
+    return order_book if isinstance(order_book, OrderBook) else OrderBook.from_frame(order_book, validate=False)
+
+# ==========================================
+# 4. SILNIK KALKULACJI
+# ==========================================
+def parse_bucket_end(vol_range_str: str) -> float | None:
+    """
+    Obsługuje wszystkie warianty formatowania przedziałów:
+      - '0.0 - 0.1'      (format po clean_csv)
+      - '(0.0, 0.1]'     (format pandas interval z przecinkiem)
+      - '(0.0 0.1]'      (format pandas interval ze spacją)
+      - '0.0 0.1'        (surowy format ze spacją, bez nawiasów)
+    """
+    try:
+        s = str(vol_range_str).strip()
+        # Usuń nawiasy interwałowe
+        s = s.replace('(', '').replace(')', '').replace('[', '').replace(']', '').strip()
+
+        if ' - ' in s:
+            # Format po clean_csv: "0.0 - 0.1"
+            end_str = s.split(' - ')[1].strip()
+        elif ',' in s:
+            # Format pandas z przecinkiem: "0.0, 0.1"
+            end_str = s.split(',')[1].strip()
+        else:
+            # Format ze spacją: "0.0 0.1"
+            parts = s.split()
+            if len(parts) < 2:
+                return None
+            end_str = parts[-1].strip()
+
+        return float(end_str)
+    except (IndexError, ValueError):
+        return None
+
+
+def calculate_per_bucket_revenue(order_book: OrderBookLike, volume_distribution: pd.DataFrame, lot_price: float,
+                                 spread_multiplier: float = 1.0,
+                                 on_unparsed: Callable[[str], None] | None = None) -> pd.DataFrame:
+    return score_scenarios([order_book], volume_distribution, lot_price, spread_multiplier, on_unparsed)[0]
+
+
+def calculate_fill_rate_per_line(results: pd.DataFrame, order_book: OrderBookLike, lot_price: float) -> pd.DataFrame:
+    lines = as_order_book(order_book).lines.tolist()
+
+    if results.empty:
+        counts   = pd.Series(0, index=lines)
+        volumes  = pd.Series(0.0, index=lines)
+        revenues = pd.Series(0.0, index=lines)
+    else:
+        grouped  = results.groupby("OB_Line_Used")
+        counts   = grouped.size().reindex(lines, fill_value=0)
+        volumes  = grouped["Filled_Volume"].sum().reindex(lines, fill_value=0.0)
+        revenues = grouped["Revenue_USD"].sum().reindex(lines, fill_value=0.0)
+
+    volumes  = volumes.to_numpy(dtype=np.float64)
+    revenues = revenues.to_numpy(dtype=np.float64)
+    # Suma po unikalnych liniach — jak w słowniku per linia, gdy OB Line się powtarza
+    total_volume = float(pd.Series(volumes, index=lines).groupby(level=0).first().sum())
+    turnover = volumes * lot_price
+    rpm = np.divide(revenues, turnover, out=np.zeros_like(revenues), where=turnover > 0) * 1_000_000
+
+    return pd.DataFrame({
+        "OB Line":         lines,
+        "Fill Count":      counts.to_numpy(),
+        "Fill Volume":     _round_list(volumes, 2),
+        "Fill Volume (%)": _round_list(volumes / total_volume * 100, 1) if total_volume > 0 else [0.0] * len(lines),
+        "RPM":             _round_list(rpm, 2),
+    })
+
+
+def _round_list(values: np.ndarray, digits: int) -> list[float]:
+    """Zaokrąglenie wbudowanym `round` — identyczne wyniki jak w dotychczasowym liczeniu per wiersz."""
+    return [round(v, digits) for v in values.tolist()]
+
+
+# ==========================================
+# 5. WEKTOROWE PRZYPISANIE LINII
+# ==========================================
+def parse_bucket_ends(vol_ranges) -> np.ndarray:
+    """Górne granice bucketów jako tablica float — NaN dla nieparsowalnych przedziałów."""
+    ends = [parse_bucket_end(v) for v in vol_ranges]
+    return np.array([np.nan if e is None else e for e in ends], dtype=np.float64)
+
+
+def order_book_arrays(order_book: OrderBookLike) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(OB Line, Ask Size, Spread) jako tablice numeryczne (tylko do odczytu)."""
+    book = as_order_book(order_book)
+    return book.lines, book.ask, book.spread
+
+
+def assign_lines(ask_sizes: np.ndarray, bucket_ends: np.ndarray) -> np.ndarray:
+    """
+    Indeks (od 0) pierwszej linii, której skumulowany Ask Size >= górna granica bucketu.
+    Buckety powyżej pojemności całego OB trafiają na ostatnią linię — jak w `calculate_per_bucket_revenue`.
+    """
+    return assign_cumulative(np.cumsum(ask_sizes), bucket_ends)
+
+
+def assign_cumulative(cum_ask: np.ndarray, bucket_ends: np.ndarray) -> np.ndarray:
+    """`assign_lines` dla gotowego skumulowanego Ask Size (np. `OrderBook.cum_ask`)."""
+    idx = np.searchsorted(cum_ask, bucket_ends, side="left")
+    return np.minimum(idx, len(cum_ask) - 1)
+
+
+def bucket_spreads(order_book: OrderBookLike, bucket_ends: np.ndarray) -> np.ndarray:
+    """Spread przypisany każdemu bucketowi przez dany Order Book."""
+    book = as_order_book(order_book)
+    return book.spread[assign_cumulative(book.cum_ask, bucket_ends)]
+
+
+def order_book_fingerprint(order_book: OrderBookLike) -> str:
+    """Skrót zawartości OB (OB Line, Ask Size, Spread) — klucz do wykrywania zmian i cache'owania wyników."""
+    return as_order_book(order_book).fingerprint
+
+
+def distribution_fingerprint(volume_distribution: pd.DataFrame) -> str:
+    """Skrót rozkładu (etykiety bucketów i wolumeny)."""
+    h = hashlib.sha1("|".join(map(str, volume_distribution["volume_range"])).encode())
+    h.update(pd.to_numeric(volume_distribution["filled_volume"], errors="coerce").to_numpy(dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def score_order_book(order_book: OrderBookLike, volume_distribution: pd.DataFrame, lot_price: float,
+                     spread_multiplier: float = 1.0) -> tuple[pd.DataFrame, list[str]]:
+    """
+    `calculate_per_bucket_revenue` zwracające też listę nieparsowalnych przedziałów —
+    funkcja modułowa, więc może być wysyłana do puli procesów, a wynik trzymany w cache.
+    """
+    unparsed: list[str] = []
+    results = calculate_per_bucket_revenue(order_book, volume_distribution, lot_price, spread_multiplier,
+                                           unparsed.append)
+    return results, unparsed
+
+
+# ==========================================
+# 6. ROZKŁADY PANELOWE (OKRESY × BUCKETY)
+# ==========================================
+@dataclass(frozen=True)
+class PanelDistribution:
+    """
+    Rozkład indeksowany kluczem (np. dzień / godzina) na wspólnych bucketach,
+    przechowywany jako jedna macierz `volumes` o wymiarach klucze × buckety.
+    """
+    keys: np.ndarray
+    labels: np.ndarray
+    bucket_ends: np.ndarray
+    volumes: np.ndarray
+
+    @property
+    def empty(self) -> bool:
+        return self.volumes.size == 0
+
+    def total(self) -> pd.DataFrame:
+        """Rozkład zsumowany po kluczach — w formacie `volume_range`/`filled_volume`."""
+        return pd.DataFrame({"volume_range": self.labels, "filled_volume": self.volumes.sum(axis=0)})
+
+
+def panel_from_long(df: pd.DataFrame, key_column: str) -> PanelDistribution:
+    """Buduje `PanelDistribution` z długiego formatu `key_column, volume_range, filled_volume`."""
+    df = df.assign(filled_volume=pd.to_numeric(df["filled_volume"], errors="coerce").fillna(0.0))
+    matrix = df.pivot_table(index=key_column, columns="volume_range", values="filled_volume",
+                            aggfunc="sum", fill_value=0.0, sort=True)
+
+    ends = parse_bucket_ends(matrix.columns)
+    keep = np.isfinite(ends)
+    order = np.argsort(ends[keep], kind="stable")
+    labels = matrix.columns.to_numpy()[keep][order]
+
+    return PanelDistribution(
+        keys=matrix.index.to_numpy(),
+        labels=labels,
+        bucket_ends=ends[keep][order],
+        volumes=matrix.to_numpy(dtype=np.float64)[:, keep][:, order],
+    )
+
+
+def score_panel(order_book: OrderBookLike, panel: PanelDistribution, lot_price: float,
+                spread_multiplier: float = 1.0) -> pd.DataFrame:
+    """
+    Ocenia jeden Order Book dla wszystkich wierszy panelu naraz: przypisanie linii liczone jest
+    raz dla wspólnych bucketów, a przychód per klucz to jedno mnożenie macierz × wektor.
+    """
+    spreads  = bucket_spreads(order_book, panel.bucket_ends)
+    revenue  = panel.volumes @ spreads * spread_multiplier / 2
+    volume   = panel.volumes.sum(axis=1)
+    turnover = volume * lot_price
+    rpm      = np.divide(revenue * 1_000_000, turnover, out=np.zeros_like(revenue), where=turnover > 0)
+
+    return pd.DataFrame({
+        "Key":           panel.keys,
+        "Filled_Volume": volume,
+        "Turnover_USD":  turnover,
+        "Revenue_USD":   revenue,
+        "RPM":           rpm,
+    })
+
+
+# ==========================================
+# 7. OCENA WIELU ORDER BOOKÓW NARAZ (BATCH)
+# ==========================================
+@dataclass(frozen=True)
+class StackedOrderBooks:
+    """
+    Order Booki o różnej liczbie linii ułożone w macierze scenariusze × linie.
+    Brakujące linie mają skumulowany Ask Size = +inf, więc nigdy nie są przypisywane.
+    """
+    cum_ask: np.ndarray   # (S, L)
+    spreads: np.ndarray   # (S, L)
+    n_lines: np.ndarray   # (S,)
+
+    def __len__(self) -> int:
+        return len(self.n_lines)
+
+
+def stack_order_books(order_books: list[OrderBookLike]) -> StackedOrderBooks:
+    books = [as_order_book(ob) for ob in order_books]
+    n_lines = np.array([len(book) for book in books], dtype=np.int64)
+    width = int(n_lines.max()) if len(n_lines) else 0
+
+    cum_ask = np.full((len(books), width), np.inf)
+    spreads = np.zeros((len(books), width))
+    for s, book in enumerate(books):
+        cum_ask[s, :len(book)] = book.cum_ask
+        spreads[s, :len(book)] = book.spread
+    return StackedOrderBooks(cum_ask=cum_ask, spreads=spreads, n_lines=n_lines)
+
+
+def assign_lines_batch(books: StackedOrderBooks, bucket_ends: np.ndarray) -> np.ndarray:
+    """Macierz scenariusze × buckety z indeksem przypisanej linii (wektorowy odpowiednik `assign_lines`)."""
+    idx = (books.cum_ask[:, None, :] < bucket_ends[None, :, None]).sum(axis=2)
+    return np.minimum(idx, books.n_lines[:, None] - 1)
+
+
+@dataclass(frozen=True)
+class BatchScore:
+    """Wyniki `score_batch`: sumy per scenariusz oraz agregaty per linia (scenariusze × linie)."""
+    line_idx: np.ndarray       # (S, B)
+    spreads: np.ndarray        # (S, B) — spread przypisany każdemu bucketowi
+    revenue: np.ndarray        # (S,)
+    volume: np.ndarray         # (S,)
+    turnover: np.ndarray       # (S,)
+    line_volume: np.ndarray    # (S, L)
+    line_revenue: np.ndarray   # (S, L)
+    line_count: np.ndarray     # (S, L)
+
+    @property
+    def rpm(self) -> np.ndarray:
+        return np.divide(self.revenue * 1_000_000, self.turnover,
+                         out=np.zeros_like(self.revenue), where=self.turnover > 0)
+
+
+def score_batch(order_books: list[OrderBookLike] | StackedOrderBooks, bucket_ends: np.ndarray, volumes: np.ndarray,
+                lot_price: float, spread_multiplier: float = 1.0, line_idx: np.ndarray | None = None) -> BatchScore:
+    """
+    Ocenia S Order Booków w jednym przebiegu. `volumes` to wspólny rozkład (B,)
+    albo osobny rozkład dla każdego scenariusza (S, B), np. okno czasowe lub segment klienta.
+    `line_idx` pozwala podać gotowe przypisanie linii (S, B) zamiast liczyć je z `bucket_ends`.
+    """
+    books = order_books if isinstance(order_books, StackedOrderBooks) else stack_order_books(order_books)
+    n_books, width = books.spreads.shape
+
+    if line_idx is None:
+        line_idx = assign_lines_batch(books, bucket_ends)
+    spreads  = np.take_along_axis(books.spreads, line_idx, axis=1)
+    vols     = np.broadcast_to(volumes, line_idx.shape)
+    bucket_revenue = vols * spreads * spread_multiplier / 2
+
+    flat = (line_idx + np.arange(n_books)[:, None] * width).ravel()
+    size = n_books * width
+    line_volume  = np.bincount(flat, weights=vols.ravel(), minlength=size).reshape(n_books, width)
+    line_revenue = np.bincount(flat, weights=bucket_revenue.ravel(), minlength=size).reshape(n_books, width)
+    line_count   = np.bincount(flat, minlength=size).reshape(n_books, width)
+
+    volume = vols.sum(axis=1)
+    return BatchScore(
+        line_idx=line_idx,
+        spreads=spreads,
+        revenue=bucket_revenue.sum(axis=1),
+        volume=volume,
+        turnover=volume * lot_price,
+        line_volume=line_volume,
+        line_revenue=line_revenue,
+        line_count=line_count,
+    )
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """Rozkład gotowy do liczenia: etykiety, górne granice i wolumeny bucketów (bez nieparsowalnych)."""
+    labels: np.ndarray
+    bucket_ends: np.ndarray
+    volumes: np.ndarray
+    unparsed: tuple[str, ...] = ()
+
+
+def prepare_distribution(volume_distribution: pd.DataFrame) -> Distribution:
+    labels  = volume_distribution["volume_range"].to_numpy()
+    ends    = parse_bucket_ends(labels)
+    volumes = pd.to_numeric(volume_distribution["filled_volume"], errors="coerce").to_numpy(dtype=np.float64)
+    ok = np.isfinite(ends)
+    return Distribution(
+        labels=labels[ok],
+        bucket_ends=ends[ok],
+        volumes=volumes[ok],
+        unparsed=tuple(labels[~ok].tolist()),
+    )
+
+
+def results_frame(dist: Distribution, line_ids: np.ndarray, spreads: np.ndarray, lot_price: float,
+                  spread_multiplier: float = 1.0) -> pd.DataFrame:
+    """Tabela wyników per bucket (format `calculate_per_bucket_revenue`) z przypisanych linii i spreadów."""
+    revenue  = np.array(_round_list(dist.volumes * spreads * spread_multiplier / 2, 2))
+    turnover = dist.volumes * lot_price
+    rpm      = np.divide(revenue, turnover, out=np.zeros_like(revenue), where=turnover > 0) * 1_000_000
+
+    return pd.DataFrame({
+        "Volume_Bucket":   dist.labels,
+        "Filled_Volume":   _round_list(dist.volumes, 2),
+        "OB_Line_Used":    line_ids,
+        "Assigned_Spread": _round_list(spreads, 2),
+        "Turnover_USD":    _round_list(turnover, 2),
+        "Revenue_USD":     revenue,
+        "RPM":             _round_list(rpm, 2),
+    })
+
+
+def score_scenarios(order_books: list[OrderBookLike], volume_distribution: pd.DataFrame | Distribution,
+                    lot_price: float, spread_multiplier: float = 1.0,
+                    on_unparsed: Callable[[str], None] | None = None) -> list[pd.DataFrame]:
+    """Tabele wyników per bucket dla wielu Order Booków — jedno wywołanie `score_batch` dla wszystkich."""
+    return compare_scenarios(order_books, volume_distribution, 0, lot_price, spread_multiplier, on_unparsed).results
+
+
+# ==========================================
+# 8. OKNA CZASOWE (HARMONOGRAM GODZINOWY)
+# ==========================================
+def hour_window_index(keys, windows: list[tuple[str, int, int]]) -> np.ndarray:
+    """
+    Dla każdej etykiety okresu (np. '2026-01-05 14:00') zwraca indeks okna z `windows`
+    [(nazwa, godzina_od, godzina_do)], gdzie okno może przechodzić przez północ (np. 22 -> 7).
+    Okresy poza wszystkimi oknami dostają -1.
+    """
+    hours = pd.to_datetime(pd.Series(keys), errors="coerce").dt.hour.to_numpy()
+    result = np.full(len(hours), -1, dtype=np.int64)
+    for w, (_, start, end) in enumerate(windows):
+        if start < end:
+            mask = (hours >= start) & (hours < end)
+        else:
+            mask = (hours >= start) | (hours < end)
+        result[(result == -1) & mask] = w
+    return result
+
+
+def group_panel(panel: PanelDistribution, group_idx: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sumuje wiersze panelu w grupy (np. godziny -> okna) — macierz grupy × buckety."""
+    grouped = np.zeros((n_groups, panel.volumes.shape[1]))
+    valid = group_idx >= 0
+    np.add.at(grouped, group_idx[valid], panel.volumes[valid])
+    return grouped
+
+
+# ==========================================
+# 9. SEGMENTY KLIENTÓW (MIESZANKA ROZKŁADÓW)
+# ==========================================
+@dataclass(frozen=True)
+class SegmentScore:
+    """Sumy per segment × scenariusz — mieszanka segmentów to już tylko ich ważona suma."""
+    keys: np.ndarray
+    revenue: np.ndarray    # (K, S)
+    volume: np.ndarray     # (K,)
+    turnover: np.ndarray   # (K,)
+
+    @property
+    def rpm(self) -> np.ndarray:
+        return np.divide(self.revenue * 1_000_000, self.turnover[:, None],
+                         out=np.zeros_like(self.revenue), where=self.turnover[:, None] > 0)
+
+    def mix(self, weights) -> tuple[np.ndarray, float]:
+        """
+        Łączy segmenty z wagami (1.0 = flow jak w danych, 2.0 = podwojony, 0 = pominięty).
+        Zwraca (przychód per scenariusz, łączny turnover) bez ponownego liczenia bucketów.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        return weights @ self.revenue, float(weights @ self.turnover)
+
+
+def score_segments(order_books: list[OrderBookLike], panel: PanelDistribution, lot_price: float,
+                   spread_multiplier: float = 1.0) -> SegmentScore:
+    """Ocenia S Order Booków względem K segmentów jednym iloczynem macierzy (K × B) @ (B × S)."""
+    books   = stack_order_books(order_books)
+    spreads = np.take_along_axis(books.spreads, assign_lines_batch(books, panel.bucket_ends), axis=1)
+    volume  = panel.volumes.sum(axis=1)
+    return SegmentScore(
+        keys=panel.keys,
+        revenue=panel.volumes @ spreads.T * spread_multiplier / 2,
+        volume=volume,
+        turnover=volume * lot_price,
+    )
+
+
+# ==========================================
+# 10. ATRYBUCJA ZMIANY PRZYCHODU
+# ==========================================
+@dataclass(frozen=True)
+class RevenueAttribution:
+    """
+    Rozbicie zmiany przychodu każdego scenariusza względem bazowego, per bucket (scenariusze × buckety):
+    efekt spreadu (ta sama linia co w bazie, nowy spread) i efekt zmiany linii (bucket trafia na inną linię).
+    Suma obu efektów to dokładnie różnica przychodu bucketu (przed zaokrągleniem do centów).
+    """
+    labels: np.ndarray
+    base_lines: np.ndarray            # (B,) — OB Line bazowego scenariusza
+    lines: np.ndarray                 # (S, B) — OB Line scenariusza
+    spread_effect: np.ndarray         # (S, B)
+    reassignment_effect: np.ndarray   # (S, B)
+
+    @property
+    def delta(self) -> np.ndarray:
+        return self.spread_effect + self.reassignment_effect
+
+    def totals(self) -> tuple[np.ndarray, np.ndarray]:
+        """Sumy efektu spreadu i efektu zmiany linii per scenariusz."""
+        return self.spread_effect.sum(axis=1), self.reassignment_effect.sum(axis=1)
+
+    def frame(self, s: int) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Volume_Bucket":           self.labels,
+            "OB_Line_Base":            self.base_lines,
+            "OB_Line_Used":            self.lines[s],
+            "Spread_Effect_USD":       _round_list(self.spread_effect[s], 2),
+            "Reassignment_Effect_USD": _round_list(self.reassignment_effect[s], 2),
+            "Delta_USD":               _round_list(self.delta[s], 2),
+        })
+
+
+@dataclass(frozen=True)
+class ScenarioComparison:
+    """Wyniki per bucket wszystkich scenariuszy i atrybucja zmian względem bazowego — z jednego przebiegu."""
+    results: list[pd.DataFrame]
+    attribution: RevenueAttribution | None
+    line_volumes: list[np.ndarray]    # wolumen przypisany każdej linii, per scenariusz
+
+
+def attribute_batch(books: StackedOrderBooks, batch: BatchScore, dist: Distribution, line_ids: list[np.ndarray],
+                    base_idx: int, spread_multiplier: float = 1.0) -> RevenueAttribution:
+    """
+    Atrybucja na gotowym wyniku `score_batch`. Dla bucketu o wolumenie V, linii bazowej l_A i linii
+    scenariusza l_B: efekt spreadu = V·(s_B[l_A] − s_A[l_A])·m/2, efekt zmiany linii = V·(s_B[l_B] − s_B[l_A])·m/2.
+    Gdy scenariusz ma mniej linii niż l_A, za "tę samą linię" przyjmowana jest jego ostatnia linia.
+    """
+    base_line = batch.line_idx[base_idx]
+    same_line = np.minimum(base_line[None, :], books.n_lines[:, None] - 1)
+    same_spread = np.take_along_axis(books.spreads, same_line, axis=1)
+
+    half_volume = dist.volumes * spread_multiplier / 2
+    spread_effect = half_volume * (same_spread - batch.spreads[base_idx])
+    reassignment_effect = half_volume * (batch.spreads - same_spread)
+
+    return RevenueAttribution(
+        labels=dist.labels,
+        base_lines=line_ids[base_idx][base_line],
+        lines=np.stack([ids[batch.line_idx[s]] for s, ids in enumerate(line_ids)]),
+        spread_effect=spread_effect,
+        reassignment_effect=reassignment_effect,
+    )
+
+
+def compare_scenarios(order_books: list[OrderBookLike], volume_distribution: pd.DataFrame | Distribution,
+                      base_idx: int, lot_price: float, spread_multiplier: float = 1.0,
+                      on_unparsed: Callable[[str], None] | None = None) -> ScenarioComparison:
+    """`score_scenarios` i atrybucja zmian względem scenariusza `base_idx` w jednym wywołaniu `score_batch`."""
+    dist = volume_distribution if isinstance(volume_distribution, Distribution) else prepare_distribution(volume_distribution)
+    if on_unparsed is not None:
+        for vol_range in dist.unparsed:
+            on_unparsed(vol_range)
+    order_books = [as_order_book(ob) for ob in order_books]
+    if len(dist.bucket_ends) == 0 or not order_books:
+        return ScenarioComparison(results=[pd.DataFrame() for _ in order_books], attribution=None,
+                                  line_volumes=[np.zeros(len(ob)) for ob in order_books])
+
+    books = stack_order_books(order_books)
+    batch = score_batch(books, dist.bucket_ends, dist.volumes, lot_price, spread_multiplier)
+    line_ids = [ob.lines for ob in order_books]
+
+    results = [results_frame(dist, ids[batch.line_idx[s]], batch.spreads[s], lot_price, spread_multiplier)
+               for s, ids in enumerate(line_ids)]
+    attribution = attribute_batch(books, batch, dist, line_ids, base_idx, spread_multiplier)
+    line_volumes = [batch.line_volume[s, :n] for s, n in enumerate(books.n_lines.tolist())]
+    return ScenarioComparison(results=results, attribution=attribution, line_volumes=line_volumes)
+
+
+# ==========================================
+# 11. SOLVER: DOCELOWY PRZYCHÓD / RPM -> SKALOWANIE SPREADÓW
+# ==========================================
+@dataclass(frozen=True)
+class SpreadScaling:
+    """
+    Mnożnik spreadów linii `scaled` potrzebny do osiągnięcia `target_revenue`.
+    Przypisanie bucketów do linii nie zależy od spreadów, więc przychód jest liniowy w mnożniku:
+    R(k) = revenue_fixed + k · revenue_scaled.
+    """
+    multiplier: float
+    target_revenue: float
+    revenue_fixed: float
+    revenue_scaled: float
+    scaled: np.ndarray    # (L,) bool — linie objęte skalowaniem
+
+    @property
+    def feasible(self) -> bool:
+        return bool(np.isfinite(self.multiplier) and self.multiplier >= 0)
+
+    def apply(self, order_book: OrderBookLike, decimals: int = 2) -> pd.DataFrame:
+        """Order Book z przeskalowanymi spreadami (zaokrąglonymi do `decimals`) — tabela dla edytora."""
+        book = as_order_book(order_book)
+        result = book.frame()
+        result["Spread"] = np.where(self.scaled, np.round(book.spread * self.multiplier, decimals), book.spread)
+        return result
+
+
+def solve_spread_scaling(line_volume: np.ndarray, spreads: np.ndarray, scaled: np.ndarray,
+                         target_revenue: float, spread_multiplier: float = 1.0) -> SpreadScaling:
+    """Rozwiązanie w postaci zamkniętej z wolumenów per linia — bez ponownego liczenia bucketów."""
+    line_revenue = np.asarray(line_volume, dtype=np.float64) * np.asarray(spreads, dtype=np.float64) * spread_multiplier / 2
+    scaled = np.asarray(scaled, dtype=bool)
+    revenue_scaled = float(line_revenue[scaled].sum())
+    revenue_fixed  = float(line_revenue[~scaled].sum())
+    multiplier = (target_revenue - revenue_fixed) / revenue_scaled if revenue_scaled > 0 else float("nan")
+    return SpreadScaling(
+        multiplier=multiplier,
+        target_revenue=target_revenue,
+        revenue_fixed=revenue_fixed,
+        revenue_scaled=revenue_scaled,
+        scaled=scaled,
+    )
+
+
+def target_revenue_for_rpm(rpm: float, turnover: float) -> float:
+    """Przychód odpowiadający docelowemu RPM (turnover nie zależy od spreadów)."""
+    return rpm * turnover / 1_000_000
+
+
+# ==========================================
+# 12. FRONT PARETO (PRZYCHÓD vs KONKURENCYJNOŚĆ)
+# ==========================================
+def tier_spread(line_volume: np.ndarray, spreads: np.ndarray, n_lines: int) -> np.ndarray:
+    """
+    Spread ważony wolumenem na pierwszych `n_lines` liniach (tier konkurencyjny), per scenariusz.
+    Gdy tier nie dostał wolumenu, zwracana jest zwykła średnia jego spreadów.
+    """
+    vol = line_volume[:, :n_lines]
+    spr = spreads[:, :n_lines]
+    total = vol.sum(axis=1)
+    weighted = np.divide((vol * spr).sum(axis=1), total, out=np.zeros(len(total)), where=total > 0)
+    return np.where(total > 0, weighted, spr.mean(axis=1))
+
+
+def pareto_front(revenue: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """
+    Indeksy punktów niezdominowanych (maksymalny przychód, minimalny koszt), posortowane rosnąco po koszcie.
+    Punkt jest zdominowany, jeśli inny ma nie większy koszt i większy przychód.
+    """
+    order = np.lexsort((-revenue, cost))
+    best = np.maximum.accumulate(revenue[order])
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = revenue[order][1:] > best[:-1]
+    return order[keep]
+
+
+# ==========================================
+# 13. MODEL ELASTYCZNOŚCI POPYTU
+# ==========================================
+@dataclass(frozen=True)
+class ElasticityModel:
+    """
+    Wolumen bucketu reaguje na przypisany spread względem drabiny referencyjnej:
+    V'_b = Σ_k V_kb · (s_b / s_ref_b)^(−ε_kb), gdzie k to segment klienta (przy jednym segmencie K = 1).
+    Buckety bez spreadu referencyjnego lub ze spreadem 0 zachowują wolumen bez zmian.
+    """
+    volumes: np.ndarray             # (K, B)
+    elasticity: np.ndarray          # (K, B)
+    reference_spreads: np.ndarray   # (B,)
+
+    def respond(self, spreads: np.ndarray) -> np.ndarray:
+        """Wolumeny (S, B) dla spreadów przypisanych bucketom w S scenariuszach."""
+        spreads = np.atleast_2d(spreads)
+        ref = self.reference_spreads[None, :]
+        valid = (ref > 0) & (spreads > 0)
+        ratio = np.divide(spreads, ref, out=np.ones_like(spreads, dtype=np.float64), where=valid)
+        return np.einsum("kb,skb->sb", self.volumes, ratio[:, None, :] ** -self.elasticity[None, :, :])
+
+    def buckets(self, start: int, stop: int) -> "ElasticityModel":
+        """Model zawężony do bucketów [start, stop) — reakcja bucketu nie zależy od pozostałych."""
+        return ElasticityModel(
+            volumes=self.volumes[:, start:stop],
+            elasticity=self.elasticity[:, start:stop],
+            reference_spreads=self.reference_spreads[start:stop],
+        )
+
+
+def elasticity_model(reference_ob: OrderBookLike, bucket_ends: np.ndarray, volumes: np.ndarray,
+                     elasticity) -> ElasticityModel:
+    """
+    Model względem Order Booka referencyjnego. `volumes` to rozkład (B,) albo segmenty (K, B);
+    `elasticity` to skalar, wartości per segment (K,) albo per segment i bucket (K, B).
+    """
+    volumes = np.atleast_2d(np.asarray(volumes, dtype=np.float64))
+    eps = np.asarray(elasticity, dtype=np.float64)
+    if eps.ndim == 1:
+        eps = eps[:, None]
+    return ElasticityModel(
+        volumes=volumes,
+        elasticity=np.broadcast_to(eps, volumes.shape),
+        reference_spreads=bucket_spreads(reference_ob, np.asarray(bucket_ends, dtype=np.float64)),
+    )
+
+
+@dataclass(frozen=True)
+class ElasticScore:
+    """Wynik `score_elastic`: ocena wsadowa na wolumenach po reakcji popytu i przebieg iteracji."""
+    batch: BatchScore
+    volumes: np.ndarray    # (S, B)
+    iterations: int
+    converged: bool
+
+
+def score_elastic(order_books: list[OrderBookLike] | StackedOrderBooks, bucket_ends: np.ndarray,
+                  model: ElasticityModel, lot_price: float, spread_multiplier: float = 1.0,
+                  assign: Callable[[StackedOrderBooks, np.ndarray, np.ndarray], np.ndarray] | None = None,
+                  max_iter: int = 50, tol: float = 1e-9) -> ElasticScore:
+    """
+    Przychód S scenariuszy przy wolumenie reagującym na spread. Przy standardowym przypisaniu linia zależy
+    tylko od granicy bucketu, więc rozwiązanie jest wprost (1 iteracja). Jeśli `assign(books, bucket_ends,
+    volumes)` zależy od wolumenu, przypisanie i wolumen są iterowane do punktu stałego (zmiana wolumenu ≤ `tol`,
+    względnie) albo do `max_iter` iteracji.
+    """
+    books = order_books if isinstance(order_books, StackedOrderBooks) else stack_order_books(order_books)
+    bucket_ends = np.asarray(bucket_ends, dtype=np.float64)
+
+    if assign is None:
+        line_idx = assign_lines_batch(books, bucket_ends)
+        volumes = model.respond(np.take_along_axis(books.spreads, line_idx, axis=1))
+        batch = score_batch(books, bucket_ends, volumes, lot_price, spread_multiplier, line_idx=line_idx)
+        return ElasticScore(batch=batch, volumes=volumes, iterations=1, converged=True)
+
+    volumes = np.broadcast_to(model.volumes.sum(axis=0), (len(books), len(bucket_ends))).copy()
+    converged = False
+    for iteration in range(1, max_iter + 1):
+        line_idx = assign(books, bucket_ends, volumes)
+        new_volumes = model.respond(np.take_along_axis(books.spreads, line_idx, axis=1))
+        change = np.abs(new_volumes - volumes).max(initial=0.0) / max(np.abs(volumes).max(initial=0.0), 1e-12)
+        volumes = new_volumes
+        if change <= tol:
+            converged = True
+            break
+
+    batch = score_batch(books, bucket_ends, volumes, lot_price, spread_multiplier, line_idx=line_idx)
+    return ElasticScore(batch=batch, volumes=volumes, iterations=iteration, converged=converged)
+
+
+# ==========================================
+# 14. BOOTSTRAP PRZYCHODU PO OKRESACH
+# ==========================================
+def bootstrap_chunk(key_revenue: np.ndarray, n_resamples: int, seed: int) -> np.ndarray:
+    """
+    Przychód scenariuszy (n_resamples × S) dla `n_resamples` losowań okresów ze zwracaniem.
+    `key_revenue` to przychód per okres i scenariusz (K × S), np. `SegmentScore.revenue` z panelu dziennego.
+    Funkcja modułowa — paczki losowań mogą być liczone w puli procesów.
+    """
+    n_keys = key_revenue.shape[0]
+    counts = np.random.default_rng(seed).multinomial(n_keys, np.full(n_keys, 1 / n_keys), size=n_resamples)
+    return counts @ key_revenue
+
+
+def bootstrap_tasks(key_revenue: np.ndarray, n_resamples: int, chunk_size: int = 500,
+                    seed: int = 0) -> list[tuple[Callable, tuple]]:
+    """Podział bootstrapu na paczki (funkcja, argumenty) — stałe ziarna, więc wynik jest powtarzalny."""
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    return [(bootstrap_chunk, (key_revenue, size, seed + i)) for i, size in enumerate(sizes)]
+
+
+# ==========================================
+# 15. TRYB NISKIEJ PAMIĘCI (OCENA W PACZKACH)
+# ==========================================
+DEFAULT_MEMORY_BUDGET_MB = 256.0
+FLOAT32_EPS = float(np.finfo(np.float32).eps)
+
+
+@dataclass(frozen=True)
+class BatchTotals:
+    """Wynik `score_batch_reduced`: tylko redukcje z `BatchScore`, bez tablic scenariusze × buckety."""
+    revenue: np.ndarray        # (S,)
+    volume: np.ndarray         # (S,)
+    turnover: np.ndarray       # (S,)
+    line_volume: np.ndarray    # (S, L)
+    line_revenue: np.ndarray   # (S, L)
+    line_count: np.ndarray     # (S, L)
+
+    @property
+    def rpm(self) -> np.ndarray:
+        return np.divide(self.revenue * 1_000_000, self.turnover,
+                         out=np.zeros_like(self.revenue), where=self.turnover > 0)
+
+
+def batch_chunks(n_books: int, n_buckets: int, width: int, memory_budget_mb: float,
+                 dtype=np.float64) -> tuple[int, int]:
+    """
+    (scenariusze, buckety) na paczkę, tak aby tablice pośrednie paczki zmieściły się w budżecie.
+    Na komórkę scenariusz × bucket przypada: porównanie z L liniami (bool), indeks linii i indeks
+    płaski (int64), wagi `bincount` (float64) oraz wolumen, spread i przychód w `dtype`.
+    Najpierw zmniejszana jest liczba scenariuszy — buckety są dzielone dopiero, gdy nie mieści się jeden scenariusz.
+    """
+    cell_bytes = width + 3 * 8 + 3 * np.dtype(dtype).itemsize
+    cells = max(1, int(memory_budget_mb * 1024 ** 2) // cell_bytes)
+    bucket_step = max(1, min(n_buckets, cells))
+    book_step = max(1, min(n_books, cells // bucket_step))
+    return book_step, bucket_step
+
+
+def float32_error_bound(n_terms: int) -> float:
+    """
+    Górne oszacowanie błędu względnego sumy `n_terms` nieujemnych iloczynów wolumen × spread liczonej
+    we float32: zaokrąglenie wejść i iloczynu (3 eps), bloki po 128 składników sumowane w NumPy
+    w 8 akumulatorach (16 eps) i log2(n) poziomów sumowania parami. Wolumeny i spready są nieujemne,
+    więc błąd względny sumy nie jest wzmacniany przez redukcję składników.
+    """
+    return (3 + 16 + np.ceil(np.log2(max(n_terms, 2)))) * FLOAT32_EPS
+
+
+def score_batch_reduced(order_books: list[OrderBookLike] | StackedOrderBooks, bucket_ends: np.ndarray,
+                        volumes: np.ndarray, lot_price: float, spread_multiplier: float = 1.0,
+                        memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB, dtype=np.float64) -> BatchTotals:
+    """
+    `score_batch` w paczkach scenariuszy (i w razie potrzeby bucketów) mieszczących się w `memory_budget_mb`,
+    zwracający tylko sumy per scenariusz i per linia — przypisania i przychody per bucket nigdy nie
+    istnieją w całości. Przy `dtype=np.float32` paczka liczona jest we float32 (mniej pamięci na komórkę),
+    a sumy między paczkami kumulowane we float64; błąd względny ogranicza `float32_error_bound(buckety w paczce)`.
+    """
+    volumes = np.asarray(volumes)
+
+    def chunk_volumes(s0: int, s1: int, b0: int, b1: int, spreads: np.ndarray) -> np.ndarray:
+        return volumes[s0:s1, b0:b1] if volumes.ndim == 2 else np.broadcast_to(volumes[b0:b1], spreads.shape)
+
+    return _reduce_in_chunks(order_books, bucket_ends, chunk_volumes, lot_price, spread_multiplier,
+                             memory_budget_mb, dtype)
+
+
+def score_elastic_reduced(order_books: list[OrderBookLike] | StackedOrderBooks, bucket_ends: np.ndarray,
+                          model: ElasticityModel, lot_price: float, spread_multiplier: float = 1.0,
+                          memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB, dtype=np.float64) -> BatchTotals:
+    """
+    `score_elastic` (standardowe przypisanie, rozwiązanie wprost) w paczkach `score_batch_reduced`:
+    wolumen po reakcji popytu powstaje tylko dla komórek bieżącej paczki, więc obowiązuje ten sam
+    budżet pamięci i opcja float32.
+    """
+    def chunk_volumes(s0: int, s1: int, b0: int, b1: int, spreads: np.ndarray) -> np.ndarray:
+        return model.buckets(b0, b1).respond(spreads)
+
+    # Reakcja popytu dokłada na komórkę stosunek spreadów, K potęg i wynik (float64)
+    extra_bytes = 8 * (model.volumes.shape[0] + 2)
+    return _reduce_in_chunks(order_books, bucket_ends, chunk_volumes, lot_price, spread_multiplier,
+                             memory_budget_mb, dtype, extra_bytes)
+
+
+def _reduce_in_chunks(order_books: list[OrderBookLike] | StackedOrderBooks, bucket_ends: np.ndarray,
+                      chunk_volumes: Callable[[int, int, int, int, np.ndarray], np.ndarray], lot_price: float,
+                      spread_multiplier: float, memory_budget_mb: float, dtype, extra_bytes: int = 0) -> BatchTotals:
+    """Wspólna pętla paczek: `chunk_volumes(s0, s1, b0, b1, spreads)` daje wolumeny komórek paczki."""
+    books = order_books if isinstance(order_books, StackedOrderBooks) else stack_order_books(order_books)
+    bucket_ends = np.asarray(bucket_ends, dtype=np.float64)
+    n_books, width = books.spreads.shape
+    n_buckets = len(bucket_ends)
+    book_step, bucket_step = batch_chunks(n_books, n_buckets, width + extra_bytes, memory_budget_mb, dtype)
+
+    revenue      = np.zeros(n_books)
+    volume       = np.zeros(n_books)
+    line_volume  = np.zeros((n_books, width))
+    line_revenue = np.zeros((n_books, width))
+    line_count   = np.zeros((n_books, width), dtype=np.int64)
+    book_spreads = books.spreads.astype(dtype, copy=False)
+
+    for s0 in range(0, n_books, book_step):
+        s1 = min(s0 + book_step, n_books)
+        chunk = StackedOrderBooks(cum_ask=books.cum_ask[s0:s1], spreads=book_spreads[s0:s1],
+                                  n_lines=books.n_lines[s0:s1])
+        rows = s1 - s0
+        offsets = np.arange(rows)[:, None] * width
+        for b0 in range(0, n_buckets, bucket_step):
+            b1 = min(b0 + bucket_step, n_buckets)
+            line_idx = assign_lines_batch(chunk, bucket_ends[b0:b1])
+            spreads  = np.take_along_axis(chunk.spreads, line_idx, axis=1)
+            vols = chunk_volumes(s0, s1, b0, b1, spreads).astype(dtype, copy=False)
+            bucket_revenue = vols * spreads * spread_multiplier / 2   # skalar nie podnosi float32 do float64
+
+            flat = (line_idx + offsets).ravel()
+            size = rows * width
+            line_volume[s0:s1]  += np.bincount(flat, weights=vols.ravel(), minlength=size).reshape(rows, width)
+            line_revenue[s0:s1] += np.bincount(flat, weights=bucket_revenue.ravel(), minlength=size).reshape(rows, width)
+            line_count[s0:s1]   += np.bincount(flat, minlength=size).reshape(rows, width)
+            revenue[s0:s1] += bucket_revenue.sum(axis=1)
+            volume[s0:s1]  += vols.sum(axis=1)
+
+    return BatchTotals(
+        revenue=revenue,
+        volume=volume,
+        turnover=volume * lot_price,
+        line_volume=line_volume,
+        line_revenue=line_revenue,
+        line_count=line_count,
+    )
+
+
+# ==========================================
+# 16. ZMIANA ROZDZIELCZOŚCI BUCKETÓW (REBINNING)
+# ==========================================
+@dataclass(frozen=True)
+class CumulativeDistribution:
+    """
+    Skumulowany wolumen rozkładu (B,) lub panelu (K, B) po bucketach posortowanych rosnąco. Liczony raz
+    per rozkład — każda grubsza rozdzielczość to `searchsorted` nowych granic i różnice sum skumulowanych,
+    bez przechodzenia po oryginalnych bucketach.
+    """
+    bucket_ends: np.ndarray
+    cum_volume: np.ndarray   # cum_volume[..., i] = wolumen bucketów 0..i
+
+    @property
+    def max_end(self) -> float:
+        return float(self.bucket_ends[-1]) if len(self.bucket_ends) else 0.0
+
+    def rebin(self, edges) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (nowe górne granice, wolumeny) dla granic `edges`. Oryginalny bucket trafia do pierwszego nowego,
+        którego granica >= jego górnej granicy (ta sama reguła co przypisanie linii). Granica ostatniego
+        oryginalnego bucketu jest dopisywana, gdy `edges` jej nie obejmują, a granice dalej niż pierwsza
+        obejmująca są pomijane — suma wolumenu jest zachowana (z dokładnością zaokrągleń float64).
+        """
+        edges = np.unique(np.asarray(edges, dtype=np.float64))
+        if len(self.bucket_ends) == 0:
+            return edges[:0], self.cum_volume[..., :0]
+        if len(edges) == 0 or edges[-1] < self.max_end:
+            edges = np.append(edges, self.max_end)
+        edges = edges[:np.searchsorted(edges, self.max_end, side="left") + 1]
+
+        # Ostatni oryginalny bucket z końcem <= granicy; -1 (brak) wskazuje na zero przed pierwszym bucketem
+        last = np.searchsorted(self.bucket_ends, edges, side="right") - 1
+        padded = np.concatenate([np.zeros(self.cum_volume.shape[:-1] + (1,)), self.cum_volume], axis=-1)
+        volumes = np.diff(padded[..., last + 1], axis=-1, prepend=0.0)
+        return edges, volumes
+
+
+def cumulative_distribution(bucket_ends: np.ndarray, volumes: np.ndarray) -> CumulativeDistribution:
+    """`CumulativeDistribution` z granic i wolumenów (B,) albo (K, B) — buckety sortowane po górnej granicy."""
+    bucket_ends = np.asarray(bucket_ends, dtype=np.float64)
+    order = np.argsort(bucket_ends, kind="stable")
+    return CumulativeDistribution(
+        bucket_ends=bucket_ends[order],
+        cum_volume=np.cumsum(np.asarray(volumes, dtype=np.float64)[..., order], axis=-1),
+    )
+
+
+def resolution_edges(max_end: float, step: float) -> np.ndarray:
+    """Równe granice co `step` do pierwszej >= `max_end`; zaokrąglone, aby np. 3 · 0.1 trafiało w bucket '0.2 - 0.3'."""
+    n = max(1, int(np.ceil(round(max_end / step, 9))))
+    return np.round(step * np.arange(1, n + 1), 10)
+
+
+def bucket_labels(bucket_ends: np.ndarray) -> np.ndarray:
+    """Etykiety w formacie po clean_csv ('0.0 - 0.5') — dolna granica to poprzednia górna (pierwsza od 0)."""
+    decimals = max([1] + [len(f"{e:g}".partition(".")[2]) for e in bucket_ends])
+    lower = np.concatenate([[0.0], bucket_ends[:-1]])
+    return np.array([f"{lo:.{decimals}f} - {hi:.{decimals}f}" for lo, hi in zip(lower, bucket_ends)], dtype=object)
+
+
+def rebin_distribution(cumulative: CumulativeDistribution, edges) -> pd.DataFrame:
+    """Rozkład w nowych bucketach w formacie `volume_range`/`filled_volume` — jak wczytany z pliku CSV."""
+    ends, volumes = cumulative.rebin(edges)
+    return pd.DataFrame({"volume_range": bucket_labels(ends), "filled_volume": volumes})
+
+
+def rebin_panel(panel: PanelDistribution, edges) -> PanelDistribution:
+    """Panel (klucze × buckety) w nowych bucketach — wszystkie wiersze jednym `searchsorted`."""
+    ends, volumes = cumulative_distribution(panel.bucket_ends, panel.volumes).rebin(edges)
+    return PanelDistribution(keys=panel.keys, labels=bucket_labels(ends), bucket_ends=ends, volumes=volumes)
@@ -0,0 +1,97 @@
+"""
+Tożsamość plików rozkładów i obserwator zmian.
+
+Tożsamość to rozmiar + skrót treści; skrót jest liczony ponownie tylko wtedy, gdy zmienił się
+rozmiar lub mtime, więc sprawdzenie przy każdym rerunie kosztuje jedno `os.stat`. Ponowny
+zapis tej samej treści (np. `touch`, kopia z nową datą) nie zmienia tożsamości i nie unieważnia cache.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Callable
+
+WATCH_INTERVAL_S = 2.0
+WATCH_THREAD = "file-watch"  # nazwa wątku (np. do filtrowania logów)
+_CHUNK_SIZE = 1024 * 1024
+
+
+class FileFingerprints:
+    """Pamięta (rozmiar, mtime, skrót) per ścieżka — bezpieczne wątkowo."""
+
+    def __init__(self):
+        self._memo: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def identity(self, path: str) -> str | None:
+        """'<rozmiar>:<sha1>' treści pliku albo None, jeśli plik nie istnieje."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            memo = self._memo.get(path)
+        if memo is not None and memo[:2] == (st.st_size, st.st_mtime_ns):
+            return memo[2]
+
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                h.update(chunk)
+        digest = f"{st.st_size}:{h.hexdigest()}"
+        with self._lock:
+            self._memo[path] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+
+class FileWatcher:
+    """
+    Co `interval` sekund sprawdza tożsamość plików każdej grupy (np. rynku) i dla grup,
+    w których coś się zmieniło, woła `on_change(grupa)`. Pozostałe grupy nie są dotykane.
+    """
+
+    def __init__(self, groups: dict[str, list[str]], on_change: Callable[[str], None],
+                 fingerprints: FileFingerprints, interval: float = WATCH_INTERVAL_S):
+        self.groups = groups
+        self.on_change = on_change
+        self.fingerprints = fingerprints
+        self.interval = interval
+        self.changes: dict[str, int] = {}
+        self.errors: list[tuple[str, str]] = []
+        self._seen = {group: self._identities(paths) for group, paths in groups.items()}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=WATCH_THREAD, daemon=True)
+
+    def _identities(self, paths: list[str]) -> tuple:
+        return tuple(self.fingerprints.identity(p) for p in paths)
+
+    def poll(self) -> list[str]:
+        """Jedno sprawdzenie wszystkich grup — zwraca grupy, które się zmieniły."""
+        changed = []
+        for group, paths in self.groups.items():
+            current = self._identities(paths)
+            if current == self._seen[group]:
+                continue
+            self._seen[group] = current
+            self.changes[group] = self.changes.get(group, 0) + 1
+            changed.append(group)
+            try:
+                self.on_change(group)
+            except Exception as e:
+                self.errors.append((group, str(e)))
+        return changed
+
+    def start(self) -> "FileWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors.append(("*", str(e)))
+                time.sleep(self.interval)
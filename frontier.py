@@ -0,0 +1,167 @@
+"""
+Front Pareto: przychód vs konkurencyjność top-of-book (spread ważony wolumenem na liniach 1–2).
+Losowe drabiny (Order Booki) są oceniane paczkami przez `score_batch_reduced` (tylko sumy, w budżecie
+pamięci). Paczka to zadanie `(funkcja, argumenty)` dla `jobs.JobRunner` — liczona w puli procesów,
+deduplikowana między sesjami po odcisku sweepu i zapisywana we wspólnym cache. Każda paczka zwraca
+własny front, a `merge_frontiers` łączy fronty ukończonych paczek — także w trakcie sweepu.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from engine import (
+    DEFAULT_MEMORY_BUDGET_MB, OrderBookLike, StackedOrderBooks, ElasticityModel, as_order_book, float32_error_bound,
+    score_batch_reduced, score_elastic_reduced, tier_spread, pareto_front,
+)
+
+DEFAULT_CANDIDATES = 5000
+DEFAULT_BATCH_SIZE = 500
+COMPETITIVE_LINES = 2              # Tier konkurencyjny — linie 1–2 (Fixed)
+FLOAT32_TOLERANCE = 1e-4           # Dopuszczalny błąd względny przychodu kandydata przy ocenie we float32
+
+
+@dataclass(frozen=True)
+class Frontier:
+    """Punkty niezdominowane: drabiny (P × L), ich przychód i spread tieru konkurencyjnego."""
+    asks: np.ndarray
+    spreads: np.ndarray
+    revenue: np.ndarray
+    top_spread: np.ndarray
+    evaluated: int
+
+    def __len__(self) -> int:
+        return len(self.revenue)
+
+    def order_book(self, i: int, template: OrderBookLike) -> pd.DataFrame:
+        """Order Book punktu `i` na bazie `template` (pozostałe kolumny, np. Bid Size, bez zmian)."""
+        result = as_order_book(template).frame()
+        result["Ask Size"] = self.asks[i]
+        result["Spread"] = self.spreads[i]
+        return result
+
+
+@dataclass(frozen=True)
+class FrontierSpec:
+    """Wszystko, czego potrzebuje paczka sweepu — wysyłane do procesów puli."""
+    base_ask: np.ndarray
+    base_spread: np.ndarray
+    bucket_ends: np.ndarray
+    volumes: np.ndarray
+    lot_price: float
+    spread_multiplier: float
+    spread_range: tuple[float, float]
+    ask_range: tuple[float, float]
+    demand: ElasticityModel | None   # opcjonalny model elastyczności — wolumen reaguje na spready kandydata
+    memory_budget_mb: float
+    dtype: type
+
+    @property
+    def fingerprint(self) -> str:
+        """Odcisk wejść sweepu — klucz deduplikacji zadań i cache wyników."""
+        h = hashlib.sha1()
+        arrays = [self.base_ask, self.base_spread, self.bucket_ends, self.volumes]
+        if self.demand is not None:
+            arrays += [self.demand.volumes, self.demand.elasticity, self.demand.reference_spreads]
+        for array in arrays:
+            h.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        h.update(repr((self.lot_price, self.spread_multiplier, self.spread_range, self.ask_range,
+                       self.demand is not None, self.memory_budget_mb, np.dtype(self.dtype).name)).encode())
+        return h.hexdigest()
+
+
+def frontier_spec(base_ob: OrderBookLike, bucket_ends: np.ndarray, volumes: np.ndarray, lot_price: float,
+                  spread_multiplier: float = 1.0, spread_range: tuple[float, float] = (0.5, 2.0),
+                  ask_range: tuple[float, float] = (0.5, 2.0), demand: ElasticityModel | None = None,
+                  memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB, low_memory: bool = False) -> FrontierSpec:
+    base = as_order_book(base_ob)
+    bucket_ends = np.asarray(bucket_ends, dtype=np.float64)
+    # float32 tylko na życzenie i tylko gdy oszacowanie błędu mieści się w tolerancji rankingu frontu
+    low_precision = low_memory and float32_error_bound(len(bucket_ends)) <= FLOAT32_TOLERANCE
+    return FrontierSpec(
+        base_ask=base.ask,
+        base_spread=base.spread,
+        bucket_ends=bucket_ends,
+        volumes=np.asarray(volumes, dtype=np.float64),
+        lot_price=lot_price,
+        spread_multiplier=spread_multiplier,
+        spread_range=tuple(spread_range),
+        ask_range=tuple(ask_range),
+        demand=demand,
+        memory_budget_mb=memory_budget_mb,
+        dtype=np.float32 if low_precision else np.float64,
+    )
+
+
+# ==========================================
+# PACZKI SWEEPU
+# ==========================================
+def candidates(spec: FrontierSpec, n: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Drabiny z losowo przeskalowanymi spreadami i Ask Size (per linia), zaokrąglone jak w edytorze."""
+    rng = np.random.default_rng(seed)
+    lines = len(spec.base_ask)
+    spread_scale = rng.uniform(*spec.spread_range, size=(n, lines))
+    ask_scale = rng.uniform(*spec.ask_range, size=(n, lines))
+    spreads = np.round(spec.base_spread * spread_scale, 1)
+    asks = np.maximum(np.round(spec.base_ask * ask_scale, 1), 0.1)
+    return asks, spreads
+
+
+def score_ladders(spec: FrontierSpec, asks: np.ndarray, spreads: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Przychód i spread tieru konkurencyjnego drabin (P × L)."""
+    books = StackedOrderBooks(
+        cum_ask=np.cumsum(asks, axis=1),
+        spreads=spreads,
+        n_lines=np.full(len(asks), asks.shape[1], dtype=np.int64),
+    )
+    if spec.demand is not None:
+        batch = score_elastic_reduced(books, spec.bucket_ends, spec.demand, spec.lot_price, spec.spread_multiplier,
+                                      spec.memory_budget_mb, spec.dtype)
+    else:
+        batch = score_batch_reduced(books, spec.bucket_ends, spec.volumes, spec.lot_price, spec.spread_multiplier,
+                                    spec.memory_budget_mb, spec.dtype)
+    return batch.revenue, tier_spread(batch.line_volume, spreads, COMPETITIVE_LINES)
+
+
+def front_of(asks: np.ndarray, spreads: np.ndarray, revenue: np.ndarray, top: np.ndarray, evaluated: int) -> Frontier:
+    keep = pareto_front(revenue, top)
+    return Frontier(asks=asks[keep], spreads=spreads[keep], revenue=revenue[keep], top_spread=top[keep],
+                    evaluated=evaluated)
+
+
+def base_frontier(spec: FrontierSpec) -> Frontier:
+    """Bazowy Order Book jako jednopunktowy front — wynik sweepu nigdy nie jest gorszy od niego."""
+    asks, spreads = spec.base_ask[None, :], spec.base_spread[None, :]
+    revenue, top = score_ladders(spec, asks, spreads)
+    return Frontier(asks=asks, spreads=spreads, revenue=revenue, top_spread=top, evaluated=0)
+
+
+def sweep_chunk(spec: FrontierSpec, n: int, seed: int) -> Frontier:
+    """Front `n` losowych kandydatów — funkcja modułowa, liczona w puli procesów."""
+    asks, spreads = candidates(spec, n, seed)
+    revenue, top = score_ladders(spec, asks, spreads)
+    return front_of(asks, spreads, revenue, top, n)
+
+
+def frontier_tasks(spec: FrontierSpec, n_candidates: int = DEFAULT_CANDIDATES,
+                   batch_size: int = DEFAULT_BATCH_SIZE, seed: int = 0) -> list[tuple[Callable, tuple]]:
+    """Podział sweepu na paczki (funkcja, argumenty) — pierwsza to bazowy Order Book; stałe ziarna, wynik powtarzalny."""
+    batch_size = max(1, batch_size)
+    sizes = [min(batch_size, n_candidates - start) for start in range(0, n_candidates, batch_size)]
+    return [(base_frontier, (spec,))] + [(sweep_chunk, (spec, size, seed + i)) for i, size in enumerate(sizes)]
+
+
+def merge_frontiers(frontiers: list[Frontier | None]) -> Frontier | None:
+    """Front sumy zbiorów — z frontów paczek (także części ukończonych); None, gdy nie ma jeszcze żadnej."""
+    frontiers = [f for f in frontiers if f is not None]
+    if not frontiers:
+        return None
+    return front_of(
+        np.vstack([f.asks for f in frontiers]),
+        np.vstack([f.spreads for f in frontiers]),
+        np.concatenate([f.revenue for f in frontiers]),
+        np.concatenate([f.top_spread for f in frontiers]),
+        sum(f.evaluated for f in frontiers),
+    )
@@ -0,0 +1,186 @@
+"""
+Zadania w tle dla cięższych analiz (sweepy, bootstrap, optymalizacje, długie szeregi czasowe).
+
+Zadanie to lista niezależnych paczek `(funkcja, argumenty)` wysyłanych do puli procesów oraz funkcja
+`reduce`, która łączy wyniki paczek. Postęp to liczba ukończonych paczek, anulowanie wstrzymuje wysyłanie
+kolejnych, a identyczne zadania (ten sam klucz) z różnych sesji są liczone raz. Gotowy wynik trafia do
+wspólnego `ResultCache`. Moduł nie zależy od Streamlit — zadania można uruchamiać i testować bez przeglądarki,
+także na `ThreadPoolExecutor`.
+"""
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Hashable
+
+from result_cache import ResultCache
+
+QUEUED    = "queued"
+RUNNING   = "running"
+DONE      = "done"
+FAILED    = "failed"
+CANCELLED = "cancelled"
+
+POLL_INTERVAL_S = 0.2   # Jak często dyspozytor sprawdza anulowanie, gdy czeka na paczki
+
+
+class Job:
+    """Stan jednego zadania: postęp, wynik lub błąd. Wspólny dla wszystkich sesji, które go zleciły."""
+
+    def __init__(self, key: Hashable, total: int):
+        self.key = key
+        self.total = total
+        self.completed = 0
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: str | None = None
+        self.partial: list[Any] = []   # Wyniki ukończonych paczek w kolejności ukończenia — podgląd w trakcie
+        self.subscribers = 1
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _finish(self, status: str, result: Any = None, error: str | None = None) -> None:
+        self.status = status
+        self.result = result
+        self.error = error
+        self._done.set()
+
+
+class JobRunner:
+    """Uruchamia zadania na wspólnej puli, deduplikuje je po kluczu i zapisuje wyniki do cache."""
+
+    def __init__(self, executor: Executor, cache: ResultCache | None = None, max_in_flight: int | None = None):
+        self.executor = executor
+        self.cache = cache
+        # Ograniczenie paczek w kolejce puli — anulowanie działa najpóźniej po jednej paczce na proces
+        self.max_in_flight = max_in_flight or os.cpu_count() or 1
+        self._jobs: dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, tasks: list[tuple[Callable, tuple]],
+               reduce: Callable[[list], Any] = list) -> Job:
+        """Zleca zadanie albo dołącza do już trwającego o tym samym kluczu. Wynik z cache kończy je od razu."""
+        with self._lock:
+            if self.cache is not None and key in self.cache:
+                job = Job(key, len(tasks))
+                job.completed = job.total
+                job._finish(DONE, self.cache.get(key))
+                return job
+            job = self._jobs.get(key)
+            if job is not None and not job.finished:
+                job.subscribers += 1
+                return job
+            job = Job(key, len(tasks))
+            self._jobs[key] = job
+
+        threading.Thread(target=self._dispatch, args=(job, tasks, reduce), daemon=True).start()
+        return job
+
+    def get(self, key: Hashable) -> Job | None:
+        with self._lock:
+            return self._jobs.get(key)
+
+    def release(self, job: Job) -> None:
+        """Sesja rezygnuje z zadania (np. zmieniła Order Book). Ostatnia rezygnacja anuluje zadanie."""
+        with self._lock:
+            if job.subscribers <= 0:
+                return
+            job.subscribers -= 1
+            if job.subscribers <= 0 and not job.finished:
+                job._cancel.set()
+
+    @property
+    def active(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _dispatch(self, job: Job, tasks: list[tuple[Callable, tuple]], reduce: Callable[[list], Any]) -> None:
+        results: list[Any] = [None] * len(tasks)
+        pending: dict = {}
+        queue = iter(enumerate(tasks))
+        job.status = RUNNING
+        try:
+            while True:
+                while not job.cancelled and len(pending) < self.max_in_flight:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    i, (func, args) = item
+                    pending[self.executor.submit(func, *args)] = i
+
+                if job.cancelled:
+                    for future in pending:
+                        future.cancel()
+                    job._finish(CANCELLED)
+                    return
+                if not pending:
+                    break
+
+                done, _ = wait(pending, timeout=POLL_INTERVAL_S, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results[pending.pop(future)] = result
+                    job.partial.append(result)
+                    job.completed += 1
+
+            result = reduce(results)
+            if self.cache is not None:
+                self.cache.put(job.key, result)
+            job._finish(DONE, result)
+        except Exception as e:  # błąd paczki kończy całe zadanie — pozostałe paczki są anulowane
+            for future in pending:
+                future.cancel()
+            job._finish(FAILED, error=f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+
+
+class JobSubscription:
+    """
+    Co najwyżej jedna subskrypcja zadania na sesję (i sekcję interfejsu). Ponowne uruchomienie tego samego
+    zadania nie dodaje subskrybenta, a anulowanie zwalnia wyłącznie subskrypcję tej sesji — zadanie
+    współdzielone z inną sesją liczy się dalej. Gdy sesja znika (obiekt jest usuwany z pamięci),
+    jej subskrypcja jest zwalniana — zadanie bez subskrybentów zostaje anulowane.
+    """
+
+    def __init__(self, runner: JobRunner):
+        self.runner = runner
+        self.job: Job | None = None
+        self._finalizer: weakref.finalize | None = None
+
+    def follow(self, key: Hashable) -> Job | None:
+        """Bieżące zadanie sesji; zmiana klucza (np. edycja Order Booka) zwalnia poprzednie."""
+        if self.job is not None and self.job.key != key:
+            self.cancel()
+        return self.job
+
+    def start(self, key: Hashable, tasks: list[tuple[Callable, tuple]], reduce: Callable[[list], Any] = list) -> Job:
+        if self.job is not None and self.job.key == key and not self.job.finished:
+            return self.job
+        self.cancel()
+        self.job = self.runner.submit(key, tasks, reduce)
+        self._finalizer = weakref.finalize(self, self.runner.release, self.job)
+        return self.job
+
+    def cancel(self) -> None:
+        if self.job is not None:
+            self._finalizer.detach()
+            self.runner.release(self.job)
+            self.job = None
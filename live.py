@@ -0,0 +1,173 @@
+"""
+Tryb live — przyrostowe czytanie pliku z transakcjami (append-only) i aktualizacja
+wolumenu per bucket w miejscu. Przy każdej paczce przeliczany jest wyłącznie
+przyrost przychodu ze zmienionych bucketów, a nie cały scenariusz.
+"""
+import os
+
+import numpy as np
+
+from clean_csv import DEFAULT_SIZE_COLUMN
+
+# Maksymalna liczba bajtów czytana w jednym odświeżeniu — ogranicza czas jednego cyklu
+MAX_POLL_BYTES = 8 * 1024 * 1024
+# Początek pliku porównywany przy każdym odczycie — podmiana pliku w miejscu (ten sam i-węzeł) zmienia nagłówek
+HEAD_BYTES = 256
+
+
+class FillTail:
+    """
+    Czyta nowe wiersze z pliku transakcji od ostatnio zapamiętanej pozycji (jak `tail -f`).
+    Nowy plik pod tą samą ścieżką (inny i-węzeł, krótszy plik albo inny początek) jest czytany od początku,
+    a `restarted` jest wtedy ustawione dla danego odczytu.
+    """
+
+    def __init__(self, path: str, size_column: str = DEFAULT_SIZE_COLUMN):
+        self.path = path
+        self.size_column = size_column
+        self.offset = 0
+        self.restarted = False
+        self._identity: tuple[int, int] | None = None
+        self._head = b""
+        self._partial = b""
+        self._sep: str | None = None
+        self._col_idx: int | None = None
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.restarted = True
+        self._identity = None
+        self._head = b""
+        self._partial = b""
+        self._sep = None
+        self._col_idx = None
+
+    def _replaced(self, stat: os.stat_result, f) -> bool:
+        """Czy pod ścieżką jest inny plik niż przy poprzednim odczycie (rotacja, obcięcie, podmiana w miejscu)."""
+        if self._identity is None:
+            return False
+        if (stat.st_dev, stat.st_ino) != self._identity or stat.st_size < self.offset:
+            return True
+        f.seek(0)
+        return f.read(len(self._head)) != self._head
+
+    def _parse_header(self, line: str) -> None:
+        self._sep = ";" if ";" in line else ","
+        columns = [c.strip() for c in line.split(self._sep)]
+        if self.size_column not in columns:
+            raise ValueError(f"Plik {self.path} nie zawiera kolumny '{self.size_column}'.")
+        self._col_idx = columns.index(self.size_column)
+
+    def poll(self, max_bytes: int = MAX_POLL_BYTES) -> np.ndarray:
+        """Zwraca wielkości transakcji dopisanych od poprzedniego wywołania."""
+        self.restarted = False
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return np.empty(0)
+        with f:
+            stat = os.fstat(f.fileno())
+            if self._replaced(stat, f):
+                # Plik został obcięty lub podmieniony (np. rotacja dzienna) — czytamy od początku
+                self._reset()
+            self._identity = (stat.st_dev, stat.st_ino)
+            if len(self._head) < HEAD_BYTES:
+                f.seek(0)
+                self._head = f.read(HEAD_BYTES)
+            f.seek(self.offset)
+            data = f.read(max_bytes)
+        if not data:
+            return np.empty(0)
+        self.offset += len(data)
+
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()  # ostatni (niepełny) wiersz czeka na kolejny odczyt
+
+        sizes = []
+        for raw in lines:
+            line = raw.decode("utf-8-sig").strip()
+            if not line:
+                continue
+            if self._col_idx is None:
+                self._parse_header(line)
+                continue
+            parts = line.split(self._sep)
+            try:
+                sizes.append(float(parts[self._col_idx]))
+            except (IndexError, ValueError):
+                continue
+
+        sizes = np.array(sizes, dtype=np.float64)
+        return sizes[np.isfinite(sizes) & (sizes > 0)]
+
+
+class LiveDistribution:
+    """
+    Wolumen per bucket z dzisiejszego flow oraz bieżące sumy przychodu per scenariusz.
+    Buckety, spready i wolumeny są w kolejności `bucket_ends` podanej przez wywołującego (np. kolejności pliku) —
+    wyszukiwanie bucketu transakcji idzie po granicach posortowanych raz przy tworzeniu.
+    """
+
+    def __init__(self, bucket_ends: np.ndarray, lot_price: float, spread_multiplier: float = 1.0):
+        self.bucket_ends = np.asarray(bucket_ends, dtype=np.float64)
+        self._order = np.argsort(self.bucket_ends, kind="stable")
+        self._sorted_ends = self.bucket_ends[self._order]
+        self.lot_price = lot_price
+        self.spread_multiplier = spread_multiplier
+        self.volumes = np.zeros(len(self.bucket_ends))
+        self.fill_count = 0
+        self.spreads: dict[str, np.ndarray] = {}
+        self.fingerprints: dict[str, str] = {}
+        self.revenue: dict[str, float] = {}
+
+    @property
+    def total_volume(self) -> float:
+        return float(self.volumes.sum())
+
+    @property
+    def turnover(self) -> float:
+        return self.total_volume * self.lot_price
+
+    def rpm(self, name: str) -> float:
+        turnover = self.turnover
+        return (self.revenue[name] / turnover * 1_000_000) if turnover > 0 else 0.0
+
+    def set_pricing(self, lot_price: float, spread_multiplier: float) -> None:
+        """Aktualizuje wartość lota i mnożnik spreadu — zmiana mnożnika przelicza sumy wszystkich scenariuszy."""
+        self.lot_price = lot_price
+        if spread_multiplier == self.spread_multiplier:
+            return
+        self.spread_multiplier = spread_multiplier
+        for name, spreads in self.spreads.items():
+            self.revenue[name] = float(self.volumes @ spreads) * spread_multiplier / 2
+
+    def reset(self) -> None:
+        """Zeruje flow (np. po rotacji pliku transakcji); spready scenariuszy zostają."""
+        self.volumes = np.zeros(len(self.bucket_ends))
+        self.fill_count = 0
+        self.revenue = {name: 0.0 for name in self.spreads}
+
+    def set_scenario(self, name: str, spreads: np.ndarray, fingerprint: str) -> None:
+        """Rejestruje spready per bucket scenariusza. Pełne przeliczenie tylko gdy OB się zmienił."""
+        if self.fingerprints.get(name) == fingerprint:
+            return
+        self.spreads[name] = np.asarray(spreads, dtype=np.float64)
+        self.fingerprints[name] = fingerprint
+        self.revenue[name] = float(self.volumes @ self.spreads[name]) * self.spread_multiplier / 2
+
+    def apply(self, sizes: np.ndarray) -> np.ndarray:
+        """Dodaje nowe transakcje i aktualizuje przychód o przyrost ze zmienionych bucketów."""
+        if sizes.size == 0:
+            return np.empty(0, dtype=np.int64)
+
+        idx = np.minimum(np.searchsorted(self._sorted_ends, sizes, side="left"), len(self.bucket_ends) - 1)
+        idx = self._order[idx]
+        changed, inverse = np.unique(idx, return_inverse=True)
+        delta = np.bincount(inverse, weights=sizes)
+
+        self.volumes[changed] += delta
+        self.fill_count += int(sizes.size)
+        for name, spreads in self.spreads.items():
+            self.revenue[name] += float(delta @ spreads[changed]) * self.spread_multiplier / 2
+        return changed
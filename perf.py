@@ -0,0 +1,228 @@
+"""
+Pomiar czasu etapów reruna aplikacji (czyszczenie CSV, wczytanie danych, walidacja, scoring,
+tabele, wykresy, eksport) oraz liczniki trafień cache'y loaderów.
+
+Dwa niezależne tryby:
+  - globalny (`enable`) — sumy etapów całego procesu; włącza go harness `benchmarks/bench_app.py`,
+  - per rerun (`begin` / `end`) — profil jednej sesji z tagami sesji i zakładki, logowany
+    jako linie `klucz=wartość`; włącza go app.py dla `?debug=1` lub zmiennej PROFILE_ENV.
+
+Gdy oba są wyłączone, `stage` i `timed` kosztują jedno sprawdzenie flagi i atrybutu wątku.
+Etapy mogą być zagnieżdżone (np. `dashboard` obejmuje `score` i `chart_*`) — czasy
+etapów nie sumują się więc do czasu całego reruna.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Zmienna środowiskowa włączająca profil i logi dla wszystkich sesji (bez panelu debug)
+PROFILE_ENV = "SPREAD_CALC_PROFILE"
+
+logger = logging.getLogger("spread_calculator.perf")
+
+_lock = threading.Lock()
+_enabled = False
+_stages: dict[str, list[float]] = {}
+_local = threading.local()
+_cache_counts: dict[str, list[int]] = {}  # nazwa -> [wywołania, chybienia]
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def profile_all_sessions() -> bool:
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+def reset() -> None:
+    with _lock:
+        _stages.clear()
+
+
+def record(name: str, seconds: float) -> None:
+    with _lock:
+        _stages.setdefault(name, []).append(seconds)
+
+
+def snapshot() -> dict[str, dict]:
+    """{etap: {"seconds": suma, "calls": liczba wywołań}} od ostatniego `reset`."""
+    with _lock:
+        return {name: {"seconds": sum(times), "calls": len(times)} for name, times in _stages.items()}
+
+
+# ==========================================
+# PROFIL JEDNEGO RERUNA
+# ==========================================
+class Profile:
+    """Etapy jednego reruna sesji — (etap, zakładka, sekundy) w kolejności zakończenia."""
+
+    def __init__(self, session: str, log: bool = True):
+        self.session = session
+        self.log = log
+        self.tab: str | None = None
+        self.records: list[tuple[str, str | None, float]] = []
+        self.started = time.perf_counter()
+        self.elapsed: float | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.records.append((name, self.tab, seconds))
+        if self.log:
+            logger.info('perf session=%s tab="%s" stage=%s ms=%.2f', self.session, self.tab or "", name, seconds * 1000)
+
+    def summary(self) -> list[dict]:
+        """Sumy per (etap, zakładka), od najdłuższych."""
+        acc: dict[tuple[str, str | None], list[float]] = {}
+        for name, tab, seconds in self.records:
+            acc.setdefault((name, tab), []).append(seconds)
+        rows = [{"stage": name, "tab": tab or "", "calls": len(times), "ms": sum(times) * 1000}
+                for (name, tab), times in acc.items()]
+        return sorted(rows, key=lambda r: r["ms"], reverse=True)
+
+
+def _ensure_handler() -> None:
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def start_clock() -> None:
+    """Początek reruna — pierwsza instrukcja app.py, przed ciężkimi importami."""
+    _local.clock = time.perf_counter()
+
+
+def begin(session: str, active: bool, log: bool = True) -> Profile | None:
+    """Otwiera profil reruna w bieżącym wątku skryptu (albo czyści poprzedni, gdy `active` jest fałszywe)."""
+    profile = Profile(session, log) if active else None
+    if profile is not None:
+        profile.started = getattr(_local, "clock", profile.started)
+        if log:
+            _ensure_handler()
+    _local.profile = profile
+    return profile
+
+
+def current() -> Profile | None:
+    return getattr(_local, "profile", None)
+
+
+def end() -> Profile | None:
+    """Zamyka profil reruna — całkowity czas trafia jako etap `rerun`."""
+    profile = current()
+    _local.profile = None
+    if profile is not None:
+        profile.elapsed = time.perf_counter() - profile.started
+        profile.tab = None
+        profile.add("rerun", profile.elapsed)
+    return profile
+
+
+@contextmanager
+def tagged(tab: str):
+    """Etapy wewnątrz bloku dostają tag zakładki (np. rynku)."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    previous, profile.tab = profile.tab, tab
+    try:
+        yield
+    finally:
+        profile.tab = previous
+
+
+# ==========================================
+# ETAPY
+# ==========================================
+@contextmanager
+def stage(name: str):
+    """Mierzy blok kodu jako etap `name` (sumowany, jeśli etap wystąpi kilka razy w rerunie)."""
+    profile = getattr(_local, "profile", None)
+    if not _enabled and profile is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        if _enabled:
+            record(name, seconds)
+        if profile is not None:
+            profile.add(name, seconds)
+
+
+def since_start(name: str) -> None:
+    """Etap `name` = czas od `start_clock` (np. do pierwszego widocznego elementu strony)."""
+    clock = getattr(_local, "clock", None)
+    profile = getattr(_local, "profile", None)
+    if clock is None or (not _enabled and profile is None):
+        return
+    seconds = time.perf_counter() - clock
+    if _enabled:
+        record(name, seconds)
+    if profile is not None:
+        profile.add(name, seconds)
+
+
+def timed(name: str):
+    """Dekorator: całe wywołanie funkcji jako etap `name`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==========================================
+# TRAFIENIA CACHE LOADERÓW
+# ==========================================
+def _count_cache(name: str, miss: bool) -> None:
+    with _lock:
+        counts = _cache_counts.setdefault(name, [0, 0])
+        counts[1 if miss else 0] += 1
+
+
+def counted_cache(name: str, cache_decorator):
+    """
+    Nakłada `cache_decorator` (np. `st.cache_data`) i liczy wywołania oraz chybienia:
+    ciało funkcji wykonuje się tylko przy chybieniu, więc trafienia = wywołania − chybienia.
+    """
+    def decorator(func):
+        @wraps(func)
+        def on_miss(*args, **kwargs):
+            _count_cache(name, miss=True)
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(on_miss)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            _count_cache(name, miss=False)
+            return cached(*args, **kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+
+def cache_stats() -> list[dict]:
+    """Wywołania, trafienia i współczynnik trafień loaderów opakowanych `counted_cache`."""
+    with _lock:
+        items = sorted(_cache_counts.items())
+    return [{"cache": name, "calls": calls, "hits": calls - misses, "misses": misses,
+             "hit_ratio": (calls - misses) / calls if calls else 0.0}
+            for name, (calls, misses) in items]
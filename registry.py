@@ -0,0 +1,93 @@
+"""
+Rejestr instrumentów — wczytywany z `instruments.toml`.
+
+Przy starcie parsowana jest wyłącznie konfiguracja (kilka KB), więc czas startu nie rośnie
+z liczbą instrumentów. Rozkłady i Order Booki są ładowane dopiero przy pierwszym otwarciu
+danego instrumentu (patrz `load_market_distribution` w app.py).
+"""
+import os
+import tomllib
+from dataclasses import dataclass
+
+import pandas as pd
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instruments.toml")
+
+
+@dataclass(frozen=True)
+class Market:
+    instrument: str
+    name: str
+    distribution: str
+    order_book_a: dict
+    order_book_b: dict | None = None
+
+    @property
+    def key(self) -> str:
+        """Nazwa zakładki i prefiks kluczy widgetów, np. 'Spot XAUUSD'."""
+        return f"{self.name} {self.instrument}"
+
+    @property
+    def clean_distribution(self) -> str:
+        return self.distribution.replace(".csv", "_clean.csv")
+
+    @property
+    def periods_path(self) -> str:
+        return self.distribution.replace(".csv", "_periods.csv")
+
+    @property
+    def segments_path(self) -> str:
+        return self.distribution.replace(".csv", "_segments.csv")
+
+    def default_order_book(self, side: str = "a") -> pd.DataFrame:
+        """Domyślny Order Book A lub B (B bez konfiguracji = kopia A)."""
+        spec = self.order_book_b if side == "b" and self.order_book_b is not None else self.order_book_a
+        return order_book_from_spec(spec)
+
+
+@dataclass(frozen=True)
+class Instrument:
+    symbol: str
+    lot_price: float
+    spread_multiplier: float
+    markets: tuple[Market, ...]
+
+
+def order_book_from_spec(spec: dict) -> pd.DataFrame:
+    ask = [float(x) for x in spec["ask_sizes"]]
+    return pd.DataFrame({
+        "OB Line": list(range(1, len(ask) + 1)),
+        "Bid Size": [float(x) for x in spec.get("bid_sizes", ask)],
+        "Ask Size": ask,
+        "Spread":   [float(x) for x in spec["spreads"]],
+    })
+
+
+def load_registry(path: str = REGISTRY_PATH) -> dict[str, Instrument]:
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+
+    registry = {}
+    for symbol, spec in config.items():
+        markets = tuple(
+            Market(
+                instrument=symbol,
+                name=market_name,
+                distribution=market["distribution"],
+                order_book_a=market["order_book_a"],
+                order_book_b=market.get("order_book_b"),
+            )
+            for market_name, market in spec.get("markets", {}).items()
+        )
+        registry[symbol] = Instrument(
+            symbol=symbol,
+            lot_price=float(spec["lot_price"]),
+            spread_multiplier=float(spec.get("spread_multiplier", 1.0)),
+            markets=markets,
+        )
+    return registry
+
+
+def distribution_files(registry: dict[str, Instrument]) -> list[str]:
+    """Surowe pliki rozkładów wszystkich zarejestrowanych rynków."""
+    return [m.distribution for inst in registry.values() for m in inst.markets]
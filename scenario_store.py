@@ -0,0 +1,199 @@
+"""
+Biblioteka zapisanych scenariuszy — nazwane Order Booki per rynek (autor, data) w lokalnej bazie SQLite.
+
+Obok każdego scenariusza trzymane są jego sumy (przychód, turnover, RPM, uplift względem bieżącego
+Order Booka A rynku) wraz z podstawą, na której je policzono: odcisk rozkładu, odcisk Order Booka A,
+wartość lota i mnożnik spreadu. Listowanie i sortowanie to jedno zapytanie po indeksie sum —
+silnik liczy wyłącznie scenariusze bez sum dla bieżącej podstawy (nowe albo po zmianie rozkładu),
+wszystkie naraz jednym wywołaniem `score_batch_reduced`. Sumy są trzymane dla kilku ostatnio
+policzonych podstaw rynku naraz (MAX_TOTALS_BASES), więc sesje w różnych rozdzielczościach czy
+z różnym mnożnikiem — albo powrót do poprzedniej rozdzielczości — nie przeliczają biblioteki od nowa.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+
+import pandas as pd
+
+from engine import DEFAULT_MEMORY_BUDGET_MB, Distribution, OrderBook, score_batch_reduced
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios.sqlite")
+MAX_TOTALS_BASES = 8  # Podstawy sum trzymane per rynek — starsze (najdawniej policzone) są usuwane
+
+# Kolumny, po których można sortować listę (nazwa w interfejsie -> wyrażenie SQL z indeksem)
+SORT_COLUMNS = {
+    "Revenue_USD": "t.revenue",
+    "RPM":         "t.rpm",
+    "Uplift_USD":  "t.uplift",
+    "Zapisano":    "s.created_at",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id          INTEGER PRIMARY KEY,
+    market      TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    author      TEXT NOT NULL DEFAULT '',
+    created_at  TEXT NOT NULL,
+    order_book  TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    UNIQUE (market, name)
+);
+CREATE TABLE IF NOT EXISTS scenario_totals (
+    scenario_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+    basis       TEXT NOT NULL,
+    revenue     REAL NOT NULL,
+    turnover    REAL NOT NULL,
+    rpm         REAL NOT NULL,
+    uplift      REAL NOT NULL,
+    computed_at REAL NOT NULL,
+    PRIMARY KEY (scenario_id, basis)
+);
+CREATE INDEX IF NOT EXISTS idx_scenarios_market_created ON scenarios (market, created_at);
+CREATE INDEX IF NOT EXISTS idx_totals_revenue ON scenario_totals (basis, revenue);
+CREATE INDEX IF NOT EXISTS idx_totals_rpm     ON scenario_totals (basis, rpm);
+CREATE INDEX IF NOT EXISTS idx_totals_uplift  ON scenario_totals (basis, uplift);
+"""
+
+
+@dataclass(frozen=True)
+class SavedScenario:
+    id: int
+    market: str
+    name: str
+    author: str
+    created_at: str
+    order_book: OrderBook
+
+
+def totals_basis(distribution_fingerprint: str, current: OrderBook, lot_price: float, spread_multiplier: float) -> str:
+    """Wszystko, od czego zależą zapisane sumy — zmiana któregokolwiek elementu wymusza ich przeliczenie."""
+    return f"{distribution_fingerprint}:{current.fingerprint}:{lot_price!r}:{spread_multiplier!r}"
+
+
+def _dump_order_book(book: OrderBook) -> str:
+    return json.dumps({"lines": book.lines.tolist(), "bid": book.bid.tolist(),
+                       "ask": book.ask.tolist(), "spread": book.spread.tolist()})
+
+
+def _load_order_book(data: str) -> OrderBook:
+    d = json.loads(data)
+    return OrderBook.from_arrays(d["lines"], d["ask"], d["spread"], d["bid"])
+
+
+class ScenarioStore:
+    """Dostęp do bazy scenariuszy — każde wywołanie na własnym połączeniu, więc bezpieczny dla wielu sesji."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            # Baza sprzed sum dla wielu podstaw (jedna podstawa per scenariusz) — sumy to tylko cache
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(scenario_totals)")}
+            if columns and "computed_at" not in columns:
+                conn.execute("DROP TABLE scenario_totals")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    # ------------------------------------------
+    # Scenariusze
+    # ------------------------------------------
+    def save(self, market: str, name: str, author: str, order_book: OrderBook) -> int:
+        """Zapisuje (lub nadpisuje scenariusz o tej samej nazwie na rynku) — sumy nadpisanego są usuwane."""
+        created_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO scenarios (market, name, author, created_at, order_book, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (market, name) DO UPDATE SET author = excluded.author, "
+                "created_at = excluded.created_at, order_book = excluded.order_book, "
+                "fingerprint = excluded.fingerprint",
+                (market, name, author, created_at, _dump_order_book(order_book), order_book.fingerprint),
+            )
+            scenario_id = conn.execute("SELECT id FROM scenarios WHERE market = ? AND name = ?",
+                                       (market, name)).fetchone()[0]
+            conn.execute("DELETE FROM scenario_totals WHERE scenario_id = ?", (scenario_id,))
+        return scenario_id
+
+    def delete(self, scenario_id: int) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM scenarios WHERE id = ?", (scenario_id,))
+
+    def get(self, scenario_id: int) -> SavedScenario | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT id, market, name, author, created_at, order_book FROM scenarios WHERE id = ?",
+                               (scenario_id,)).fetchone()
+        if row is None:
+            return None
+        return SavedScenario(*row[:5], order_book=_load_order_book(row[5]))
+
+    # ------------------------------------------
+    # Sumy
+    # ------------------------------------------
+    def refresh_totals(self, market: str, basis: str, dist: Distribution, current: OrderBook, lot_price: float,
+                       spread_multiplier: float = 1.0, memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB) -> int:
+        """
+        Liczy sumy scenariuszy rynku, które nie mają ich dla `basis` — jednym wywołaniem silnika,
+        razem z bieżącym Order Bookiem A (punkt odniesienia upliftu). Zwraca liczbę przeliczonych scenariuszy.
+        """
+        with closing(self._connect()) as conn:
+            missing = conn.execute(
+                "SELECT s.id, s.order_book FROM scenarios s "
+                "LEFT JOIN scenario_totals t ON t.scenario_id = s.id AND t.basis = ? "
+                "WHERE s.market = ? AND t.scenario_id IS NULL",
+                (basis, market),
+            ).fetchall()
+        if not missing or len(dist.bucket_ends) == 0:
+            return 0
+
+        books = [_load_order_book(data) for _, data in missing] + [current]
+        totals = score_batch_reduced(books, dist.bucket_ends, dist.volumes, lot_price, spread_multiplier,
+                                     memory_budget_mb)
+        revenue, rpm = totals.revenue[:-1], totals.rpm[:-1]
+        uplift = revenue - totals.revenue[-1]
+        computed_at = time.time()
+        rows = [(scenario_id, basis, float(revenue[i]), float(totals.turnover[i]), float(rpm[i]), float(uplift[i]),
+                 computed_at)
+                for i, (scenario_id, _) in enumerate(missing)]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO scenario_totals VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._prune_bases(conn, market)
+        return len(rows)
+
+    @staticmethod
+    def _prune_bases(conn: sqlite3.Connection, market: str) -> None:
+        """Usuwa sumy rynku dla podstaw spoza MAX_TOTALS_BASES ostatnio policzonych."""
+        conn.execute(
+            "DELETE FROM scenario_totals "
+            "WHERE scenario_id IN (SELECT id FROM scenarios WHERE market = :market) "
+            "AND basis NOT IN ("
+            "    SELECT t.basis FROM scenario_totals t JOIN scenarios s ON s.id = t.scenario_id "
+            "    WHERE s.market = :market GROUP BY t.basis ORDER BY MAX(t.computed_at) DESC LIMIT :keep)",
+            {"market": market, "keep": MAX_TOTALS_BASES},
+        )
+
+    def list_scenarios(self, market: str, basis: str, sort_by: str = "Revenue_USD", descending: bool = True,
+                       limit: int | None = None) -> pd.DataFrame:
+        """Scenariusze rynku z sumami dla `basis`, posortowane w SQL — bez liczenia czegokolwiek."""
+        order = f"{SORT_COLUMNS[sort_by]} {'DESC' if descending else 'ASC'}"
+        query = ("SELECT s.id, s.name, s.author, s.created_at, t.revenue, t.rpm, t.uplift "
+                 "FROM scenario_totals t JOIN scenarios s ON s.id = t.scenario_id "
+                 f"WHERE t.basis = ? AND s.market = ? ORDER BY {order}")
+        params: tuple = (basis, market)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return pd.DataFrame(rows, columns=["id", "Nazwa", "Autor", "Zapisano", "Revenue_USD", "RPM", "Uplift_USD"])
+
+    def count(self, market: str) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM scenarios WHERE market = ?", (market,)).fetchone()[0]
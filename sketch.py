@@ -0,0 +1,177 @@
+"""
+Mergowalny szkic rozkładu wolumenu transakcji (w stylu DDSketch).
+
+Wielkości transakcji trafiają do logarytmicznych koszyków o stałym błędzie względnym,
+więc rok transakcji XAUUSD/XAGUSD mieści się w kilkuset koszykach niezależnie od liczby
+wierszy. Szkice z różnych dni / węzłów sumuje się przez `merge`, a następnie materializuje
+do bucketów `volume_range`/`filled_volume` o dowolnej rozdzielczości.
+"""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class VolumeSketch:
+    """Szkic ważony wolumenem: każdy koszyk przechowuje sumę `filled_volume` i liczbę transakcji."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy musi być w przedziale (0, 1).")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.volumes: dict[int, float] = {}
+        self.counts: dict[int, int] = {}
+
+    # ------------------------------------------
+    # Budowanie i łączenie
+    # ------------------------------------------
+    def key(self, sizes: np.ndarray) -> np.ndarray:
+        """Indeks koszyka (gamma^(k-1), gamma^k] dla każdej wielkości."""
+        return np.ceil(np.log(sizes) / self._log_gamma).astype(np.int64)
+
+    def add(self, sizes, weights=None) -> "VolumeSketch":
+        """Dodaje paczkę transakcji. Domyślnie wagą jest sama wielkość (wolumen w lotach)."""
+        sizes = np.asarray(sizes, dtype=np.float64)
+        if weights is None:
+            weights = sizes
+        weights = np.asarray(weights, dtype=np.float64)
+
+        mask = np.isfinite(sizes) & (sizes > 0) & np.isfinite(weights)
+        sizes, weights = sizes[mask], weights[mask]
+        if sizes.size == 0:
+            return self
+
+        keys, inverse = np.unique(self.key(sizes), return_inverse=True)
+        vols = np.bincount(inverse, weights=weights)
+        cnts = np.bincount(inverse)
+        for k, v, c in zip(keys.tolist(), vols.tolist(), cnts.tolist()):
+            self.volumes[k] = self.volumes.get(k, 0.0) + v
+            self.counts[k]  = self.counts.get(k, 0) + c
+        return self
+
+    def merge(self, other: "VolumeSketch") -> "VolumeSketch":
+        """Dodaje w miejscu inny szkic o tej samej dokładności."""
+        if not math.isclose(self.relative_accuracy, other.relative_accuracy):
+            raise ValueError("Można łączyć tylko szkice o tej samej relative_accuracy.")
+        for k, v in other.volumes.items():
+            self.volumes[k] = self.volumes.get(k, 0.0) + v
+        for k, c in other.counts.items():
+            self.counts[k] = self.counts.get(k, 0) + c
+        return self
+
+    @classmethod
+    def merged(cls, sketches) -> "VolumeSketch":
+        sketches = list(sketches)
+        if not sketches:
+            raise ValueError("Brak szkiców do połączenia.")
+        result = cls(sketches[0].relative_accuracy)
+        for s in sketches:
+            result.merge(s)
+        return result
+
+    # ------------------------------------------
+    # Odczyt
+    # ------------------------------------------
+    @property
+    def total_volume(self) -> float:
+        return float(sum(self.volumes.values()))
+
+    @property
+    def total_count(self) -> int:
+        return int(sum(self.counts.values()))
+
+    def __len__(self) -> int:
+        return len(self.volumes)
+
+    def _arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        keys = np.array(sorted(self.volumes), dtype=np.int64)
+        vols = np.array([self.volumes[k] for k in keys.tolist()], dtype=np.float64)
+        return keys, vols
+
+    def representative(self, keys: np.ndarray) -> np.ndarray:
+        """Wartość reprezentatywna koszyka — błąd względny nie większy niż relative_accuracy."""
+        return 2 * np.power(self.gamma, keys) / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """Kwantyl wielkości transakcji ważony wolumenem (np. q=0.5 — połowa wolumenu poniżej)."""
+        if not self.volumes:
+            return float("nan")
+        keys, vols = self._arrays()
+        cum = np.cumsum(vols)
+        i = int(np.searchsorted(cum, q * cum[-1], side="left"))
+        return float(self.representative(keys[min(i, keys.size - 1)]))
+
+    def to_distribution(self, bucket_width: float | None = None, edges=None) -> pd.DataFrame:
+        """
+        Materializuje szkic do bucketów `volume_range`/`filled_volume`: albo o stałej szerokości
+        `bucket_width`, albo według listy górnych granic `edges` (rosnąco, bez zera).
+        Łączny wolumen jest zachowany dokładnie — wolumen powyżej ostatniej granicy trafia do ostatniego bucketu.
+        """
+        import clean_csv
+
+        keys, vols = self._arrays()
+        if edges is None:
+            if bucket_width is None or bucket_width <= 0:
+                raise ValueError("Podaj dodatnie bucket_width albo listę edges.")
+            top = float(self.representative(keys[-1])) if keys.size else bucket_width
+            n = max(1, int(clean_csv.bucket_indices([top], bucket_width)[0]) + 1)
+            edges = bucket_width * np.arange(1, n + 1)
+            labels = [clean_csv.format_bucket_label(k, bucket_width) for k in range(n)]
+        else:
+            edges = np.asarray(edges, dtype=np.float64).ravel()
+            if edges.size == 0 or not np.all(np.isfinite(edges)) or edges[0] <= 0 or np.any(np.diff(edges) <= 0):
+                raise ValueError("edges musi być niepustą listą dodatnich, ściśle rosnących granic.")
+            starts = np.concatenate([[0.0], edges[:-1]])
+            decimals = clean_csv.label_decimals(*edges.tolist())
+            labels = [clean_csv.format_range_label(lo, hi, decimals) for lo, hi in zip(starts, edges)]
+
+        acc = np.diff(self._cumulative_at(keys, vols, edges), prepend=0.0) if keys.size else np.zeros(len(edges))
+        return pd.DataFrame({"volume_range": labels, "filled_volume": acc})
+
+    def _cumulative_at(self, keys: np.ndarray, vols: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """
+        Wolumen poniżej każdej granicy przy wolumenie koszyka rozłożonym równomiernie w (gamma^(k-1), gamma^k]
+        — koszyk przecinający granicę jest dzielony proporcjonalnie zamiast trafiać w całości na jedną stronę.
+        Ostatnia granica obejmuje cały wolumen (nadwyżka trafia do ostatniego bucketu).
+        """
+        hi = np.power(self.gamma, keys.astype(np.float64))
+        lo = hi / self.gamma
+        cum = np.cumsum(vols)
+        # Koszyki o górnej granicy < granicy bucketu są w całości poniżej; koszyk j może ją przecinać
+        j = np.searchsorted(hi, edges, side="left")
+        full = np.where(j > 0, cum[np.maximum(j - 1, 0)], 0.0)
+        jj = np.minimum(j, keys.size - 1)
+        fraction = np.clip((edges - lo[jj]) / (hi[jj] - lo[jj]), 0.0, 1.0)
+        partial = np.where(j < keys.size, vols[jj] * fraction, 0.0)
+        result = full + partial
+        result[-1] = cum[-1]
+        return result
+
+    # ------------------------------------------
+    # Serializacja
+    # ------------------------------------------
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "volumes": {str(k): v for k, v in self.volumes.items()},
+            "counts":  {str(k): c for k, c in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "VolumeSketch":
+        sketch = cls(float(data["relative_accuracy"]))
+        sketch.volumes = {int(k): float(v) for k, v in data["volumes"].items()}
+        sketch.counts  = {int(k): int(c) for k, c in data.get("counts", {}).items()}
+        return sketch
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "VolumeSketch":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,580 @@
+"""
+Rozproszony sweep Ask Size × Spread: koordynator dzieli siatkę na paczki (shardy), a procesy robocze
+— także na innych maszynach — pobierają je przez TCP, liczą silnikiem i odsyłają tylko sumy.
+
+Siatka to iloczyn skal Ask Size i skal spreadu, stosowanych do całej drabiny bazowej (Order Book A
+lub B z rejestru), dla każdego rozkładu: łącznego rynku oraz — z `--periods` — każdego okresu
+z `<rozkład>_periods.csv`. Shard to zakres punktów siatki jednego rozkładu; rozkład jest wysyłany
+do procesu roboczego tylko raz na połączenie. Proces roboczy liczy shard przez `score_batch_reduced`
+i odsyła przychód, turnover oraz spread tieru konkurencyjnego per punkt.
+
+Shard wydany procesowi roboczemu ma termin (`lease`). Zerwane połączenie oddaje jego shardy
+do kolejki od razu, a przeterminowane wracają przy najbliższym pobraniu — po `max_attempts`
+nieudanych wydaniach shard jest oznaczany jako nieudany (w wyniku NaN). Shard policzony dwa razy
+(spóźniony wynik po ponownym wydaniu) liczy się raz — wygrywa pierwszy wynik.
+
+Transport to `multiprocessing.connection` (pickle po TCP z uwierzytelnieniem HMAC kluczem `--authkey`
+albo zmiennej SPREAD_CALC_SWEEP_AUTHKEY) — tylko w zaufanej sieci. Klucz jest obowiązkowy: bez niego
+każdy, kto dosięgnie portu, mógłby wysłać koordynatorowi dowolny pickle. Koordynator domyślnie
+nasłuchuje tylko na 127.0.0.1; dla procesów roboczych z innych maszyn podaj `--host` jawnie.
+
+Uruchomienie:
+    python -m sweep_cluster local --workers 4 --periods --output sweep.csv
+    SPREAD_CALC_SWEEP_AUTHKEY=sekret python -m sweep_cluster coordinator --host 0.0.0.0 --port 7070 --periods --output sweep.csv
+    SPREAD_CALC_SWEEP_AUTHKEY=sekret python -m sweep_cluster worker --host koordynator.lan --port 7070
+"""
+import argparse
+import collections
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Client, Connection, Listener
+
+import numpy as np
+import pandas as pd
+
+import clean_csv
+from engine import (
+    DEFAULT_MEMORY_BUDGET_MB, OrderBook, StackedOrderBooks, panel_from_long, prepare_distribution,
+    score_batch_reduced, tier_spread,
+)
+from frontier import COMPETITIVE_LINES
+from registry import Instrument, load_registry
+
+DEFAULT_PORT = 7070
+DEFAULT_SHARD_SIZE = 256          # Punktów siatki na shard
+DEFAULT_LEASE_S = 60.0            # Czas na policzenie sharda, po którym wraca do kolejki
+DEFAULT_MAX_ATTEMPTS = 3          # Wydania sharda, po których uznawany jest za nieudany
+DEFAULT_CONNECT_TIMEOUT_S = 30.0  # Jak długo proces roboczy czeka na koordynatora
+WAIT_INTERVAL_S = 0.2             # Przerwa procesu roboczego, gdy wszystkie shardy są wydane
+AUTHKEY_ENV = "SPREAD_CALC_SWEEP_AUTHKEY"
+TOTAL_PERIOD = "łącznie"          # Okres rozkładu łącznego rynku
+
+
+# ==========================================
+# SIATKA I ZADANIA
+# ==========================================
+@dataclass(frozen=True)
+class SweepTask:
+    """Jeden rozkład do przeszukania: rynek, okres i drabina bazowa."""
+    market: str
+    period: str
+    bucket_ends: np.ndarray
+    volumes: np.ndarray
+    lot_price: float
+    spread_multiplier: float
+    base_ask: np.ndarray
+    base_spread: np.ndarray
+
+
+def scale_grid(low: float, high: float, n: int) -> np.ndarray:
+    return np.linspace(low, high, n) if n > 1 else np.array([low])
+
+
+def grid_ladders(task: SweepTask, ask_scales: np.ndarray, spread_scales: np.ndarray,
+                 start: int, stop: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Drabiny punktów `start:stop` siatki (punkt p = skala Ask Size p // S, skala spreadu p % S),
+    zaokrąglone jak w edytorze.
+    """
+    points = np.arange(start, stop)
+    a, s = np.divmod(points, len(spread_scales))
+    asks = np.maximum(np.round(task.base_ask * ask_scales[a][:, None], 1), 0.1)
+    spreads = np.round(task.base_spread * spread_scales[s][:, None], 1)
+    return asks, spreads
+
+
+def score_shard(task: SweepTask, ask_scales: np.ndarray, spread_scales: np.ndarray, start: int, stop: int,
+                memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB) -> dict[str, np.ndarray]:
+    """Sumy punktów `start:stop` siatki: przychód, turnover i spread tieru konkurencyjnego (linie 1–2)."""
+    asks, spreads = grid_ladders(task, ask_scales, spread_scales, start, stop)
+    books = StackedOrderBooks(
+        cum_ask=np.cumsum(asks, axis=1),
+        spreads=spreads,
+        n_lines=np.full(len(asks), asks.shape[1], dtype=np.int64),
+    )
+    totals = score_batch_reduced(books, task.bucket_ends, task.volumes, task.lot_price, task.spread_multiplier,
+                                 memory_budget_mb)
+    return {
+        "revenue": totals.revenue,
+        "turnover": totals.turnover,
+        "top_spread": tier_spread(totals.line_volume, spreads, COMPETITIVE_LINES),
+    }
+
+
+def read_panel(path: str, key_column: str) -> pd.DataFrame | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        sep = ";" if ";" in f.readline() else ","
+    return pd.read_csv(path, sep=sep, encoding="utf-8-sig", dtype={key_column: str})
+
+
+def registry_tasks(registry: dict[str, Instrument], side: str = "a", periods: bool = False,
+                   markets: list[str] | None = None) -> list[SweepTask]:
+    """Zadania dla wszystkich rynków rejestru (lub `markets`): rozkład łączny i opcjonalnie każdy okres."""
+    tasks = []
+    for instrument in registry.values():
+        for market in instrument.markets:
+            if markets and market.key not in markets:
+                continue
+            base = OrderBook.from_frame(market.default_order_book(side))
+            common = dict(market=market.key, lot_price=instrument.lot_price,
+                          spread_multiplier=instrument.spread_multiplier, base_ask=base.ask, base_spread=base.spread)
+
+            dist = prepare_distribution(clean_csv.read_clean_csv(clean_csv.clean_file(market.distribution)))
+            if len(dist.bucket_ends):
+                tasks.append(SweepTask(period=TOTAL_PERIOD, bucket_ends=dist.bucket_ends, volumes=dist.volumes,
+                                       **common))
+            panel_df = read_panel(market.periods_path, "period") if periods else None
+            if panel_df is None:
+                continue
+            panel = panel_from_long(panel_df, "period")
+            tasks += [SweepTask(period=str(key), bucket_ends=panel.bucket_ends, volumes=volumes, **common)
+                      for key, volumes in zip(panel.keys, panel.volumes)]
+    return tasks
+
+
+# ==========================================
+# WYNIK
+# ==========================================
+@dataclass(frozen=True)
+class SweepGrid:
+    """Sumy całej siatki jednego rozkładu (skale Ask Size × skale spreadu); NaN w punktach nieudanych shardów."""
+    market: str
+    period: str
+    revenue: np.ndarray
+    turnover: np.ndarray
+    top_spread: np.ndarray
+
+    def best(self, ask_scales: np.ndarray, spread_scales: np.ndarray) -> tuple[float, float, float]:
+        """(skala Ask Size, skala spreadu, przychód) punktu o najwyższym przychodzie."""
+        a, s = np.unravel_index(np.nanargmax(self.revenue), self.revenue.shape)
+        return float(ask_scales[a]), float(spread_scales[s]), float(self.revenue[a, s])
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    ask_scales: np.ndarray
+    spread_scales: np.ndarray
+    grids: list[SweepGrid]
+    shards: int
+    retries: int
+    failed: dict[int, str]
+    worker_shards: dict[str, int]
+    seconds: float
+
+    def frame(self) -> pd.DataFrame:
+        """Wszystkie punkty wszystkich rozkładów w formacie długim (jeden wiersz na punkt siatki)."""
+        a, s = np.meshgrid(self.ask_scales, self.spread_scales, indexing="ij")
+        frames = []
+        for grid in self.grids:
+            frames.append(pd.DataFrame({
+                "market": grid.market,
+                "period": grid.period,
+                "ask_scale": a.ravel(),
+                "spread_scale": s.ravel(),
+                "Revenue_USD": grid.revenue.ravel(),
+                "Turnover_USD": grid.turnover.ravel(),
+                "RPM": np.divide(grid.revenue.ravel() * 1_000_000, grid.turnover.ravel(),
+                                 out=np.full(grid.revenue.size, np.nan), where=grid.turnover.ravel() > 0),
+                "Top_Spread": grid.top_spread.ravel(),
+            }))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def summary(self) -> pd.DataFrame:
+        """Najlepszy punkt siatki per rozkład."""
+        rows = []
+        for grid in self.grids:
+            if np.isnan(grid.revenue).all():
+                continue
+            ask_scale, spread_scale, revenue = grid.best(self.ask_scales, self.spread_scales)
+            rows.append({"market": grid.market, "period": grid.period, "ask_scale": ask_scale,
+                         "spread_scale": spread_scale, "Revenue_USD": revenue})
+        return pd.DataFrame(rows)
+
+
+# ==========================================
+# KOORDYNATOR
+# ==========================================
+class SweepCoordinator:
+    """
+    Kolejka shardów serwowana przez TCP. Każde połączenie procesu roboczego obsługuje osobny wątek:
+    `get` wydaje shard (z rozkładem, jeśli to połączenie jeszcze go nie dostało), `result` zapisuje sumy.
+    """
+
+    def __init__(self, tasks: list[SweepTask], ask_scales: np.ndarray, spread_scales: np.ndarray,
+                 address: tuple[str, int], authkey: bytes,
+                 shard_size: int = DEFAULT_SHARD_SIZE, lease_s: float = DEFAULT_LEASE_S,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB):
+        self.tasks = tasks
+        self.ask_scales = np.asarray(ask_scales, dtype=np.float64)
+        self.spread_scales = np.asarray(spread_scales, dtype=np.float64)
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self.memory_budget_mb = memory_budget_mb
+        n_points = len(self.ask_scales) * len(self.spread_scales)
+        # Shard: (zadanie, początek, koniec) zakresu punktów siatki
+        self.shards = [(t, start, min(start + shard_size, n_points))
+                       for t in range(len(tasks)) for start in range(0, n_points, shard_size)]
+
+        self.retries = 0
+        self.failed: dict[int, str] = {}
+        self.worker_shards: dict[str, int] = collections.Counter()
+        self._queue = collections.deque(range(len(self.shards)))
+        self._leases: dict[int, tuple[float, str, int]] = {}   # shard -> (termin, proces roboczy, połączenie)
+        self._attempts = collections.Counter()
+        self._results: dict[int, dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._started: float | None = None
+        self._finished: float | None = None
+        if not self.shards:
+            self._done.set()
+
+        self._listener = Listener(address, authkey=require_authkey(authkey))
+        self._thread = threading.Thread(target=self._accept, name="sweep-coordinator", daemon=True)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._listener.address
+
+    @property
+    def completed(self) -> int:
+        with self._lock:
+            return len(self._results) + len(self.failed)
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def start(self) -> "SweepCoordinator":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def close(self) -> None:
+        self._listener.close()
+
+    # ------------------------------------------
+    # Kolejka
+    # ------------------------------------------
+    def _requeue(self, shard_id: int, reason: str) -> None:
+        """Shard wraca do kolejki albo — po `max_attempts` wydaniach — jest oznaczany jako nieudany (pod blokadą)."""
+        self._leases.pop(shard_id, None)
+        if shard_id in self._results or shard_id in self.failed:
+            return
+        if self._attempts[shard_id] >= self.max_attempts:
+            self.failed[shard_id] = reason
+            self._check_done()
+        else:
+            self.retries += 1
+            self._queue.appendleft(shard_id)
+
+    def _expire_leases(self) -> None:
+        now = time.monotonic()
+        for shard_id, (deadline, worker, _) in list(self._leases.items()):
+            if deadline < now:
+                self._requeue(shard_id, f"przekroczony czas ({worker})")
+
+    def _check_done(self) -> None:
+        if len(self._results) + len(self.failed) == len(self.shards) and not self._done.is_set():
+            self._finished = time.perf_counter()
+            self._done.set()
+
+    def _lease(self, worker: str, conn_id: int) -> int | None:
+        """Następny shard dla procesu roboczego; None — brak wolnych (wszystkie wydane albo koniec)."""
+        with self._lock:
+            self._expire_leases()
+            while self._queue:
+                shard_id = self._queue.popleft()
+                if shard_id in self._results or shard_id in self.failed:
+                    continue
+                self._attempts[shard_id] += 1
+                self._leases[shard_id] = (time.monotonic() + self.lease_s, worker, conn_id)
+                return shard_id
+            return None
+
+    def _complete(self, shard_id: int, worker: str, result: dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self._leases.pop(shard_id, None)
+            if shard_id in self._results:
+                return
+            # Spóźniony wynik sharda już oznaczonego jako nieudany nadal jest poprawny
+            self.failed.pop(shard_id, None)
+            self._results[shard_id] = result
+            self.worker_shards[worker] += 1
+            self._check_done()
+
+    def _release(self, conn_id: int, reason: str) -> None:
+        """Połączenie zerwane — jego shardy wracają do kolejki od razu, bez czekania na termin."""
+        with self._lock:
+            for shard_id in [i for i, (_, _, c) in self._leases.items() if c == conn_id]:
+                self._requeue(shard_id, reason)
+
+    # ------------------------------------------
+    # Połączenia
+    # ------------------------------------------
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn = self._listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except OSError:   # zamknięty nasłuch
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        worker = "?"
+        sent_tasks: set[int] = set()
+        try:
+            _, worker = conn.recv()
+            conn.send(("grid", self.ask_scales, self.spread_scales, self.memory_budget_mb))
+            while True:
+                message = conn.recv()
+                if message[0] == "result":
+                    self._complete(message[1], worker, message[2])
+                    continue
+                if message[0] == "error":
+                    with self._lock:
+                        self._requeue(message[1], f"{worker}: {message[2]}")
+                    continue
+
+                shard_id = self._lease(worker, id(conn))
+                if shard_id is None:
+                    conn.send(("done",) if self.finished else ("wait", WAIT_INTERVAL_S))
+                    continue
+                t, start, stop = self.shards[shard_id]
+                task = None if t in sent_tasks else self.tasks[t]
+                sent_tasks.add(t)
+                conn.send(("shard", shard_id, t, task, start, stop))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            self._release(id(conn), f"zerwane połączenie ({worker})")
+
+    # ------------------------------------------
+    # Scalanie
+    # ------------------------------------------
+    def result(self) -> SweepResult:
+        """Scala sumy shardów w siatki per rozkład — punkty nieudanych shardów zostają NaN."""
+        n_points = len(self.ask_scales) * len(self.spread_scales)
+        shape = (len(self.ask_scales), len(self.spread_scales))
+        columns = {name: np.full((len(self.tasks), n_points), np.nan) for name in ("revenue", "turnover", "top_spread")}
+        with self._lock:
+            for shard_id, result in self._results.items():
+                t, start, stop = self.shards[shard_id]
+                for name, values in columns.items():
+                    values[t, start:stop] = result[name]
+            failed = dict(self.failed)
+            worker_shards = dict(self.worker_shards)
+
+        grids = [SweepGrid(market=task.market, period=task.period,
+                           **{name: values[t].reshape(shape) for name, values in columns.items()})
+                 for t, task in enumerate(self.tasks)]
+        end = self._finished or time.perf_counter()
+        return SweepResult(
+            ask_scales=self.ask_scales,
+            spread_scales=self.spread_scales,
+            grids=grids,
+            shards=len(self.shards),
+            retries=self.retries,
+            failed=failed,
+            worker_shards=worker_shards,
+            seconds=end - (self._started or end),
+        )
+
+
+# ==========================================
+# PROCES ROBOCZY
+# ==========================================
+def require_authkey(authkey: bytes) -> bytes:
+    """Pusty klucz wyłączyłby uwierzytelnianie, a `recv()` odpakowuje pickle — to wykonanie kodu z sieci."""
+    if not authkey:
+        raise ValueError(f"Brak klucza uwierzytelniania — podaj --authkey albo ustaw zmienną {AUTHKEY_ENV}.")
+    return authkey
+
+
+def connect(address: tuple[str, int], authkey: bytes, timeout: float = DEFAULT_CONNECT_TIMEOUT_S) -> Connection:
+    """Połączenie z koordynatorem — ponawiane do `timeout` (proces roboczy może wystartować pierwszy)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return Client(address, authkey=require_authkey(authkey))
+        except (ConnectionRefusedError, socket.timeout):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(WAIT_INTERVAL_S)
+
+
+def run_worker(address: tuple[str, int], authkey: bytes, name: str | None = None,
+               connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_S) -> int:
+    """Pobiera i liczy shardy do końca sweepu (albo zamknięcia koordynatora). Zwraca liczbę policzonych shardów."""
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    tasks: dict[int, SweepTask] = {}
+    done = 0
+    conn = connect(address, authkey, connect_timeout)
+    try:
+        conn.send(("hello", name))
+        _, ask_scales, spread_scales, memory_budget_mb = conn.recv()
+        while True:
+            conn.send(("get",))
+            message = conn.recv()
+            if message[0] == "done":
+                break
+            if message[0] == "wait":
+                time.sleep(message[1])
+                continue
+
+            _, shard_id, t, task, start, stop = message
+            if task is not None:
+                tasks[t] = task
+            try:
+                result = score_shard(tasks[t], ask_scales, spread_scales, start, stop, memory_budget_mb)
+            except Exception as e:  # błąd sharda nie kończy procesu — koordynator wyda go ponownie
+                conn.send(("error", shard_id, f"{type(e).__name__}: {e}"))
+                continue
+            conn.send(("result", shard_id, result))
+            done += 1
+    except (EOFError, OSError):
+        pass   # koordynator zakończył pracę
+    finally:
+        conn.close()
+    return done
+
+
+def run_local(tasks: list[SweepTask], ask_scales: np.ndarray, spread_scales: np.ndarray, workers: int,
+              **coordinator_kwargs) -> SweepResult:
+    """Koordynator i `workers` procesów roboczych na localhost — ta sama ścieżka co na wielu maszynach."""
+    authkey = os.urandom(16)
+    coordinator = SweepCoordinator(tasks, ask_scales, spread_scales, ("127.0.0.1", 0), authkey,
+                                   **coordinator_kwargs).start()
+    processes = [multiprocessing.Process(target=run_worker, args=(coordinator.address, authkey, f"local-{i}"),
+                                         daemon=True)
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        coordinator.wait()
+        for process in processes:
+            process.join()
+    finally:
+        coordinator.close()
+    return coordinator.result()
+
+
+# ==========================================
+# CLI
+# ==========================================
+def _authkey(args: argparse.Namespace, parser: argparse.ArgumentParser) -> bytes:
+    authkey = (args.authkey or os.environ.get(AUTHKEY_ENV, "")).encode()
+    if not authkey:
+        parser.error(f"wymagany klucz uwierzytelniania: --authkey albo zmienna {AUTHKEY_ENV}")
+    return authkey
+
+
+def _print_progress(coordinator: SweepCoordinator, interval: float) -> None:
+    while not coordinator.wait(interval):
+        print(f"  shardy: {coordinator.completed:,} / {len(coordinator.shards):,} — ponowienia: {coordinator.retries} "
+              f"— nieudane: {len(coordinator.failed)}", flush=True)
+
+
+def _report(result: SweepResult, output: str | None) -> None:
+    print(f"\nShardy: {result.shards:,} w {result.seconds:.1f} s — ponowienia: {result.retries}, "
+          f"nieudane: {len(result.failed)}")
+    for worker, count in sorted(result.worker_shards.items()):
+        print(f"  {worker}: {count:,}")
+    summary = result.summary()
+    if not summary.empty:
+        print("\nNajlepszy punkt per rozkład (pierwsze 20):")
+        print(summary.head(20).to_string(index=False))
+    if output:
+        result.frame().to_csv(output, index=False)
+        print(f"\nZapisano: {output}")
+    for shard_id, reason in sorted(result.failed.items()):
+        print(f"Shard {shard_id} nieudany: {reason}", file=sys.stderr)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def sweep_options(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--ask-scales", type=float, nargs=3, default=[0.5, 2.0, 16], metavar=("OD", "DO", "N"),
+                       help="Skale Ask Size siatki (np.linspace).")
+        p.add_argument("--spread-scales", type=float, nargs=3, default=[0.5, 2.0, 16], metavar=("OD", "DO", "N"),
+                       help="Skale spreadu siatki (np.linspace).")
+        p.add_argument("--side", choices=["a", "b"], default="a", help="Drabina bazowa: Order Book A lub B rynku.")
+        p.add_argument("--periods", action="store_true", help="Także każdy okres z <rozkład>_periods.csv.")
+        p.add_argument("--markets", nargs="+", help="Tylko wybrane rynki, np. 'Spot XAUUSD'.")
+        p.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+        p.add_argument("--lease", type=float, default=DEFAULT_LEASE_S, help="Czas [s] na policzenie sharda.")
+        p.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+        p.add_argument("--memory-budget", type=float, default=DEFAULT_MEMORY_BUDGET_MB,
+                       help="Budżet pamięci paczki silnika w procesie roboczym [MB].")
+        p.add_argument("--output", help="Plik CSV ze wszystkimi punktami siatki.")
+
+    def address_options(p: argparse.ArgumentParser, host: str) -> None:
+        p.add_argument("--host", default=host)
+        p.add_argument("--port", type=int, default=DEFAULT_PORT)
+        p.add_argument("--authkey", help=f"Klucz uwierzytelniania (wymagany; domyślnie zmienna {AUTHKEY_ENV}).")
+
+    local = commands.add_parser("local", help="Koordynator i procesy robocze na localhost.")
+    sweep_options(local)
+    local.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    coordinator = commands.add_parser("coordinator", help="Serwuje shardy procesom roboczym.")
+    sweep_options(coordinator)
+    address_options(coordinator, "127.0.0.1")
+    coordinator.add_argument("--progress", type=float, default=5.0, help="Co ile sekund wypisywać postęp.")
+
+    worker = commands.add_parser("worker", help="Pobiera i liczy shardy koordynatora.")
+    address_options(worker, "127.0.0.1")
+    worker.add_argument("--name", help="Nazwa w raporcie (domyślnie host:pid).")
+    worker.add_argument("--connect-timeout", type=float, default=DEFAULT_CONNECT_TIMEOUT_S)
+    return parser
+
+
+def main() -> None:
+    parser = _build_parser()
+    args = parser.parse_args()
+    if args.command == "worker":
+        done = run_worker((args.host, args.port), _authkey(args, parser), args.name, args.connect_timeout)
+        print(f"Policzone shardy: {done}")
+        return
+
+    tasks = registry_tasks(load_registry(), args.side, args.periods, args.markets)
+    ask_scales = scale_grid(args.ask_scales[0], args.ask_scales[1], int(args.ask_scales[2]))
+    spread_scales = scale_grid(args.spread_scales[0], args.spread_scales[1], int(args.spread_scales[2]))
+    options = dict(shard_size=args.shard_size, lease_s=args.lease, max_attempts=args.max_attempts,
+                   memory_budget_mb=args.memory_budget)
+    print(f"Rozkłady: {len(tasks)} — punkty siatki: {len(ask_scales) * len(spread_scales)}", flush=True)
+
+    if args.command == "local":
+        result = run_local(tasks, ask_scales, spread_scales, args.workers, **options)
+    else:
+        coordinator = SweepCoordinator(tasks, ask_scales, spread_scales, (args.host, args.port),
+                                       _authkey(args, parser), **options).start()
+        print(f"Koordynator nasłuchuje na {args.host}:{args.port} — shardy: {len(coordinator.shards):,}", flush=True)
+        try:
+            _print_progress(coordinator, args.progress)
+        except KeyboardInterrupt:
+            print("Przerwano — zapisuję policzone shardy.")
+        coordinator.close()
+        result = coordinator.result()
+    _report(result, args.output)
+    if result.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
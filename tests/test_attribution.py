@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import OrderBook, compare_scenarios, score_order_book
+
+LOT_PRICE = 100_000.0
+
+
+@pytest.fixture
+def dist():
+    ends = np.round(0.5 * np.arange(1, 41), 1)
+    volumes = np.round(np.random.default_rng(0).gamma(1.0, 30.0, len(ends)), 2)
+    return pd.DataFrame({"volume_range": [f"{e - 0.5:.1f} - {e:.1f}" for e in ends], "filled_volume": volumes})
+
+
+def test_effects_sum_to_revenue_delta(dist):
+    base = OrderBook.from_arrays([1, 2, 3, 4], [1.0, 2.0, 3.0, 4.0], [2.0, 6.0, 12.0, 20.0])
+    books = [
+        base,
+        OrderBook.from_arrays([1, 2, 3, 4], [1.0, 2.0, 3.0, 4.0], [2.5, 5.0, 15.0, 18.0]),   # tylko spready
+        OrderBook.from_arrays([1, 2, 3, 4], [1.5, 2.5, 3.0, 4.0], [2.0, 6.0, 12.0, 20.0]),   # tylko linie
+        OrderBook.from_arrays([1, 2], [1.5, 6.0], [4.0, 30.0]),                              # mniej linii
+    ]
+    comparison = compare_scenarios(books, dist, base_idx=0, lot_price=LOT_PRICE, spread_multiplier=1.5)
+    attribution = comparison.attribution
+
+    base_revenue = comparison.results[0]["Revenue_USD"].sum()
+    for s, book in enumerate(books):
+        ref, _ = score_order_book(book, dist, LOT_PRICE, 1.5)
+        np.testing.assert_array_equal(attribution.lines[s], ref["OB_Line_Used"])
+        assert attribution.delta[s].sum() == pytest.approx(ref["Revenue_USD"].sum() - base_revenue, abs=0.01 * len(dist))
+
+    spread_total, reassignment_total = attribution.totals()
+    assert spread_total[0] == reassignment_total[0] == 0.0
+    # Te same przypisania linii — cała zmiana to efekt spreadu
+    np.testing.assert_array_equal(attribution.lines[1], attribution.base_lines)
+    assert reassignment_total[1] == 0.0 and spread_total[1] != 0.0
+    # Te same spready linii, inne wielkości ask — cała zmiana to efekt zmiany linii
+    assert spread_total[2] == 0.0 and reassignment_total[2] != 0.0
+
+
+def test_frame_rounds_effects_per_bucket(dist):
+    books = [OrderBook.from_arrays([1, 2], [1.0, 2.0], [2.0, 6.0]), OrderBook.from_arrays([1, 2], [1.5, 2.0], [3.0, 6.0])]
+    frame = compare_scenarios(books, dist, base_idx=0, lot_price=LOT_PRICE).attribution.frame(1)
+
+    assert list(frame.columns) == ["Volume_Bucket", "OB_Line_Base", "OB_Line_Used", "Spread_Effect_USD",
+                                   "Reassignment_Effect_USD", "Delta_USD"]
+    assert frame["Volume_Bucket"].tolist() == dist["volume_range"].tolist()
+    np.testing.assert_allclose(frame["Spread_Effect_USD"] + frame["Reassignment_Effect_USD"], frame["Delta_USD"],
+                               atol=0.011)
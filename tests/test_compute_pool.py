@@ -0,0 +1,100 @@
+from concurrent.futures import Executor, Future
+
+import numpy as np
+import pytest
+
+import compute_pool
+from compute_pool import ComputePool, PoolBusy
+from engine import Distribution, OrderBook, compare_scenarios
+
+MARKET = "Spot XAUUSD"
+LOT_PRICE = 100_000.0
+BOOKS = [OrderBook.from_arrays([1, 2], [1.0, 4.0], [10.0, 30.0]), OrderBook.from_arrays([1, 2], [2.0, 4.0], [12.0, 30.0])]
+
+
+class ManualExecutor(Executor):
+    """Zlecenia czekają, aż test je wykona — stan puli można sprawdzić w trakcie."""
+
+    def __init__(self):
+        self.queue = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.queue.append((future, fn, args))
+        return future
+
+    def run_all(self):
+        while self.queue:
+            future, fn, args = self.queue.pop(0)
+            future.set_result(fn(*args))
+
+
+def distribution(scale: float = 1.0) -> Distribution:
+    ends = np.array([0.5, 1.0, 2.0, 4.0, 8.0])
+    return Distribution(labels=ends.astype(str), bucket_ends=ends, volumes=scale * np.array([10.0, 5.0, 3.0, 2.0, 1.0]))
+
+
+@pytest.fixture
+def pool():
+    pool = ComputePool(ManualExecutor(), max_pending=2, submit_timeout=0.01)
+    yield pool
+    pool.close()
+    compute_pool._detach_stale(frozenset())
+
+
+def refs(pool, market_key=MARKET):
+    return [shared.refs for _, shared in pool._distributions[market_key]]
+
+
+def test_identical_requests_share_one_computation(pool):
+    descriptor = pool.publish(MARKET, "v1", distribution())
+    first = pool.submit(("k",), descriptor, BOOKS, 0, LOT_PRICE, 1.0)
+    assert pool.publish(MARKET, "v1", distribution()) == descriptor
+    second = pool.submit(("k",), descriptor, BOOKS, 0, LOT_PRICE, 1.0)
+
+    assert second is first and pool.coalesced == 1
+    assert pool.queue_depth == 1 and refs(pool) == [1]
+
+    pool.executor.run_all()
+    assert pool.queue_depth == 0 and refs(pool) == [0]
+    expected = compare_scenarios(BOOKS, distribution(), 0, LOT_PRICE)
+    for result, ref in zip(first.result().results, expected.results):
+        assert result.equals(ref)
+
+
+def test_versions_in_use_are_not_evicted(pool):
+    old = pool.publish(MARKET, "v1", distribution())
+    pool.submit(("old",), old, BOOKS, 0, LOT_PRICE, 1.0)
+    for version in ("v2", "v3"):
+        pool.release(pool.publish(MARKET, version, distribution(2.0)))
+
+    # v1 wciąż potrzebne zleceniu w toku — ponad limit GENERATIONS_PER_MARKET zostaje do jego końca
+    assert [fp for fp, _ in pool._distributions[MARKET]] == ["v1", "v3"]
+    pool.executor.run_all()
+    pool.release(pool.publish(MARKET, "v4", distribution(3.0)))
+    assert [fp for fp, _ in pool._distributions[MARKET]] == ["v3", "v4"]
+
+
+def test_full_queue_raises_and_releases_pin(pool):
+    descriptor = pool.publish(MARKET, "v1", distribution())
+    pool.submit(("a",), descriptor, BOOKS, 0, LOT_PRICE, 1.0)
+    pool.publish(MARKET, "v1", distribution())
+    pool.submit(("b",), descriptor, BOOKS, 0, LOT_PRICE, 1.0)
+    pool.publish(MARKET, "v1", distribution())
+
+    with pytest.raises(PoolBusy):
+        pool.submit(("c",), descriptor, BOOKS, 0, LOT_PRICE, 1.0)
+    assert refs(pool) == [2]
+    pool.executor.run_all()
+    assert refs(pool) == [0]
+
+
+def test_workers_detach_blocks_no_longer_published(pool):
+    descriptor = pool.publish(MARKET, "v1", distribution())
+    pool.submit(("k",), descriptor, BOOKS, 0, LOT_PRICE, 1.0)
+    pool.executor.run_all()
+    names = pool._published_names()
+    assert names <= set(compute_pool._attached)
+
+    compute_pool._detach_stale(frozenset())
+    assert not names & set(compute_pool._attached)
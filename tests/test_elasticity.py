@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from engine import OrderBook, assign_lines_batch, elasticity_model, score_batch, score_elastic, stack_order_books
+
+LOT_PRICE = 100_000.0
+ENDS = np.array([0.5, 1.0, 2.0, 4.0, 8.0])
+VOLUMES = np.array([40.0, 20.0, 10.0, 5.0, 2.0])
+REFERENCE = OrderBook.from_arrays([1, 2, 3], [1.0, 2.0, 5.0], [10.0, 20.0, 40.0])
+
+
+def test_respond_scales_volume_by_spread_ratio():
+    model = elasticity_model(REFERENCE, ENDS, VOLUMES, 0.5)
+    reference_spreads = model.reference_spreads
+
+    np.testing.assert_allclose(model.respond(reference_spreads)[0], VOLUMES)
+    np.testing.assert_allclose(model.respond(2 * reference_spreads)[0], VOLUMES * 2 ** -0.5)
+    # Spread 0 (lub brak spreadu referencyjnego) — wolumen bez zmian
+    np.testing.assert_allclose(model.respond(np.zeros(len(ENDS)))[0], VOLUMES)
+
+
+def test_segments_react_with_own_elasticity():
+    segments = np.vstack([VOLUMES, VOLUMES[::-1]])
+    model = elasticity_model(REFERENCE, ENDS, segments, [0.0, 1.0])
+    doubled = model.respond(2 * model.reference_spreads)[0]
+    np.testing.assert_allclose(doubled, segments[0] + segments[1] / 2)
+
+
+def test_score_elastic_without_reaction_matches_score_batch():
+    books = [REFERENCE, OrderBook.from_arrays([1, 2], [0.8, 6.0], [12.0, 30.0])]
+    elastic = score_elastic(books, ENDS, elasticity_model(REFERENCE, ENDS, VOLUMES, 0.0), LOT_PRICE, 1.5)
+    batch = score_batch(books, ENDS, VOLUMES, LOT_PRICE, 1.5)
+
+    assert elastic.iterations == 1 and elastic.converged
+    np.testing.assert_allclose(elastic.batch.revenue, batch.revenue)
+
+
+def test_wider_spreads_lose_volume_and_fixed_point_converges():
+    wide = OrderBook.from_arrays([1, 2, 3], [1.0, 2.0, 5.0], [20.0, 40.0, 80.0])
+    model = elasticity_model(REFERENCE, ENDS, VOLUMES, 1.5)
+    direct = score_elastic([REFERENCE, wide], ENDS, model, LOT_PRICE)
+    # Elastyczność > 1: dwukrotnie szerszy spread daje mniejszy przychód niż referencja
+    assert direct.batch.volume[1] < direct.batch.volume[0]
+    assert direct.batch.revenue[1] < direct.batch.revenue[0]
+
+    # Przypisanie niezależne od wolumenu — iteracja dochodzi do rozwiązania wprost
+    def assign(books, bucket_ends, volumes):
+        return assign_lines_batch(books, bucket_ends)
+
+    iterated = score_elastic(stack_order_books([REFERENCE, wide]), ENDS, model, LOT_PRICE, assign=assign)
+    assert iterated.converged and iterated.iterations == 2
+    np.testing.assert_allclose(iterated.batch.revenue, direct.batch.revenue)
+
+    stopped = score_elastic([REFERENCE, wide], ENDS, model, LOT_PRICE, assign=assign, max_iter=1)
+    assert not stopped.converged and stopped.iterations == 1
+    assert stopped.batch.revenue == pytest.approx(direct.batch.revenue)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import reference
+from engine import OrderBook, score_batch
+
+LOT_PRICE = 100_000.0
+
+
+def random_case(seed: int, n_books: int = 6, n_buckets: int = 400, n_lines: int = 8):
+    rng = np.random.default_rng(seed)
+    width = 0.1
+    ends = np.round(width * np.arange(1, n_buckets + 1), 1)
+    volumes = np.round(rng.gamma(1.0, 50.0, n_buckets), 2)
+    books = [
+        OrderBook.from_arrays(np.arange(1, n_lines + 1), np.round(rng.uniform(0.5, 8.0, n_lines), 1),
+                              np.round(np.sort(rng.uniform(5.0, 200.0, n_lines)), 1))
+        for _ in range(n_books)
+    ]
+    dist = pd.DataFrame({
+        "volume_range": [f"{e - width:.1f} - {e:.1f}" for e in ends],
+        "filled_volume": volumes,
+    })
+    return books, ends, volumes, dist
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("spread_multiplier", [1.0, 1.5])
+def test_score_batch_matches_loop_reference(seed, spread_multiplier):
+    books, ends, volumes, dist = random_case(seed)
+    batch = score_batch(books, ends, volumes, LOT_PRICE, spread_multiplier)
+
+    for s, book in enumerate(books):
+        ref = reference.calculate_per_bucket_revenue(book.frame(), dist, LOT_PRICE, spread_multiplier)
+        np.testing.assert_array_equal(batch.line_idx[s] + 1, ref["OB_Line_Used"].to_numpy())
+        np.testing.assert_allclose(batch.spreads[s], ref["Assigned_Spread"].to_numpy())
+        # Referencja zaokrągla przychód każdego bucketu do centa
+        assert batch.revenue[s] == pytest.approx(ref["Revenue_USD"].sum(), abs=0.005 * len(dist))
+        assert batch.turnover[s] == pytest.approx(ref["Turnover_USD"].sum())
+
+        ref_fill = reference.calculate_fill_rate_per_line(ref, book.frame(), LOT_PRICE)
+        np.testing.assert_array_equal(batch.line_count[s], ref_fill["Fill Count"].to_numpy())
+
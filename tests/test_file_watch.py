@@ -0,0 +1,63 @@
+import os
+
+from file_watch import FileFingerprints, FileWatcher
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_identity_follows_content_not_timestamps(tmp_path):
+    path = tmp_path / "dist.csv"
+    fingerprints = FileFingerprints()
+    assert fingerprints.identity(str(path)) is None
+
+    write(path, "volume_range,filled_volume\n0.0 - 0.1,1.0\n", mtime_ns=1_000_000_000)
+    first = fingerprints.identity(str(path))
+    assert first.startswith(f"{path.stat().st_size}:")
+
+    # Ta sama treść z nową datą (touch, kopia) — bez zmiany tożsamości
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert fingerprints.identity(str(path)) == first
+
+    # Inna treść tej samej długości, ze starą datą — skrót liczony ponownie, bo zmienił się mtime
+    write(path, "volume_range,filled_volume\n0.0 - 0.1,2.0\n", mtime_ns=1_000_000_000)
+    assert fingerprints.identity(str(path)) != first
+
+
+def test_watcher_reports_only_changed_groups(tmp_path):
+    spot, futures, spot_periods = (tmp_path / name for name in ("spot.csv", "futures.csv", "spot_periods.csv"))
+    write(spot, "a")
+    write(futures, "b")
+    changed = []
+    watcher = FileWatcher({"Spot": [str(spot), str(spot_periods)], "Futures": [str(futures)]}, changed.append,
+                          FileFingerprints(), interval=60)
+
+    assert watcher.poll() == []
+    write(spot, "a", mtime_ns=5_000_000_000)
+    assert watcher.poll() == []
+
+    # Nowy opcjonalny plik grupy też jest zmianą
+    write(spot_periods, "period,volume_range,filled_volume\n")
+    assert watcher.poll() == ["Spot"] and changed == ["Spot"]
+
+    write(futures, "bb")
+    assert watcher.poll() == ["Futures"]
+    assert changed == ["Spot", "Futures"] and watcher.changes == {"Spot": 1, "Futures": 1}
+
+
+def test_watcher_keeps_running_after_callback_error(tmp_path):
+    path = tmp_path / "spot.csv"
+    write(path, "a")
+
+    def fail(group):
+        raise RuntimeError("cache busy")
+
+    watcher = FileWatcher({"Spot": [str(path)]}, fail, FileFingerprints(), interval=60)
+    write(path, "ab")
+    assert watcher.poll() == ["Spot"]
+    assert watcher.errors == [("Spot", "cache busy")]
+    # Zmiana jest zapamiętana — kolejne sprawdzenie nie zgłasza jej ponownie
+    assert watcher.poll() == []
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from engine import OrderBook, pareto_front
+from frontier import base_frontier, frontier_spec, frontier_tasks, merge_frontiers, score_ladders
+
+LOT_PRICE = 100_000.0
+
+
+@pytest.fixture
+def spec():
+    ends = np.round(0.5 * np.arange(1, 61), 1)
+    volumes = np.round(np.random.default_rng(2).gamma(1.0, 30.0, len(ends)), 2)
+    base = OrderBook.from_arrays([1, 2, 3, 4, 5], [1.0, 2.0, 4.0, 8.0, 15.0], [2.0, 5.0, 9.0, 14.0, 25.0])
+    return frontier_spec(base, ends, volumes, LOT_PRICE)
+
+
+def run_tasks(tasks):
+    return [func(*args) for func, args in tasks]
+
+
+def test_pareto_front_keeps_only_non_dominated_points():
+    revenue = np.array([10.0, 12.0, 9.0, 12.0, 15.0, 14.0])
+    cost = np.array([1.0, 2.0, 2.0, 3.0, 4.0, 4.0])
+    assert pareto_front(revenue, cost).tolist() == [0, 1, 4]
+
+
+def test_front_is_non_dominated_and_covers_base(spec):
+    tasks = frontier_tasks(spec, n_candidates=1_200, batch_size=500)
+    assert [args[1] for _, args in tasks[1:]] == [500, 500, 200]
+    front = merge_frontiers(run_tasks(tasks))
+
+    assert front.evaluated == 1_200
+    assert np.all(np.diff(front.top_spread) > 0) and np.all(np.diff(front.revenue) > 0)
+    # Przychód i spread punktów frontu odpowiadają ich drabinom
+    revenue, top = score_ladders(spec, front.asks, front.spreads)
+    np.testing.assert_allclose(revenue, front.revenue)
+    np.testing.assert_allclose(top, front.top_spread)
+
+    # Bazowy Order Book jest na froncie albo zdominowany przez jego punkt
+    base = base_frontier(spec)
+    dominating = (front.top_spread <= base.top_spread[0]) & (front.revenue >= base.revenue[0])
+    assert dominating.any()
+
+
+def test_partial_merge_and_determinism(spec):
+    tasks = frontier_tasks(spec, n_candidates=1_000, batch_size=250, seed=7)
+    results = run_tasks(tasks)
+
+    assert merge_frontiers([]) is None and merge_frontiers([None, None]) is None
+    partial = merge_frontiers([results[0], None, results[2]])
+    assert partial.evaluated == 250
+
+    # Stałe ziarna — powtórzony sweep daje ten sam front, niezależnie od kolejności paczek
+    again = merge_frontiers(run_tasks(frontier_tasks(spec, n_candidates=1_000, batch_size=250, seed=7))[::-1])
+    full = merge_frontiers(results)
+    np.testing.assert_array_equal(again.revenue, full.revenue)
+    np.testing.assert_array_equal(again.asks, full.asks)
+
+
+def test_fingerprint_tracks_inputs(spec):
+    base = OrderBook.from_arrays([1, 2, 3, 4, 5], spec.base_ask, spec.base_spread)
+    same = frontier_spec(base, spec.bucket_ends, spec.volumes, LOT_PRICE)
+    assert same.fingerprint == spec.fingerprint
+    assert frontier_spec(base, spec.bucket_ends, spec.volumes * 2, LOT_PRICE).fingerprint != spec.fingerprint
+    assert frontier_spec(base, spec.bucket_ends, spec.volumes, LOT_PRICE,
+                         spread_range=(0.8, 1.2)).fingerprint != spec.fingerprint
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import clean_csv
+from clean_csv import (accumulate_chunk, bucket_indices, format_bucket_label, ingest_file, ingest_fills,
+                       read_clean_csv, write_period_distribution)
+
+
+def write_fills(path, sizes, sep=","):
+    pd.DataFrame({"volume": sizes}).to_csv(path, sep=sep, index=False)
+    return str(path)
+
+
+def test_bucket_indices_put_boundaries_in_lower_bucket():
+    # (k*w, (k+1)*w] — 0.3 to koniec bucketu '0.2 - 0.3', mimo że 0.3 / 0.1 = 2.9999999999999996
+    assert bucket_indices([0.05, 0.1, 0.3, 0.30001, 1.0], 0.1).tolist() == [0, 0, 2, 3, 9]
+
+
+def test_chunked_ingest_matches_single_pass(tmp_path):
+    sizes = np.round(np.random.default_rng(0).lognormal(-0.5, 1.0, 5_000), 2)
+    path = write_fills(tmp_path / "fills.csv", np.concatenate([sizes, [np.nan, -1.0, 0.0]]), sep=";")
+
+    single = accumulate_chunk(np.zeros(0), sizes, 0.1)
+    chunked = ingest_file(path, bucket_width=0.1, chunksize=333)
+    np.testing.assert_allclose(chunked, single)
+    assert chunked.sum() == pytest.approx(sizes.sum())
+
+
+def test_oversized_trades_go_to_last_bucket(tmp_path, monkeypatch):
+    sizes = [0.5, 1.5, 7.0, 1e9]
+    capped = accumulate_chunk(np.zeros(0), sizes, 1.0, max_size=3.0)
+    assert capped.tolist() == [0.5, 1.5, 7.0 + 1e9]
+
+    # Bez max_size akumulator ma najwyżej DEFAULT_MAX_BUCKETS bucketów
+    monkeypatch.setattr(clean_csv, "DEFAULT_MAX_BUCKETS", 5)
+    default = accumulate_chunk(np.zeros(0), sizes, 1.0)
+    assert default.tolist() == [0.5, 1.5, 0.0, 0.0, 7.0 + 1e9]
+
+
+def test_ingest_fills_merges_files_into_loadable_distribution(tmp_path):
+    a = write_fills(tmp_path / "a.csv", [0.05, 0.25, 0.3])
+    b = write_fills(tmp_path / "b.csv", [0.15, 0.3])
+    output = tmp_path / "dist.csv"
+    acc = ingest_fills([a, b], str(output), bucket_width=0.1, workers=1)
+
+    df = read_clean_csv(str(output))
+    assert list(df["volume_range"]) == ["0.0 - 0.1", "0.1 - 0.2", "0.2 - 0.3"]
+    np.testing.assert_allclose(df["filled_volume"], [0.05, 0.15, 0.85])
+    np.testing.assert_allclose(acc, df["filled_volume"])
+
+    with pytest.raises(ValueError):
+        ingest_fills([a], str(output), bucket_width=0)
+
+
+def test_period_writer_pads_periods_to_common_buckets(tmp_path):
+    period_accs = {"2026-01-01": np.array([1.0, 0.0, 2.5]), "2026-01-02": np.array([0.1234567])}
+    output = tmp_path / "periods.csv"
+    write_period_distribution(period_accs, str(output), 0.25, sep=";")
+
+    with open(output, encoding="utf-8-sig") as f:
+        lines = f.read().splitlines()
+    expected = ["period;volume_range;filled_volume"] + [
+        f"{label};{format_bucket_label(k, 0.25)};{round(float(acc[k]) if k < acc.size else 0.0, 6)}"
+        for label, acc in period_accs.items() for k in range(3)
+    ]
+    assert lines == expected
+    assert lines[1:3] == ["2026-01-01;0.00 - 0.25;1.0", "2026-01-01;0.25 - 0.50;0.0"]
+    assert lines[4] == "2026-01-02;0.00 - 0.25;0.123457"
+
+    write_period_distribution({}, str(output), 0.25)
+    with open(output, encoding="utf-8-sig") as f:
+        assert f.read() == "period,volume_range,filled_volume\n"
@@ -0,0 +1,132 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from jobs import CANCELLED, DONE, FAILED, JobRunner, JobSubscription
+from result_cache import ResultCache
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def blocking(gate: threading.Event, x: int) -> int:
+    gate.wait(5)
+    return x
+
+
+def failing(x: int) -> int:
+    raise ValueError(f"zła paczka {x}")
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_job_reduces_chunks_and_fills_cache(executor):
+    cache = ResultCache()
+    runner = JobRunner(executor, cache)
+    job = runner.submit("squares", [(square, (i,)) for i in range(10)], reduce=sum)
+    assert job.wait(5)
+    assert job.status == DONE and job.result == sum(i * i for i in range(10))
+    assert job.progress == 1.0
+
+    cached = runner.submit("squares", [(failing, (0,))], reduce=sum)
+    assert cached.finished and cached.status == DONE and cached.result == job.result
+
+
+def test_identical_jobs_are_deduplicated(executor):
+    gate = threading.Event()
+    runner = JobRunner(executor, max_in_flight=1)
+    first = runner.submit("same", [(blocking, (gate, i)) for i in range(3)])
+    second = runner.submit("same", [(blocking, (gate, i)) for i in range(3)])
+    assert second is first and first.subscribers == 2
+
+    gate.set()
+    assert first.wait(5)
+    assert first.result == [0, 1, 2]
+
+
+def test_last_release_cancels_job(executor):
+    gate = threading.Event()
+    runner = JobRunner(executor, max_in_flight=1)
+    job = runner.submit("slow", [(blocking, (gate, i)) for i in range(20)])
+    runner.submit("slow", [])
+    runner.release(job)
+    assert not job.cancelled
+
+    runner.release(job)
+    gate.set()
+    assert job.wait(5)
+    assert job.status == CANCELLED and job.completed < job.total
+    assert runner.active == 0
+
+
+def test_failed_chunk_fails_job(executor):
+    runner = JobRunner(executor)
+    job = runner.submit("broken", [(square, (1,)), (failing, (2,))])
+    assert job.wait(5)
+    assert job.status == FAILED and "zła paczka 2" in job.error
+
+
+def test_cancel_in_one_session_keeps_shared_job_running(executor):
+    gate = threading.Event()
+    runner = JobRunner(executor, max_in_flight=1)
+    tasks = [(blocking, (gate, i)) for i in range(3)]
+    first, second = JobSubscription(runner), JobSubscription(runner)
+    job = first.start("shared", tasks)
+    assert second.start("shared", tasks) is job and job.subscribers == 2
+
+    first.cancel()
+    first.cancel()   # ponowne kliknięcie „Anuluj” nie zwalnia subskrypcji drugiej sesji
+    assert first.job is None and not job.cancelled and job.subscribers == 1
+
+    gate.set()
+    assert job.wait(5)
+    assert job.status == DONE and second.job is job
+
+
+def test_starting_twice_keeps_one_subscription(executor):
+    gate = threading.Event()
+    runner = JobRunner(executor, max_in_flight=1)
+    tasks = [(blocking, (gate, i)) for i in range(20)]
+    session = JobSubscription(runner)
+    job = session.start("key", tasks)
+    assert session.start("key", tasks) is job and job.subscribers == 1
+
+    # Zmiana klucza (edycja Order Booka) zwalnia jedyną subskrypcję — zadanie jest anulowane
+    assert session.follow("other-key") is None
+    gate.set()
+    assert job.wait(5)
+    assert job.status == CANCELLED
+
+
+def test_start_after_finish_submits_again(executor):
+    runner = JobRunner(executor)
+    session = JobSubscription(runner)
+    job = session.start("squares", [(square, (2,))], reduce=sum)
+    assert job.wait(5) and job.result == 4
+    again = session.start("squares", [(square, (3,))], reduce=sum)
+    assert again is not job and again.wait(5) and again.result == 9
+
+
+def test_partial_results_and_released_subscription_of_dropped_session(executor):
+    import gc
+
+    gate = threading.Event()
+    runner = JobRunner(executor, max_in_flight=1)
+    session = JobSubscription(runner)
+    job = session.start("slow", [(square, (3,))] + [(blocking, (gate, i)) for i in range(20)])
+    while not job.partial:
+        job.wait(0.01)
+    assert job.partial[0] == 9
+
+    # Sesja znika bez kliknięcia „Anuluj” — jej subskrypcja jest zwalniana
+    del session
+    gc.collect()
+    gate.set()
+    assert job.wait(5)
+    assert job.status == CANCELLED
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from live import FillTail, LiveDistribution
+
+ENDS = np.array([0.1, 0.5, 1.0, 2.0, 5.0, 10.0])
+SPREADS_A = np.array([10.0, 12.0, 15.0, 20.0, 30.0, 50.0])
+SPREADS_B = np.array([9.0, 11.0, 16.0, 22.0, 35.0, 60.0])
+
+
+def full_recompute(sizes: np.ndarray, spreads: np.ndarray, spread_multiplier: float) -> tuple[np.ndarray, float]:
+    idx = np.minimum(np.searchsorted(ENDS, sizes, side="left"), len(ENDS) - 1)
+    volumes = np.bincount(idx, weights=sizes, minlength=len(ENDS))
+    return volumes, float(volumes @ spreads) * spread_multiplier / 2
+
+
+def test_incremental_updates_match_full_recompute():
+    rng = np.random.default_rng(0)
+    live = LiveDistribution(ENDS, lot_price=100_000.0, spread_multiplier=1.5)
+    live.set_scenario("A", SPREADS_A, "a")
+    live.set_scenario("B", SPREADS_B, "b")
+
+    seen = np.empty(0)
+    for _ in range(20):
+        sizes = np.round(rng.lognormal(-0.5, 1.2, rng.integers(0, 50)), 2)
+        live.apply(sizes)
+        seen = np.concatenate([seen, sizes])
+
+        volumes, revenue_a = full_recompute(seen, SPREADS_A, 1.5)
+        np.testing.assert_allclose(live.volumes, volumes)
+        assert live.revenue["A"] == pytest.approx(revenue_a)
+        assert live.revenue["B"] == pytest.approx(full_recompute(seen, SPREADS_B, 1.5)[1])
+    assert live.fill_count == len(seen)
+
+
+def test_scenario_and_pricing_changes_recompute_totals():
+    sizes = np.array([0.05, 0.3, 0.3, 1.5, 7.0, 25.0])
+    live = LiveDistribution(ENDS, lot_price=100_000.0)
+    live.set_scenario("A", SPREADS_A, "a")
+    live.apply(sizes)
+
+    # Ten sam odcisk — spready nie są podmieniane
+    live.set_scenario("A", SPREADS_B, "a")
+    assert live.revenue["A"] == pytest.approx(full_recompute(sizes, SPREADS_A, 1.0)[1])
+
+    live.set_scenario("A", SPREADS_B, "a2")
+    assert live.revenue["A"] == pytest.approx(full_recompute(sizes, SPREADS_B, 1.0)[1])
+
+    live.set_pricing(50_000.0, 2.0)
+    assert live.revenue["A"] == pytest.approx(full_recompute(sizes, SPREADS_B, 2.0)[1])
+    assert live.turnover == pytest.approx(sizes.sum() * 50_000.0)
+
+
+def test_fill_tail_reads_only_appended_rows(tmp_path):
+    path = tmp_path / "fills.csv"
+    path.write_text("volume\n0.5\n1.5\n")
+    tail = FillTail(str(path))
+    np.testing.assert_allclose(tail.poll(), [0.5, 1.5])
+    assert tail.poll().size == 0
+
+    with open(path, "a") as f:
+        f.write("2.0\n3.")
+    np.testing.assert_allclose(tail.poll(), [2.0])   # niedokończony wiersz czeka na resztę
+    with open(path, "a") as f:
+        f.write("5\n")
+    np.testing.assert_allclose(tail.poll(), [3.5])
+
+
+def test_fill_tail_restarts_on_rotated_file_larger_than_offset(tmp_path):
+    path = tmp_path / "fills.csv"
+    path.write_text("volume\n0.5\n")
+    tail = FillTail(str(path))
+    np.testing.assert_allclose(tail.poll(), [0.5])
+
+    # Rotacja: nowy plik (nowy i-węzeł) już dłuższy niż zapamiętana pozycja
+    rotated = tmp_path / "fills.new"
+    rotated.write_text("volume\n1.0\n2.0\n3.0\n4.0\n")
+    rotated.replace(path)
+    np.testing.assert_allclose(tail.poll(), [1.0, 2.0, 3.0, 4.0])
+    assert tail.restarted
+    assert tail.poll().size == 0 and not tail.restarted
+
+
+def test_fill_tail_restarts_when_rewritten_in_place(tmp_path):
+    path = tmp_path / "fills.csv"
+    path.write_text("volume\n0.5\n")
+    tail = FillTail(str(path))
+    tail.poll()
+
+    with open(path, "w") as f:   # ten sam i-węzeł, inna zawartość od początku
+        f.write("volume\n7.0\n8.0\n9.0\n")
+    np.testing.assert_allclose(tail.poll(), [7.0, 8.0, 9.0])
+    assert tail.restarted
+
+
+def test_unsorted_bucket_ends_keep_caller_order():
+    order = np.array([3, 0, 5, 1, 4, 2])
+    live = LiveDistribution(ENDS[order], lot_price=100_000.0)
+    live.set_scenario("A", SPREADS_A[order], "a")
+    sizes = np.array([0.05, 0.3, 0.3, 1.5, 7.0, 25.0, 0.7])
+    live.apply(sizes)
+
+    volumes, revenue = full_recompute(sizes, SPREADS_A, 1.0)
+    np.testing.assert_allclose(live.volumes, volumes[order])
+    assert live.revenue["A"] == pytest.approx(revenue)
+
+
+def test_reset_clears_flow_but_keeps_scenarios():
+    live = LiveDistribution(ENDS, lot_price=100_000.0)
+    live.set_scenario("A", SPREADS_A, "a")
+    live.apply(np.array([0.3, 2.0]))
+    live.reset()
+    assert live.total_volume == 0 and live.fill_count == 0 and live.revenue == {"A": 0.0}
+
+    live.apply(np.array([0.3]))
+    assert live.revenue["A"] == pytest.approx(full_recompute(np.array([0.3]), SPREADS_A, 1.0)[1])
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from engine import (OrderBook, batch_chunks, elasticity_model, float32_error_bound, score_batch, score_batch_reduced,
+                    score_elastic, score_elastic_reduced)
+
+LOT_PRICE = 100_000.0
+
+
+def random_books(seed: int, n_books: int = 20, n_buckets: int = 2_000, n_lines: int = 8):
+    rng = np.random.default_rng(seed)
+    ends = np.round(0.1 * np.arange(1, n_buckets + 1), 1)
+    volumes = np.round(rng.gamma(1.0, 50.0, n_buckets), 2)
+    books = [
+        OrderBook.from_arrays(np.arange(1, n_lines + 1), np.round(rng.uniform(0.5, 8.0, n_lines), 1),
+                              np.round(np.sort(rng.uniform(5.0, 200.0, n_lines)), 1))
+        for _ in range(n_books)
+    ]
+    return books, ends, volumes
+
+
+@pytest.mark.parametrize("memory_budget_mb", [256.0, 0.01])
+def test_score_batch_reduced_matches_score_batch(memory_budget_mb):
+    books, ends, volumes = random_books(3)
+    full = score_batch(books, ends, volumes, LOT_PRICE)
+    reduced = score_batch_reduced(books, ends, volumes, LOT_PRICE, memory_budget_mb=memory_budget_mb)
+
+    np.testing.assert_allclose(reduced.revenue, full.revenue, rtol=1e-12)
+    np.testing.assert_allclose(reduced.line_volume, full.line_volume, rtol=1e-12, atol=1e-9)
+    np.testing.assert_array_equal(reduced.line_count, full.line_count)
+
+
+@pytest.mark.parametrize("memory_budget_mb", [256.0, 0.01])
+def test_score_elastic_reduced_matches_score_elastic(memory_budget_mb):
+    books, ends, volumes = random_books(4)
+    model = elasticity_model(books[0], ends, volumes, 0.8)
+    full = score_elastic(books, ends, model, LOT_PRICE).batch
+    reduced = score_elastic_reduced(books, ends, model, LOT_PRICE, memory_budget_mb=memory_budget_mb)
+
+    np.testing.assert_allclose(reduced.revenue, full.revenue, rtol=1e-12)
+    np.testing.assert_allclose(reduced.turnover, full.turnover, rtol=1e-12)
+    np.testing.assert_array_equal(reduced.line_count, full.line_count)
+
+
+def test_float32_stays_within_error_bound():
+    books, ends, volumes = random_books(5)
+    full = score_batch(books, ends, volumes, LOT_PRICE)
+    reduced = score_batch_reduced(books, ends, volumes, LOT_PRICE, dtype=np.float32)
+
+    relative = np.abs(reduced.revenue - full.revenue) / full.revenue
+    assert relative.max() <= float32_error_bound(len(ends))
+
+
+def test_batch_chunks_fit_budget():
+    book_step, bucket_step = batch_chunks(1_000, 50_000, 8, memory_budget_mb=1.0)
+    assert bucket_step == 50_000 or book_step == 1
+    cell_bytes = 8 + 3 * 8 + 3 * 8
+    assert book_step * bucket_step * cell_bytes <= 1024 ** 2
+
+    # Nawet jeden scenariusz się nie mieści — dzielone są buckety
+    assert batch_chunks(10, 10_000_000, 8, memory_budget_mb=1.0)[0] == 1
+    assert batch_chunks(10, 100, 8, memory_budget_mb=256.0) == (10, 100)
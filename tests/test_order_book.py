@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import InvalidOrderBook, OrderBook, as_order_book
+
+
+def editor_frame(**columns) -> pd.DataFrame:
+    frame = {"OB Line": [1, 2, 3], "Bid Size": [1.0, 2.0, 3.0], "Ask Size": [1.0, 2.5, 4.0], "Spread": [10.0, 20.0, 35.0]}
+    frame.update(columns)
+    return pd.DataFrame(frame)
+
+
+@pytest.mark.parametrize("columns, message", [
+    ({"Ask Size": [1.0, None, 4.0]}, "Kolumna 'Ask Size' zawiera puste wartości."),
+    ({"Ask Size": [1.0, 0.0, 4.0]}, "Wartości 'Ask Size' muszą być większe od zera."),
+    ({"Spread": [10.0, None, 35.0]}, "Kolumna 'Spread' zawiera puste wartości."),
+    ({"Spread": [10.0, -1.0, 35.0]}, "Wartości 'Spread' muszą być większe od zera."),
+])
+def test_invalid_order_books_are_rejected(columns, message):
+    with pytest.raises(InvalidOrderBook) as excinfo:
+        OrderBook.from_frame(editor_frame(**columns))
+    assert excinfo.value.errors == [message]
+    assert isinstance(excinfo.value, ValueError)
+
+
+def test_missing_column_and_collected_errors():
+    with pytest.raises(InvalidOrderBook) as excinfo:
+        OrderBook.from_frame(editor_frame().drop(columns="Spread"))
+    assert excinfo.value.errors == ["Brak kolumny: Spread"]
+
+    with pytest.raises(InvalidOrderBook) as excinfo:
+        OrderBook.from_frame(editor_frame(**{"Ask Size": [1.0, -2.0, 4.0], "Spread": [None, 20.0, 35.0]}))
+    assert len(excinfo.value.errors) == 2
+    assert str(excinfo.value) == "; ".join(excinfo.value.errors)
+
+    # Bez walidacji (benchmarki, tabele silnika) tabela jest przyjmowana jak dotąd
+    assert len(OrderBook.from_frame(editor_frame(**{"Spread": [10.0, -1.0, 35.0]}), validate=False)) == 3
+
+
+def test_order_book_is_immutable_and_compared_by_fingerprint():
+    book = OrderBook.from_frame(editor_frame())
+    np.testing.assert_array_equal(book.cum_ask, [1.0, 3.5, 7.5])
+    with pytest.raises(ValueError):
+        book.spread[0] = 1.0
+
+    # Bid Size nie wpływa na przychód, więc nie zmienia odcisku
+    same = OrderBook.from_frame(editor_frame(**{"Bid Size": [5.0, 5.0, 5.0]}))
+    assert same == book and hash(same) == hash(book)
+    assert OrderBook.from_frame(editor_frame(**{"Spread": [10.0, 20.0, 36.0]})) != book
+    assert as_order_book(book) is book
+    assert book.frame().equals(editor_frame())
+
+
+def test_missing_line_numbers_follow_row_order():
+    book = OrderBook.from_frame(editor_frame(**{"OB Line": [1, 2, None]}))
+    assert book.lines.tolist() == [1, 2, 3]
+    assert OrderBook.from_frame(editor_frame().drop(columns="OB Line")).lines.tolist() == [1, 2, 3]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import clean_csv
+from clean_csv import accumulate_chunk, ingest_file_periods, ingest_fills
+from engine import OrderBook, panel_from_long, score_order_book, score_panel
+
+LOT_PRICE = 100_000.0
+
+
+def timed_fills(path, n: int = 3_000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp("2026-01-01") + pd.to_timedelta(np.sort(rng.uniform(0, 72 * 3600, n)), unit="s")
+    sizes = np.round(rng.lognormal(-0.5, 1.0, n), 2)
+    pd.DataFrame({"time": times, "volume": sizes}).to_csv(path, index=False)
+    return str(path), times, sizes
+
+
+@pytest.mark.parametrize("dense_cells", [clean_csv.DENSE_PERIOD_CELLS, 1])
+def test_period_accumulators_match_per_period_ingest(tmp_path, monkeypatch, dense_cells):
+    monkeypatch.setattr(clean_csv, "DENSE_PERIOD_CELLS", dense_cells)
+    path, times, sizes = timed_fills(tmp_path / "fills.csv")
+    accs = ingest_file_periods(path, "hour", bucket_width=0.1, chunksize=500)
+
+    hours = times.strftime("%Y-%m-%d %H:00").to_numpy()
+    assert list(accs) == sorted(set(hours))
+    for label, acc in accs.items():
+        expected = accumulate_chunk(np.zeros(0), sizes[hours == label], 0.1)
+        np.testing.assert_allclose(acc, expected)
+
+
+def test_period_file_loads_as_panel_with_same_totals(tmp_path):
+    path, _, sizes = timed_fills(tmp_path / "fills.csv")
+    output = tmp_path / "fills_periods.csv"
+    ingest_fills([path], str(output), bucket_width=0.1, period="day", workers=1)
+
+    panel = panel_from_long(pd.read_csv(output, encoding="utf-8-sig"), "period")
+    assert panel.keys.tolist() == ["2026-01-01", "2026-01-02", "2026-01-03"]
+    assert panel.volumes.sum() == pytest.approx(sizes.sum())
+    # Wolumeny w pliku są zaokrąglone do 6 miejsc
+    np.testing.assert_allclose(panel.volumes.sum(axis=0), accumulate_chunk(np.zeros(0), sizes, 0.1), atol=1e-5)
+
+
+def test_score_panel_matches_per_period_scoring():
+    ends = np.array([0.5, 1.0, 2.0, 4.0, 8.0])
+    long = pd.DataFrame({
+        "period": np.repeat(["d2", "d1", "d3"], len(ends)),
+        "volume_range": np.tile([f"{lo} - {hi}" for lo, hi in zip([0.0, *ends[:-1]], ends)], 3),
+        "filled_volume": np.arange(15, dtype=float),
+    })
+    panel = panel_from_long(long, "period")
+    book = OrderBook.from_arrays([1, 2, 3], [1.0, 2.0, 5.0], [10.0, 20.0, 40.0])
+    scores = score_panel(book, panel, LOT_PRICE, spread_multiplier=1.5)
+
+    assert scores["Key"].tolist() == ["d1", "d2", "d3"]
+    for key, row in scores.set_index("Key").iterrows():
+        dist = long[long["period"] == key].drop(columns="period")
+        ref, _ = score_order_book(book, dist, LOT_PRICE, 1.5)
+        assert row["Revenue_USD"] == pytest.approx(ref["Revenue_USD"].sum(), abs=0.01)
+        assert row["Turnover_USD"] == pytest.approx(ref["Turnover_USD"].sum())
+    total, _ = score_order_book(book, panel.total(), LOT_PRICE, 1.5)
+    assert scores["Revenue_USD"].sum() == pytest.approx(total["Revenue_USD"].sum(), abs=0.05)
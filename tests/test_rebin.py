@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from engine import (PanelDistribution, bucket_labels, cumulative_distribution, prepare_distribution, rebin_distribution,
+                    rebin_panel, resolution_edges)
+
+
+def brute_force_rebin(ends: np.ndarray, volumes: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Każdy oryginalny bucket do pierwszej nowej granicy >= jego końca."""
+    result = np.zeros(volumes.shape[:-1] + (len(edges),))
+    for b, end in enumerate(ends):
+        result[..., np.searchsorted(edges, end, side="left")] += volumes[..., b]
+    return result
+
+
+@pytest.fixture
+def fine():
+    ends = np.round(0.1 * np.arange(1, 201), 1)
+    volumes = np.round(np.random.default_rng(3).gamma(1.0, 20.0, len(ends)), 2)
+    return ends, volumes
+
+
+@pytest.mark.parametrize("step", [0.5, 1.0, 3.0])
+def test_rebin_preserves_totals_and_assignment(fine, step):
+    ends, volumes = fine
+    cumulative = cumulative_distribution(ends, volumes)
+    edges, rebinned = cumulative.rebin(resolution_edges(cumulative.max_end, step))
+
+    assert edges[-1] >= ends[-1] and edges[-2] < ends[-1]
+    assert rebinned.sum() == pytest.approx(volumes.sum())
+    np.testing.assert_allclose(rebinned, brute_force_rebin(ends, volumes, edges), atol=1e-9)
+
+
+def test_rebin_custom_edges(fine):
+    ends, volumes = fine
+    cumulative = cumulative_distribution(ends[::-1], volumes[::-1])   # kolejność wierszy pliku bez znaczenia
+
+    # Granice za krótkie — dopisany koniec ostatniego bucketu; nieposortowane i powtórzone — porządkowane
+    edges, rebinned = cumulative.rebin([5, 1, 2, 1])
+    assert edges.tolist() == [1.0, 2.0, 5.0, 20.0]
+    np.testing.assert_allclose(rebinned, brute_force_rebin(ends, volumes, edges), atol=1e-9)
+
+    # Granice dalej niż pierwsza obejmująca rozkład są pomijane
+    edges, rebinned = cumulative.rebin([10, 25, 50])
+    assert edges.tolist() == [10.0, 25.0]
+    assert rebinned.sum() == pytest.approx(volumes.sum())
+
+
+def test_rebin_distribution_loads_like_a_file(fine):
+    ends, volumes = fine
+    frame = rebin_distribution(cumulative_distribution(ends, volumes), resolution_edges(20.0, 0.5))
+    assert frame["volume_range"].iloc[:2].tolist() == ["0.0 - 0.5", "0.5 - 1.0"]
+
+    dist = prepare_distribution(frame)
+    np.testing.assert_allclose(dist.bucket_ends, resolution_edges(20.0, 0.5))
+    assert dist.volumes.sum() == pytest.approx(volumes.sum())
+    # 0.1 · 3 zaokrąglone do 0.3 — koniec bucketu '0.2 - 0.3'
+    assert resolution_edges(0.3, 0.1).tolist() == [0.1, 0.2, 0.3]
+
+
+def test_rebin_panel_preserves_row_totals(fine):
+    ends, volumes = fine
+    matrix = np.vstack([volumes, volumes[::-1], np.zeros_like(volumes)])
+    panel = PanelDistribution(keys=np.array(["d1", "d2", "d3"]), labels=bucket_labels(ends), bucket_ends=ends,
+                              volumes=matrix)
+    coarse = rebin_panel(panel, resolution_edges(20.0, 1.0))
+
+    assert coarse.keys.tolist() == ["d1", "d2", "d3"]
+    assert len(coarse.labels) == len(coarse.bucket_ends) == coarse.volumes.shape[1] == 20
+    np.testing.assert_allclose(coarse.volumes.sum(axis=1), matrix.sum(axis=1))
+    np.testing.assert_allclose(coarse.volumes, brute_force_rebin(ends, matrix, coarse.bucket_ends), atol=1e-9)
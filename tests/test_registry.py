@@ -0,0 +1,61 @@
+from registry import distribution_files, load_registry
+
+CONFIG = """
+[EURUSD]
+lot_price = 100_000.0
+
+[EURUSD.markets.Spot]
+distribution = "missing/eurusd_distribution.csv"
+order_book_a = { ask_sizes = [1.0, 5.0], spreads = [2.0, 4.0] }
+
+[XAUUSD]
+lot_price         = 500_000.0
+spread_multiplier = 2.5
+
+[XAUUSD.markets.Futures]
+distribution = "futures.csv"
+order_book_a = { bid_sizes = [1.0, 6.0], ask_sizes = [1.0, 7.0], spreads = [31.0, 42.0] }
+order_book_b = { ask_sizes = [2.0, 7.0], spreads = [30.0, 40.0] }
+"""
+
+
+def write_config(tmp_path):
+    path = tmp_path / "instruments.toml"
+    path.write_text(CONFIG, encoding="utf-8")
+    return str(path)
+
+
+def test_registry_reads_only_configuration(tmp_path):
+    # Plik rozkładu nie istnieje — rejestr go nie otwiera, dane ładowane są dopiero w zakładce
+    registry = load_registry(write_config(tmp_path))
+
+    assert list(registry) == ["EURUSD", "XAUUSD"]
+    eurusd, xauusd = registry["EURUSD"], registry["XAUUSD"]
+    assert eurusd.spread_multiplier == 1.0 and xauusd.spread_multiplier == 2.5
+    market = eurusd.markets[0]
+    assert market.key == "Spot EURUSD"
+    assert market.clean_distribution == "missing/eurusd_distribution_clean.csv"
+    assert market.periods_path == "missing/eurusd_distribution_periods.csv"
+    assert market.segments_path == "missing/eurusd_distribution_segments.csv"
+    assert distribution_files(registry) == ["missing/eurusd_distribution.csv", "futures.csv"]
+
+
+def test_default_order_books(tmp_path):
+    registry = load_registry(write_config(tmp_path))
+
+    # Bez bid_sizes — bid = ask; bez order_book_b — B to kopia A
+    spot = registry["EURUSD"].markets[0]
+    a = spot.default_order_book("a")
+    assert list(a.columns) == ["OB Line", "Bid Size", "Ask Size", "Spread"]
+    assert a["Bid Size"].tolist() == a["Ask Size"].tolist() == [1.0, 5.0]
+    assert spot.default_order_book("b").equals(a)
+
+    futures = registry["XAUUSD"].markets[0]
+    assert futures.default_order_book("a")["Bid Size"].tolist() == [1.0, 6.0]
+    assert futures.default_order_book("b")["Spread"].tolist() == [30.0, 40.0]
+
+
+def test_bundled_registry_loads():
+    registry = load_registry()
+    assert {"XAUUSD", "XAGUSD"} <= set(registry)
+    assert all(inst.markets and inst.lot_price > 0 for inst in registry.values())
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from engine import cumulative_distribution, distribution_fingerprint, prepare_distribution, rebin_distribution
+from result_cache import ResultCache
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1      # "a" jest teraz najświeższe
+    cache.put("c", 3)
+
+    assert "b" not in cache and len(cache) == 2
+    assert cache.get("b", "brak") == "brak"
+    assert (cache.hits, cache.misses) == (1, 1) and cache.hit_ratio == 0.5
+
+
+def test_get_or_compute_computes_once():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "wynik"
+
+    assert cache.get_or_compute(("Spot XAUUSD", "fp"), compute) == "wynik"
+    assert cache.get_or_compute(("Spot XAUUSD", "fp"), compute) == "wynik"
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_drops_matching_market_only():
+    cache = ResultCache()
+    for key in [("Spot XAUUSD", 1), ("Spot XAUUSD", 2), ("Futures XAUUSD", 1)]:
+        cache.put(key, key)
+    assert cache.invalidate(lambda key: key[0] == "Spot XAUUSD") == 2
+    assert len(cache) == 1 and ("Futures XAUUSD", 1) in cache
+
+
+def test_distribution_fingerprint_separates_resolutions():
+    # Zakładka i portfolio w tej samej rozdzielczości trafiają w ten sam wpis; inna rozdzielczość to inny wpis
+    ends = np.round(0.1 * np.arange(1, 51), 1)
+    native = pd.DataFrame({"volume_range": [f"{e - 0.1:.1f} - {e:.1f}" for e in ends],
+                           "filled_volume": np.arange(1.0, 51.0)})
+    cumulative = cumulative_distribution(prepare_distribution(native).bucket_ends, native["filled_volume"])
+    coarse = rebin_distribution(cumulative, [1.0, 2.0, 5.0])
+
+    assert distribution_fingerprint(native) == distribution_fingerprint(native.copy())
+    assert distribution_fingerprint(coarse) == distribution_fingerprint(rebin_distribution(cumulative, [5.0, 1.0, 2.0]))
+    assert distribution_fingerprint(coarse) != distribution_fingerprint(native)
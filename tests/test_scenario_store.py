@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import scenario_store
+from engine import Distribution, OrderBook, score_batch
+from scenario_store import ScenarioStore, totals_basis
+
+MARKET = "Spot XAUUSD"
+LOT_PRICE = 100_000.0
+
+
+def order_book(scale: float) -> OrderBook:
+    return OrderBook.from_arrays([1, 2, 3], [1.0, 2.0, 5.0], [10.0 * scale, 20.0 * scale, 40.0 * scale])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ScenarioStore(str(tmp_path / "scenarios.sqlite"))
+
+
+@pytest.fixture
+def dist():
+    ends = np.array([0.5, 1.0, 2.0, 4.0, 8.0])
+    return Distribution(labels=ends.astype(str), bucket_ends=ends, volumes=np.array([10.0, 5.0, 3.0, 2.0, 1.0]))
+
+
+def test_refresh_totals_scores_only_missing_scenarios(store, dist, monkeypatch):
+    scored = []
+    real = scenario_store.score_batch_reduced
+
+    def spy(books, *args, **kwargs):
+        scored.append(len(books) - 1)   # bez bieżącego Order Booka A
+        return real(books, *args, **kwargs)
+
+    monkeypatch.setattr(scenario_store, "score_batch_reduced", spy)
+    current = order_book(1.0)
+    basis = totals_basis("dist", current, LOT_PRICE, 1.0)
+
+    store.save(MARKET, "a", "jan", order_book(1.2))
+    store.save(MARKET, "b", "jan", order_book(0.8))
+    assert store.refresh_totals(MARKET, basis, dist, current, LOT_PRICE) == 2
+    assert store.refresh_totals(MARKET, basis, dist, current, LOT_PRICE) == 0
+
+    store.save(MARKET, "c", "ola", order_book(1.5))
+    assert store.refresh_totals(MARKET, basis, dist, current, LOT_PRICE) == 1
+    assert scored == [2, 1]
+
+    listed = store.list_scenarios(MARKET, basis).set_index("Nazwa")
+    expected = score_batch([order_book(1.2), order_book(0.8), order_book(1.5), current],
+                           dist.bucket_ends, dist.volumes, LOT_PRICE).revenue
+    np.testing.assert_allclose(listed.loc[["a", "b", "c"], "Revenue_USD"], expected[:3])
+    np.testing.assert_allclose(listed.loc[["a", "b", "c"], "Uplift_USD"], expected[:3] - expected[3])
+
+
+def test_totals_are_kept_per_basis(store, dist):
+    current = order_book(1.0)
+    store.save(MARKET, "a", "jan", order_book(1.2))
+    one = totals_basis("dist", current, LOT_PRICE, 1.0)
+    two = totals_basis("dist", current, LOT_PRICE, 2.0)
+
+    assert store.refresh_totals(MARKET, one, dist, current, LOT_PRICE, 1.0) == 1
+    assert store.refresh_totals(MARKET, two, dist, current, LOT_PRICE, 2.0) == 1
+    # Powrót do poprzedniej podstawy nie przelicza biblioteki
+    assert store.refresh_totals(MARKET, one, dist, current, LOT_PRICE, 1.0) == 0
+    revenue_one = store.list_scenarios(MARKET, one)["Revenue_USD"].iloc[0]
+    revenue_two = store.list_scenarios(MARKET, two)["Revenue_USD"].iloc[0]
+    assert revenue_two == pytest.approx(2 * revenue_one)
+
+
+def test_old_bases_are_pruned(store, dist):
+    current = order_book(1.0)
+    store.save(MARKET, "a", "jan", order_book(1.2))
+    bases = [totals_basis(f"dist-{i}", current, LOT_PRICE, 1.0) for i in range(scenario_store.MAX_TOTALS_BASES + 2)]
+    for basis in bases:
+        store.refresh_totals(MARKET, basis, dist, current, LOT_PRICE)
+
+    assert store.list_scenarios(MARKET, bases[0]).empty
+    assert len(store.list_scenarios(MARKET, bases[-1])) == 1
+    assert store.refresh_totals(MARKET, bases[-1], dist, current, LOT_PRICE) == 0
+    assert store.refresh_totals(MARKET, bases[0], dist, current, LOT_PRICE) == 1
+
+
+def test_save_overwrite_drops_totals(store, dist):
+    current = order_book(1.0)
+    basis = totals_basis("dist", current, LOT_PRICE, 1.0)
+    store.save(MARKET, "a", "jan", order_book(1.2))
+    store.refresh_totals(MARKET, basis, dist, current, LOT_PRICE)
+
+    store.save(MARKET, "a", "jan", order_book(2.0))
+    assert store.list_scenarios(MARKET, basis).empty
+    assert store.refresh_totals(MARKET, basis, dist, current, LOT_PRICE) == 1
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from engine import OrderBook, PanelDistribution, bucket_labels, score_panel, score_segments
+
+LOT_PRICE = 100_000.0
+
+
+@pytest.fixture
+def panel():
+    ends = np.array([0.5, 1.0, 2.0, 4.0, 8.0, 16.0])
+    volumes = np.array([
+        [40.0, 20.0, 10.0, 0.0, 0.0, 0.0],    # detal — małe transakcje
+        [5.0, 5.0, 10.0, 20.0, 30.0, 15.0],   # instytucje
+        [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],       # segment bez flow
+    ])
+    return PanelDistribution(keys=np.array(["retail", "institutional", "empty"]), labels=bucket_labels(ends),
+                             bucket_ends=ends, volumes=volumes)
+
+
+@pytest.fixture
+def books():
+    return [
+        OrderBook.from_arrays([1, 2, 3], [1.0, 2.0, 5.0], [10.0, 20.0, 40.0]),
+        OrderBook.from_arrays([1, 2], [0.5, 20.0], [8.0, 30.0]),
+    ]
+
+
+def test_segment_scores_match_scoring_each_segment(panel, books):
+    score = score_segments(books, panel, LOT_PRICE, spread_multiplier=1.5)
+    assert score.revenue.shape == (3, 2)
+
+    for s, book in enumerate(books):
+        per_segment = score_panel(book, panel, LOT_PRICE, spread_multiplier=1.5)
+        np.testing.assert_allclose(score.revenue[:, s], per_segment["Revenue_USD"])
+        np.testing.assert_allclose(score.rpm[:, s], per_segment["RPM"])
+    np.testing.assert_allclose(score.turnover, panel.volumes.sum(axis=1) * LOT_PRICE)
+    assert (score.rpm[2] == 0).all()
+
+
+def test_mix_is_weighted_sum_of_segments(panel, books):
+    score = score_segments(books, panel, LOT_PRICE)
+
+    revenue, turnover = score.mix([1.0, 1.0, 1.0])
+    np.testing.assert_allclose(revenue, score.revenue.sum(axis=0))
+    assert turnover == pytest.approx(score.turnover.sum())
+
+    # Podwojony flow instytucji i pominięty detal — jak ocena przeskalowanego rozkładu
+    revenue, turnover = score.mix([0.0, 2.0, 1.0])
+    scaled = PanelDistribution(keys=np.array(["mix"]), labels=panel.labels, bucket_ends=panel.bucket_ends,
+                               volumes=2.0 * panel.volumes[1:2])
+    np.testing.assert_allclose(revenue, score_segments(books, scaled, LOT_PRICE).revenue[0])
+    assert turnover == pytest.approx(2.0 * score.turnover[1])
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from sketch import VolumeSketch
+
+
+def lognormal_sizes(n: int = 20_000, seed: int = 0) -> np.ndarray:
+    return np.round(np.random.default_rng(seed).lognormal(-0.5, 1.3, n), 2)
+
+
+def exact_volumes(sizes: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    idx = np.minimum(np.searchsorted(edges, sizes, side="left"), len(edges) - 1)
+    return np.bincount(idx, weights=sizes, minlength=len(edges))
+
+
+def test_quantile_within_relative_accuracy():
+    sizes = lognormal_sizes()
+    sketch = VolumeSketch(0.01).add(sizes)
+    order = np.sort(sizes)
+    cum = np.cumsum(order)
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = order[np.searchsorted(cum, q * cum[-1])]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+
+
+def test_merge_equals_single_pass_and_roundtrip(tmp_path):
+    sizes = lognormal_sizes()
+    whole = VolumeSketch(0.02).add(sizes)
+    parts = VolumeSketch(0.02).add(sizes[:7_000]).merge(VolumeSketch(0.02).add(sizes[7_000:]))
+    assert parts.counts == whole.counts
+    assert parts.volumes.keys() == whole.volumes.keys()
+    assert all(parts.volumes[k] == pytest.approx(v) for k, v in whole.volumes.items())
+
+    path = tmp_path / "sketch.json"
+    whole.save(str(path))
+    loaded = VolumeSketch.load(str(path))
+    assert loaded.counts == whole.counts and loaded.volumes == pytest.approx(whole.volumes)
+
+    with pytest.raises(ValueError):
+        whole.merge(VolumeSketch(0.01))
+
+
+def test_to_distribution_preserves_volume_and_splits_straddling_bins():
+    sizes = lognormal_sizes()
+    sketch = VolumeSketch(0.01).add(sizes)
+    edges = np.array([0.25, 0.5, 1.0, 2.0, 5.0, 10.0])
+    dist = sketch.to_distribution(edges=edges)
+
+    # Wspólna liczba miejsc po przecinku dla wszystkich etykiet, jak w clean_csv
+    assert list(dist["volume_range"]) == ["0.00 - 0.25", "0.25 - 0.50", "0.50 - 1.00", "1.00 - 2.00", "2.00 - 5.00",
+                                          "5.00 - 10.00"]
+    assert dist["filled_volume"].sum() == pytest.approx(sizes.sum())
+    exact = exact_volumes(sizes, edges)
+    misplaced = np.abs(dist["filled_volume"].to_numpy() - exact).sum() / 2 / sizes.sum()
+    assert misplaced < 0.02
+
+
+def test_to_distribution_fixed_width_labels():
+    sketch = VolumeSketch(0.01).add([0.05, 0.3, 0.7, 1.2])
+    dist = sketch.to_distribution(bucket_width=0.5)
+    assert list(dist["volume_range"]) == ["0.0 - 0.5", "0.5 - 1.0", "1.0 - 1.5"]
+    assert dist["filled_volume"].sum() == pytest.approx(2.25)
+
+
+@pytest.mark.parametrize("edges", [[], [5.0, 1.0], [1.0, 1.0, 2.0], [0.0, 1.0], [-1.0, 1.0], [1.0, np.nan]])
+def test_to_distribution_rejects_invalid_edges(edges):
+    with pytest.raises(ValueError):
+        VolumeSketch(0.01).add([0.5, 1.5]).to_distribution(edges=edges)
+
+
+@pytest.mark.parametrize("bucket_width", [None, 0.0, -0.5])
+def test_to_distribution_rejects_invalid_bucket_width(bucket_width):
+    with pytest.raises(ValueError):
+        VolumeSketch(0.01).add([0.5]).to_distribution(bucket_width=bucket_width)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import OrderBook, score_batch, solve_spread_scaling, target_revenue_for_rpm
+
+LOT_PRICE = 100_000.0
+
+
+@pytest.fixture
+def case():
+    ends = np.round(0.5 * np.arange(1, 41), 1)
+    volumes = np.round(np.random.default_rng(1).gamma(1.0, 30.0, len(ends)), 2)
+    book = OrderBook.from_arrays([1, 2, 3, 4], [1.0, 3.0, 6.0, 10.0], [2.0, 6.0, 12.0, 20.0])
+    return book, ends, volumes
+
+
+def rescore(scaling, book, ends, volumes, spread_multiplier):
+    scaled = OrderBook.from_frame(scaling.apply(book, decimals=10))
+    return score_batch([scaled], ends, volumes, LOT_PRICE, spread_multiplier)
+
+
+@pytest.mark.parametrize("spread_multiplier", [1.0, 10.0])
+def test_scaling_hits_target_rpm(case, spread_multiplier):
+    book, ends, volumes = case
+    batch = score_batch([book], ends, volumes, LOT_PRICE, spread_multiplier)
+    target = target_revenue_for_rpm(1.25 * batch.rpm[0], batch.turnover[0])
+
+    scaling = solve_spread_scaling(batch.line_volume[0], book.spread, np.ones(len(book), dtype=bool), target,
+                                   spread_multiplier)
+    assert scaling.feasible and scaling.multiplier == pytest.approx(1.25)
+    assert rescore(scaling, book, ends, volumes, spread_multiplier).rpm[0] == pytest.approx(1.25 * batch.rpm[0])
+
+
+def test_scaling_subset_of_lines_hits_target_revenue(case):
+    book, ends, volumes = case
+    batch = score_batch([book], ends, volumes, LOT_PRICE)
+    scaled = np.array([False, True, True, False])
+    target = batch.revenue[0] + 1_000.0
+
+    scaling = solve_spread_scaling(batch.line_volume[0], book.spread, scaled, target)
+    assert scaling.revenue_fixed + scaling.revenue_scaled == pytest.approx(batch.revenue[0])
+    applied = scaling.apply(book, decimals=10)
+    assert isinstance(applied, pd.DataFrame)
+    np.testing.assert_array_equal(applied["Spread"].to_numpy()[~scaled], book.spread[~scaled])
+    assert rescore(scaling, book, ends, volumes, 1.0).revenue[0] == pytest.approx(target)
+
+
+def test_unreachable_targets_are_infeasible(case):
+    book, ends, volumes = case
+    batch = score_batch([book], ends, volumes, LOT_PRICE)
+
+    # Skalowane linie bez wolumenu
+    no_volume = np.zeros(len(book))
+    assert not solve_spread_scaling(no_volume, book.spread, np.ones(len(book), dtype=bool), 100.0).feasible
+    # Cel poniżej przychodu linii nieskalowanych wymagałby ujemnych spreadów
+    fixed_only = np.array([True, False, False, False])
+    assert not solve_spread_scaling(batch.line_volume[0], book.spread, fixed_only, 0.0).feasible
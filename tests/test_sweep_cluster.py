@@ -0,0 +1,133 @@
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import numpy as np
+import pytest
+
+from sweep_cluster import SweepCoordinator, SweepTask, connect, run_worker, scale_grid, score_shard
+
+AUTHKEY = b"test-key"
+LEASE_S = 0.3
+
+
+def make_task(market: str = "Spot XAUUSD") -> SweepTask:
+    return SweepTask(
+        market=market,
+        period="łącznie",
+        bucket_ends=np.array([0.5, 1.0, 2.0, 5.0]),
+        volumes=np.array([40.0, 20.0, 10.0, 5.0]),
+        lot_price=100_000.0,
+        spread_multiplier=1.0,
+        base_ask=np.array([1.0, 2.0, 4.0]),
+        base_spread=np.array([10.0, 20.0, 40.0]),
+    )
+
+
+ASK_SCALES = scale_grid(0.5, 2.0, 2)
+SPREAD_SCALES = scale_grid(0.5, 2.0, 2)
+
+
+@pytest.fixture
+def coordinator_factory():
+    created = []
+
+    def factory(tasks=None, **kwargs):
+        options = dict(shard_size=4, lease_s=LEASE_S, max_attempts=2)
+        options.update(kwargs)
+        coordinator = SweepCoordinator(tasks or [make_task()], ASK_SCALES, SPREAD_SCALES, ("127.0.0.1", 0), AUTHKEY,
+                                       **options).start()
+        created.append(coordinator)
+        return coordinator
+
+    yield factory
+    for coordinator in created:
+        coordinator.close()
+
+
+def lease(coordinator: SweepCoordinator, name: str):
+    """Klient, który pobiera jeden komunikat po `get` — i nic więcej (symuluje zawieszony proces roboczy)."""
+    conn = Client(coordinator.address, authkey=AUTHKEY)
+    conn.send(("hello", name))
+    conn.recv()
+    conn.send(("get",))
+    return conn, conn.recv()
+
+
+def test_expired_lease_is_requeued_and_fails_after_max_attempts(coordinator_factory):
+    coordinator = coordinator_factory()
+    first, message = lease(coordinator, "hang-1")
+    assert message[0] == "shard"
+
+    time.sleep(LEASE_S * 1.5)
+    second, message = lease(coordinator, "hang-2")
+    assert message[0] == "shard" and coordinator.retries == 1
+
+    time.sleep(LEASE_S * 1.5)
+    third, message = lease(coordinator, "late")
+    assert message == ("done",)
+    assert coordinator.finished
+    assert list(coordinator.failed) == [0] and "hang-2" in coordinator.failed[0]
+    assert np.isnan(coordinator.result().grids[0].revenue).all()
+    for conn in (first, second, third):
+        conn.close()
+
+
+def test_expired_lease_is_served_to_next_worker(coordinator_factory):
+    coordinator = coordinator_factory(max_attempts=3)
+    hung, _ = lease(coordinator, "hang")
+    time.sleep(LEASE_S * 1.5)
+
+    assert run_worker(coordinator.address, AUTHKEY, "ok", connect_timeout=5) == 1
+    assert coordinator.wait(5)
+    result = coordinator.result()
+    assert result.retries == 1 and not result.failed and result.worker_shards == {"ok": 1}
+    expected = score_shard(make_task(), ASK_SCALES, SPREAD_SCALES, 0, 4)["revenue"]
+    np.testing.assert_allclose(result.grids[0].revenue.ravel(), expected)
+
+    # Spóźniony wynik po ponownym wydaniu liczy się raz
+    hung.send(("result", 0, {name: np.zeros(4) for name in ("revenue", "turnover", "top_spread")}))
+    hung.close()
+    time.sleep(0.1)
+    np.testing.assert_allclose(coordinator.result().grids[0].revenue.ravel(), expected)
+
+
+def test_dropped_connection_requeues_without_waiting_for_lease(coordinator_factory):
+    coordinator = coordinator_factory(lease_s=60.0)
+    dropped, message = lease(coordinator, "drop")
+    assert message[0] == "shard"
+    dropped.close()
+
+    worker = threading.Thread(target=run_worker, args=(coordinator.address, AUTHKEY, "ok", 5))
+    worker.start()
+    assert coordinator.wait(5)
+    worker.join(5)
+    assert coordinator.retries == 1 and not coordinator.failed
+
+
+def test_shards_are_split_across_workers_and_tasks(coordinator_factory):
+    tasks = [make_task("Spot XAUUSD"), make_task("Futures XAUUSD")]
+    coordinator = coordinator_factory(tasks, shard_size=1)
+    workers = [threading.Thread(target=run_worker, args=(coordinator.address, AUTHKEY, f"w{i}", 5)) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    assert coordinator.wait(10)
+    for worker in workers:
+        worker.join(5)
+
+    result = coordinator.result()
+    assert result.shards == 8 and sum(result.worker_shards.values()) == 8
+    expected = score_shard(tasks[0], ASK_SCALES, SPREAD_SCALES, 0, 4)["revenue"]
+    for grid in result.grids:
+        np.testing.assert_allclose(grid.revenue.ravel(), expected)
+
+
+def test_authkey_is_required(coordinator_factory):
+    with pytest.raises(ValueError):
+        SweepCoordinator([make_task()], ASK_SCALES, SPREAD_SCALES, ("127.0.0.1", 0), b"")
+    coordinator = coordinator_factory()
+    with pytest.raises(ValueError):
+        connect(coordinator.address, b"", timeout=1)
+    with pytest.raises(AuthenticationError):
+        Client(coordinator.address, authkey=b"wrong")
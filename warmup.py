@@ -0,0 +1,48 @@
+"""
+Rozgrzewanie cache po starcie serwera: w wątku w tle, zadanie po zadaniu (np. wczytanie
+rozkładu rynku i policzenie domyślnych Order Booków), tak aby pierwszy użytkownik
+trafiał już w ciepłe cache zamiast czekać na czyszczenie CSV i scoring.
+"""
+import threading
+import time
+from typing import Callable
+
+WARMUP_THREAD = "warmup"  # nazwa wątku (np. do filtrowania logów)
+
+
+class WarmUp:
+    """Sekwencyjne zadania rozgrzewające z postępem; błąd jednego zadania nie przerywa pozostałych."""
+
+    def __init__(self, tasks: list[tuple[str, Callable[[], object]]]):
+        self.tasks = list(tasks)
+        self.completed = 0
+        self.errors: list[tuple[str, str]] = []
+        self.started: float | None = None
+        self.elapsed: float | None = None
+        self._thread = threading.Thread(target=self._run, name=WARMUP_THREAD, daemon=True)
+
+    @property
+    def total(self) -> int:
+        return len(self.tasks)
+
+    @property
+    def finished(self) -> bool:
+        return self.elapsed is not None
+
+    def start(self) -> "WarmUp":
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: float | None = None) -> bool:
+        self._thread.join(timeout)
+        return self.finished
+
+    def _run(self) -> None:
+        for label, task in self.tasks:
+            try:
+                task()
+            except Exception as e:
+                self.errors.append((label, str(e)))
+            self.completed += 1
+        self.elapsed = time.perf_counter() - self.started